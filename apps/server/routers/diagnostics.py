@@ -1,7 +1,8 @@
 from fastapi import APIRouter
-from server import config
+from server import config, resilience
+from server.embedding import get_cache
+from server.tools import rag
 import requests
-from qdrant_client import QdrantClient
 import redis
 from pymongo import MongoClient
 
@@ -13,13 +14,15 @@ def diagnostics():
     results = {}
     # Qdrant
     try:
-        client = QdrantClient(url=config.QDRANT_URL)
+        client = rag.get_client()
         # simple ping: get collections (may raise on bad connection)
         names = []
         try:
-            col_resp = client.get_collections()
+            col_resp = resilience.call('qdrant', client.get_collections)
             # qdrant-client returns an object with collections attr in newer versions
             names = col_resp.collections if hasattr(col_resp, 'collections') else []
+        except resilience.BreakerOpen:
+            raise
         except Exception:
             # fallback: call http endpoint
             try:
@@ -34,16 +37,17 @@ def diagnostics():
 
     # Redis
     try:
-        r = redis.from_url(config.REDIS_URL)
-        pong = r.ping()
+        timeout = resilience.breaker('redis').timeout()
+        r = redis.from_url(config.REDIS_URL, socket_timeout=timeout, socket_connect_timeout=timeout)
+        pong = resilience.call('redis', r.ping)
         results['redis'] = {'ok': bool(pong)}
     except Exception as e:
         results['redis'] = {'ok': False, 'error': str(e)}
 
     # Mongo
     try:
-        mc = MongoClient(config.MONGO_URI, serverSelectionTimeoutMS=3000)
-        mc.server_info()
+        mc = MongoClient(config.MONGO_URI, serverSelectionTimeoutMS=int(resilience.breaker('mongo').timeout() * 1000))
+        resilience.call('mongo', mc.server_info)
         results['mongo'] = {'ok': True}
     except Exception as e:
         results['mongo'] = {'ok': False, 'error': str(e)}
@@ -57,20 +61,20 @@ def diagnostics():
             if not config.OPENROUTER_API_KEY:
                 results['embedding'] = {'ok': False, 'error': 'OPENROUTER_API_KEY not set'}
             else:
-                url = 'https://openrouter.ai/api/v1/embeddings'
+                url = config.OPENROUTER_BASE_URL.rstrip('/') + '/embeddings'
                 headers = {'Authorization': f'Bearer {config.OPENROUTER_API_KEY}'}
                 payload = {'model': config.EMBEDDING_MODEL, 'input': 'ping'}
-                r = requests.post(url, headers=headers, json=payload, timeout=10)
+                r = resilience.call('embedding', lambda: requests.post(url, headers=headers, json=payload, timeout=resilience.breaker('embedding').timeout()))
                 r.raise_for_status()
                 results['embedding'] = {'ok': True, 'provider': 'openrouter'}
         elif prov == 'openai':
             if not config.OPENAI_API_KEY:
                 results['embedding'] = {'ok': False, 'error': 'OPENAI_API_KEY not set'}
             else:
-                url = 'https://api.openai.com/v1/embeddings'
+                url = config.OPENAI_BASE_URL.rstrip('/') + '/embeddings'
                 headers = {'Authorization': f'Bearer {config.OPENAI_API_KEY}'}
                 payload = {'model': config.EMBEDDING_MODEL, 'input': 'ping'}
-                r = requests.post(url, headers=headers, json=payload, timeout=10)
+                r = resilience.call('embedding', lambda: requests.post(url, headers=headers, json=payload, timeout=resilience.breaker('embedding').timeout()))
                 r.raise_for_status()
                 results['embedding'] = {'ok': True, 'provider': 'openai'}
         else:
@@ -78,4 +82,11 @@ def diagnostics():
     except Exception as e:
         results['embedding'] = {'ok': False, 'error': str(e)}
 
+    # Embedding cache hit/miss counters
+    cache = get_cache()
+    results['embedding_cache'] = cache.stats() if cache else {'enabled': False}
+
+    # Circuit breakers: state, failure counts and the adaptive timeout per dependency
+    results['breakers'] = resilience.snapshot()
+
     return results
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException
+from server import config
+from server.models import RagSearchBatchReq, RagSearchBatchRes
+from server.tools import rag
+
+router = APIRouter(prefix='/rag', tags=['rag'])
+
+
+@router.post('/search/batch', response_model=RagSearchBatchRes)
+async def search_batch(req: RagSearchBatchReq):
+    """Run many retrievals in one call (offline evaluation, warm-up jobs)."""
+    if len(req.queries) > config.RAG_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f'At most {config.RAG_BATCH_MAX} queries per batch')
+    if req.per_query_namespaces is not None and len(req.per_query_namespaces) != len(req.queries):
+        raise HTTPException(status_code=400, detail='per_query_namespaces needs one namespace list per query')
+    namespaces = req.per_query_namespaces if req.per_query_namespaces is not None else req.namespaces
+    try:
+        results = await rag.asearch_many(req.queries, namespaces, k=req.k, mode=req.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return RagSearchBatchRes(results=results)
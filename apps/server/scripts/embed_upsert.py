@@ -1,40 +1,45 @@
-import argparse, os, sys, uuid
+import argparse, json, sys
 from pathlib import Path
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct
 THIS_DIR=Path(__file__).resolve().parent; SERVER_DIR=THIS_DIR.parent
 if str(SERVER_DIR) not in sys.path: sys.path.insert(0, str(SERVER_DIR))
-from server import config
-from server.embedding import embed_text
-
-def ensure_collection(client):
-    try:
-        client.recreate_collection(collection_name=config.COLLECTION_NAME, vectors_config=VectorParams(size=config.EMBED_DIM, distance=Distance.COSINE))
-    except Exception: pass
-
-def chunk_text(text,max_len=650):
-    words=text.split(); buf=[]; size=0
-    for w in words:
-        buf.append(w); size+=len(w)+1
-        if size>=max_len: yield ' '.join(buf); buf=[]; size=0
-    if buf: yield ' '.join(buf)
-
-def files_from_src(src:str):
-    p=Path(src)
-    if p.is_dir():
-        for ext in ('**/*.md','**/*.txt'):
-            for f in p.glob(ext): yield f
-    else: yield p
+from server import config, collection
+from server.ingest import ingest
+from server.watch import watch
+from server import snapshot
 
 def main():
-    ap=argparse.ArgumentParser(); ap.add_argument('--ns', required=True); ap.add_argument('--src', required=True); args=ap.parse_args()
-    client=QdrantClient(url=config.QDRANT_URL); ensure_collection(client)
-    points=[]; count=0
-    for fp in files_from_src(args.src):
-        text=Path(fp).read_text(encoding='utf-8')
-        for chunk in chunk_text(text):
-            vec=embed_text(chunk); pid=str(uuid.uuid4())
-            points.append(PointStruct(id=pid, vector=vec, payload={'text':chunk,'source':str(fp),'namespace':args.ns})); count+=1
-    if points: client.upsert(collection_name=config.COLLECTION_NAME, points=points)
-    print({'upserted': count, 'namespace': args.ns, 'collection': config.COLLECTION_NAME})
+    ap=argparse.ArgumentParser(); ap.add_argument('command', nargs='?', choices=('ingest','export','import'), default='ingest')
+    ap.add_argument('--ns'); ap.add_argument('--src')
+    ap.add_argument('--snapshot', help='snapshot directory for export/import')
+    ap.add_argument('--dtype', choices=('float16','int8'), default=config.SNAPSHOT_DTYPE, help='vector encoding for export')
+    ap.add_argument('--native', action='store_true', help='export/import Qdrant-native collection snapshots instead')
+    ap.add_argument('--force', action='store_true', help='import a snapshot embedded with a different model/dimension')
+    ap.add_argument('--full', action='store_true', help='ignore the manifest and rewrite every chunk of --src')
+    ap.add_argument('--dedupe', action='store_true', default=config.INGEST_DEDUPE, help='collapse near-duplicate chunks (MinHash/LSH) into one point listing all sources')
+    ap.add_argument('--workers', type=int, default=config.INGEST_WORKERS, help='embedding worker threads')
+    ap.add_argument('--watch', action='store_true', help='keep running and re-ingest files under --src as they change')
+    ap.add_argument('--migrate', action='store_true', help='apply payload indexes and HNSW/quantization/on-disk config to existing collections')
+    args=ap.parse_args()
+    client=QdrantClient(url=config.QDRANT_URL) if config.RAG_BACKEND!='local' else None
+    if args.command!='ingest':
+        if not args.snapshot: ap.error(f'{args.command} requires --snapshot')
+        if args.native and client is None: ap.error('--native needs Qdrant (RAG_BACKEND=qdrant)')
+        if args.command=='export':
+            print(snapshot.export_native(client, args.snapshot) if args.native else snapshot.export(args.snapshot, client=client, dtype=args.dtype, namespaces=[args.ns] if args.ns else None))
+        else:
+            print(snapshot.restore_native(args.snapshot) if args.native else snapshot.restore(args.snapshot, client=client, force=args.force))
+        return
+    if args.migrate and client is not None:
+        for name in collection.managed_names(client):
+            collection.ensure_payload_indexes(client, name, (client.get_collection(name).payload_schema or {}).keys())
+            print({'migrated': collection.migrate(client, name), 'collection': name})
+        if not (args.ns or args.src): return
+    if not (args.ns and args.src): ap.error('--ns and --src are required')
+    progress=lambda snap: print(json.dumps({'progress': snap}), file=sys.stderr, flush=True)
+    if args.watch:
+        try: watch(args.ns, args.src, client=client, on_result=lambda r: print(r, flush=True), workers=args.workers, report=progress, dedupe=args.dedupe)
+        except KeyboardInterrupt: pass
+        return
+    print(ingest(args.ns, args.src, client=client, full=args.full, workers=args.workers, report=progress, dedupe=args.dedupe))
 if __name__=='__main__': main()
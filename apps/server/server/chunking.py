@@ -0,0 +1,157 @@
+"""Streaming, token-budgeted chunking for the ingestion pipeline.
+
+Files are read line by line (memory-mapped above CHUNK_MMAP_BYTES) and turned into (section, paragraph) events
+by a per-format reader; `pack` groups paragraphs into chunks of at most CHUNK_TOKENS tokens with CHUNK_OVERLAP
+tokens carried over, and never lets a chunk span two Markdown/HTML sections. Token counts are a tokenizer-free
+estimate (words and punctuation runs), close enough to size chunks without pulling in a model vocabulary.
+"""
+import csv, hashlib, json, mmap, os, re
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+from . import config
+
+SUPPORTED=('.md','.markdown','.txt','.html','.htm','.csv','.jsonl')
+RECORD_FORMATS=('.csv','.jsonl')
+_TOKEN=re.compile(r'\w+|[^\w\s]+')
+_HEADING=re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+Event=Tuple[Optional[str],str]
+
+def count_tokens(text:str)->int: return len(_TOKEN.findall(text))
+
+def signature()->str:
+    """Changes whenever chunk boundaries would, so the manifest re-plans files chunked under other settings."""
+    return f'v1:{config.CHUNK_TOKENS}:{config.CHUNK_OVERLAP}'
+
+def files_from_src(src:str)->Iterator[Path]:
+    p=Path(src)
+    if p.is_dir():
+        for f in sorted(p.rglob('*')):
+            if f.suffix.lower() in SUPPORTED and f.is_file(): yield f
+    else: yield p
+
+def file_sha(path)->str:
+    with open(path,'rb') as f: return hashlib.file_digest(f,'sha256').hexdigest()
+
+def read_lines(path)->Iterator[str]:
+    """Decoded lines (newlines kept) without loading the file; large files are memory-mapped."""
+    size=os.path.getsize(path)
+    if size==0: return
+    if size<config.CHUNK_MMAP_BYTES:
+        with open(path,'r',encoding='utf-8',newline='') as f: yield from f
+        return
+    with open(path,'rb') as f, mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ) as mm:
+        for line in iter(mm.readline,b''): yield line.decode('utf-8')
+
+def _paragraphs(lines:Iterable[str], section:Optional[str]=None)->Iterator[Event]:
+    buf=[]
+    for line in lines:
+        if line.strip(): buf.append(line.strip()); continue
+        if buf: yield section,' '.join(buf); buf=[]
+    if buf: yield section,' '.join(buf)
+
+def _markdown(lines:Iterable[str])->Iterator[Event]:
+    trail:List[Tuple[int,str]]=[]; buf=[]; fence=False
+    section=lambda: ' > '.join(t for _,t in trail) or None
+    for line in lines:
+        s=line.strip()
+        if s.startswith(('```','~~~')): fence=not fence
+        m=None if fence else _HEADING.match(s)
+        if m or not s:
+            if buf: yield section(),' '.join(buf); buf=[]
+            if m:
+                level=len(m.group(1)); trail=[t for t in trail if t[0]<level]+[(level,m.group(2))]
+                buf.append(s)
+            continue
+        buf.append(s)
+    if buf: yield section(),' '.join(buf)
+
+class _HTMLText(HTMLParser):
+    BLOCK={'p','div','li','br','tr','td','th','section','article','blockquote','pre','table','ul','ol','dd','dt'}
+    SKIP={'script','style','noscript','template','head'}
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.events:List[Event]=[]; self.buf:List[str]=[]; self.trail:List[Tuple[int,str]]=[]
+        self.skip=0; self.heading:Optional[int]=None
+
+    def _flush(self):
+        text=' '.join(' '.join(self.buf).split()); self.buf=[]
+        if not text: return
+        if self.heading:
+            self.trail=[t for t in self.trail if t[0]<self.heading]+[(self.heading,text)]
+        self.events.append((' > '.join(t for _,t in self.trail) or None,text))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP: self.skip+=1
+        elif tag in ('h1','h2','h3','h4','h5','h6'): self._flush(); self.heading=int(tag[1])
+        elif tag in self.BLOCK: self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP: self.skip=max(0,self.skip-1)
+        elif tag in ('h1','h2','h3','h4','h5','h6'): self._flush(); self.heading=None
+        elif tag in self.BLOCK: self._flush()
+
+    def handle_data(self, data):
+        if not self.skip: self.buf.append(data)
+
+def _html(lines:Iterable[str])->Iterator[Event]:
+    p=_HTMLText()
+    for line in lines:
+        p.feed(line); yield from p.events; p.events.clear()
+    p.close(); p._flush(); yield from p.events
+
+def _csv(lines:Iterable[str])->Iterator[Event]:
+    rows=csv.reader(lines); header=next(rows,None)
+    for row in rows:
+        cells=[f'{h}: {v}' if h else v for h,v in zip(header or [],row) if v.strip()]+row[len(header or []):]
+        if cells: yield None,'; '.join(cells)
+
+def _jsonl(lines:Iterable[str])->Iterator[Event]:
+    for n,line in enumerate(lines,1):
+        if not line.strip(): continue
+        try: obj=json.loads(line)
+        except json.JSONDecodeError as e: raise ValueError(f'invalid JSON on line {n}: {e}') from e
+        if not isinstance(obj,dict): yield None,str(obj); continue
+        text=next((obj[k] for k in ('text','content','body') if isinstance(obj.get(k),str)),None)
+        title=obj.get('title') if isinstance(obj.get('title'),str) else None
+        yield title,text if text is not None else '; '.join(f'{k}: {v}' for k,v in obj.items() if v not in (None,''))
+
+READERS={'.md':_markdown,'.markdown':_markdown,'.html':_html,'.htm':_html,'.csv':_csv,'.jsonl':_jsonl}
+
+def events(path)->Iterator[Event]:
+    return READERS.get(Path(path).suffix.lower(),_paragraphs)(read_lines(path))
+
+def pack(events:Iterable[Event], max_tokens:Optional[int]=None, overlap:Optional[int]=None)->Iterator[Tuple[Optional[str],str]]:
+    """(section, chunk text) pairs of at most `max_tokens` tokens. A paragraph that does not fit starts a new chunk
+    once the current one is half full; longer paragraphs are split on words. Overlap never crosses sections."""
+    max_tokens=max(1,max_tokens or config.CHUNK_TOKENS)
+    overlap=min(config.CHUNK_OVERLAP if overlap is None else overlap,max_tokens//2)
+    buf:List[Tuple[str,int]]=[]; cost=0; fresh=False; current=None
+
+    def emit():
+        return current,' '.join(w for w,_ in buf)
+
+    def tail():
+        out=[]; total=0
+        for w,c in reversed(buf):
+            if total+c>overlap: break
+            out.append((w,c)); total+=c
+        return out[::-1],total
+
+    for section,para in events:
+        if section!=current:
+            if fresh: yield emit()
+            buf=[]; cost=0; fresh=False; current=section
+        words=[(w,max(1,count_tokens(w))) for w in para.split()]
+        if fresh and cost+sum(c for _,c in words)>max_tokens and cost>=max_tokens//2:
+            yield emit(); buf,cost=tail(); fresh=False
+        for w,c in words:
+            if fresh and cost+c>max_tokens:
+                yield emit(); buf,cost=tail(); fresh=False
+            buf.append((w,c)); cost+=c; fresh=True
+    if fresh: yield emit()
+
+def chunk_file(path)->Iterator[Tuple[Optional[str],str]]:
+    """Chunks of one file; record formats (CSV/JSONL) pack whole rows without overlap."""
+    rec=Path(path).suffix.lower() in RECORD_FORMATS
+    return pack(events(path),overlap=0 if rec else None)
@@ -0,0 +1,122 @@
+"""Qdrant collection schema for the docs collection: HNSW, scalar quantization and on-disk settings.
+
+The same settings are used when the collection is created (server bootstrap and ingest) and by
+`migrate`, which brings an existing collection in line with the current config.
+
+With COLLECTION_LAYOUT=per_namespace every top-level namespace ("bank", "role", "global") gets its own
+collection, so a query only touches the collections of the namespaces it asks for.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.http.models import (Distance, VectorParams, VectorParamsDiff, HnswConfigDiff, CollectionParamsDiff,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType, Disabled, SearchParams, QuantizationSearchParams, PayloadSchemaType)
+from . import config
+
+PAYLOAD_INDEXES=('namespace','source')
+
+def hnsw_config()->HnswConfigDiff:
+    return HnswConfigDiff(m=config.QDRANT_HNSW_M, ef_construct=config.QDRANT_HNSW_EF_CONSTRUCT)
+
+def quantization_config()->Optional[ScalarQuantization]:
+    if config.QDRANT_QUANTIZATION!='int8': return None
+    return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=config.QDRANT_QUANT_QUANTILE, always_ram=config.QDRANT_QUANT_ALWAYS_RAM))
+
+def vectors_config(size:int)->VectorParams:
+    return VectorParams(size=size, distance=Distance.COSINE, on_disk=config.QDRANT_VECTORS_ON_DISK)
+
+def create_kwargs(size:int)->Dict[str,Any]:
+    """Keyword arguments for create_collection/recreate_collection."""
+    return dict(vectors_config=vectors_config(size), hnsw_config=hnsw_config(), quantization_config=quantization_config(),
+                on_disk_payload=config.QDRANT_PAYLOAD_ON_DISK)
+
+def search_params()->SearchParams:
+    quant=None
+    if config.QDRANT_QUANTIZATION=='int8':
+        quant=QuantizationSearchParams(rescore=config.QDRANT_QUANT_RESCORE, oversampling=config.QDRANT_QUANT_OVERSAMPLING)
+    return SearchParams(hnsw_ef=config.QDRANT_HNSW_EF, quantization=quant)
+
+def _diff(info)->Dict[str,Any]:
+    """update_collection kwargs for every setting where `info` (CollectionInfo) differs from the config."""
+    cfg=info.config; params=cfg.params; changes:Dict[str,Any]={}
+    if (cfg.hnsw_config.m,cfg.hnsw_config.ef_construct)!=(config.QDRANT_HNSW_M,config.QDRANT_HNSW_EF_CONSTRUCT):
+        changes['hnsw_config']=hnsw_config()
+    vec=params.vectors
+    if isinstance(vec,VectorParams) and bool(vec.on_disk)!=config.QDRANT_VECTORS_ON_DISK:
+        changes['vectors_config']={'':VectorParamsDiff(on_disk=config.QDRANT_VECTORS_ON_DISK)}
+    if bool(params.on_disk_payload)!=config.QDRANT_PAYLOAD_ON_DISK:
+        changes['collection_params']=CollectionParamsDiff(on_disk_payload=config.QDRANT_PAYLOAD_ON_DISK)
+    want=quantization_config(); have=cfg.quantization_config
+    if want is None and have is not None: changes['quantization_config']=Disabled.DISABLED
+    elif want is not None and (have is None or getattr(have,'scalar',None)!=want.scalar): changes['quantization_config']=want
+    return changes
+
+def migrate(client, collection_name:str=config.COLLECTION_NAME)->Dict[str,Any]:
+    """Apply config drift to an existing collection; Qdrant rebuilds indexes in the background. Returns what changed."""
+    changes=_diff(client.get_collection(collection_name))
+    if changes: client.update_collection(collection_name=collection_name, **changes)
+    return {k:str(v) for k,v in changes.items()}
+
+def name_for(namespace:str)->str:
+    """Collection holding `namespace` under the configured layout."""
+    if config.COLLECTION_LAYOUT!='per_namespace': return config.COLLECTION_NAME
+    top=re.sub(r'[^a-z0-9_-]+','_',(namespace or 'global').split('/')[0].lower()) or 'global'
+    return f'{config.COLLECTION_NAME}__{top}'
+
+def is_routed(name:str)->bool: return name.startswith(f'{config.COLLECTION_NAME}__')
+
+def route(namespaces:Iterable[str])->Dict[str,List[str]]:
+    """Group namespaces by the collection that stores them. Empty input maps to the single collection,
+    or to nothing under per_namespace (callers then search every routed collection)."""
+    namespaces=list(namespaces or [])
+    if config.COLLECTION_LAYOUT!='per_namespace': return {config.COLLECTION_NAME:namespaces}
+    out:Dict[str,List[str]]={}
+    for ns in namespaces: out.setdefault(name_for(ns),[]).append(ns)
+    return out
+
+def is_not_found(exc:Exception)->bool:
+    if isinstance(exc, UnexpectedResponse): return exc.status_code==404
+    code=getattr(exc,'code',None)
+    return callable(code) and getattr(code(),'name','')=='NOT_FOUND'
+
+def is_conflict(exc:Exception)->bool:
+    return isinstance(exc, UnexpectedResponse) and exc.status_code==409
+
+def ensure_payload_indexes(client, name:str, existing:Iterable[str]=()):
+    """Keyword indexes on namespace/source so filtered HNSW search stays fast as the collection grows."""
+    for field in PAYLOAD_INDEXES:
+        if field not in existing: client.create_payload_index(collection_name=name, field_name=field, field_schema=PayloadSchemaType.KEYWORD)
+
+async def aensure_payload_indexes(client, name:str, existing:Iterable[str]=()):
+    for field in PAYLOAD_INDEXES:
+        if field not in existing: await client.create_payload_index(collection_name=name, field_name=field, field_schema=PayloadSchemaType.KEYWORD)
+
+def ensure(client, name:str, size:int):
+    """Create `name` if missing and make sure its payload indexes exist. Never drops data."""
+    existing=()
+    if client.collection_exists(name): existing=(client.get_collection(name).payload_schema or {}).keys()
+    else:
+        try: client.create_collection(collection_name=name, **create_kwargs(size))
+        except Exception as e:
+            if not is_conflict(e): raise
+    ensure_payload_indexes(client, name, existing)
+
+async def aensure(client, name:str, size:int):
+    existing=()
+    if await client.collection_exists(name): existing=((await client.get_collection(name)).payload_schema or {}).keys()
+    else:
+        try: await client.create_collection(collection_name=name, **create_kwargs(size))
+        except Exception as e:
+            if not is_conflict(e): raise
+    await aensure_payload_indexes(client, name, existing)
+
+def managed_names(client)->List[str]:
+    """Existing collections that belong to this deployment under the configured layout."""
+    names=[c.name for c in client.get_collections().collections]
+    if config.COLLECTION_LAYOUT!='per_namespace': return [n for n in names if n==config.COLLECTION_NAME]
+    return [n for n in names if is_routed(n)]
+
+async def amanaged_names(client)->List[str]:
+    names=[c.name for c in (await client.get_collections()).collections]
+    if config.COLLECTION_LAYOUT!='per_namespace': return [n for n in names if n==config.COLLECTION_NAME]
+    return [n for n in names if is_routed(n)]
@@ -1,4 +1,4 @@
-import os
+import json, os
 from dotenv import load_dotenv
 load_dotenv()
 MONGO_URI=os.getenv('MONGO_URI','mongodb://localhost:27017/agent_mvp')
@@ -11,3 +11,88 @@ OPENROUTER_API_KEY=os.getenv('OPENROUTER_API_KEY','')
 OPENAI_API_KEY=os.getenv('OPENAI_API_KEY','')
 LOG_LEVEL=os.getenv('LOG_LEVEL','INFO')
 COLLECTION_NAME=os.getenv('COLLECTION_NAME','docs')
+OPENAI_BASE_URL=os.getenv('OPENAI_BASE_URL','https://api.openai.com/v1')
+OPENROUTER_BASE_URL=os.getenv('OPENROUTER_BASE_URL','https://openrouter.ai/api/v1')
+EMBED_BATCH_SIZE=int(os.getenv('EMBED_BATCH_SIZE','128'))
+EMBED_MAX_CONCURRENCY=int(os.getenv('EMBED_MAX_CONCURRENCY','4'))
+EMBED_MAX_RETRIES=int(os.getenv('EMBED_MAX_RETRIES','4'))
+EMBED_BACKOFF=float(os.getenv('EMBED_BACKOFF','0.5'))
+EMBED_TIMEOUT=float(os.getenv('EMBED_TIMEOUT','30'))
+EMBED_CACHE_SIZE=int(os.getenv('EMBED_CACHE_SIZE','4096'))
+EMBED_CACHE_REDIS=os.getenv('EMBED_CACHE_REDIS','1')=='1'
+EMBED_CACHE_TTL=int(os.getenv('EMBED_CACHE_TTL','604800'))
+EMBED_CACHE_DTYPE=os.getenv('EMBED_CACHE_DTYPE','float16')
+QDRANT_TIMEOUT=int(os.getenv('QDRANT_TIMEOUT','10'))
+QDRANT_PREFER_GRPC=os.getenv('QDRANT_PREFER_GRPC','0')=='1'
+RAG_BACKEND=os.getenv('RAG_BACKEND','qdrant')
+DATA_DIR=os.getenv('DATA_DIR',os.path.abspath(os.path.join(os.path.dirname(__file__),'..','data')))
+LOCAL_INDEX_DIR=os.getenv('LOCAL_INDEX_DIR',os.path.join(DATA_DIR,'index'))
+LOCAL_INDEX_RELOAD_SECS=float(os.getenv('LOCAL_INDEX_RELOAD_SECS','2'))
+RAG_MODE=os.getenv('RAG_MODE','vector')
+RAG_HYBRID_CANDIDATES=int(os.getenv('RAG_HYBRID_CANDIDATES','10'))
+RAG_RRF_K=int(os.getenv('RAG_RRF_K','60'))
+RAG_BATCH_MAX=int(os.getenv('RAG_BATCH_MAX','256'))
+QDRANT_HNSW_M=int(os.getenv('QDRANT_HNSW_M','16'))
+QDRANT_HNSW_EF_CONSTRUCT=int(os.getenv('QDRANT_HNSW_EF_CONSTRUCT','100'))
+QDRANT_HNSW_EF=int(os.getenv('QDRANT_HNSW_EF','64'))
+QDRANT_QUANTIZATION=os.getenv('QDRANT_QUANTIZATION','none')
+QDRANT_QUANT_QUANTILE=float(os.getenv('QDRANT_QUANT_QUANTILE','0.99'))
+QDRANT_QUANT_ALWAYS_RAM=os.getenv('QDRANT_QUANT_ALWAYS_RAM','1')=='1'
+QDRANT_QUANT_RESCORE=os.getenv('QDRANT_QUANT_RESCORE','1')=='1'
+QDRANT_QUANT_OVERSAMPLING=float(os.getenv('QDRANT_QUANT_OVERSAMPLING','2.0'))
+QDRANT_VECTORS_ON_DISK=os.getenv('QDRANT_VECTORS_ON_DISK','0')=='1'
+QDRANT_PAYLOAD_ON_DISK=os.getenv('QDRANT_PAYLOAD_ON_DISK','0')=='1'
+COLLECTION_LAYOUT=os.getenv('COLLECTION_LAYOUT','single')
+INGEST_MANIFEST=os.getenv('INGEST_MANIFEST',os.path.join(DATA_DIR,'ingest_manifest.json'))
+INGEST_WORKERS=int(os.getenv('INGEST_WORKERS','4'))
+INGEST_BATCH_SIZE=int(os.getenv('INGEST_BATCH_SIZE','64'))
+INGEST_QUEUE_SIZE=int(os.getenv('INGEST_QUEUE_SIZE','8'))
+INGEST_CHECKPOINT_SECS=float(os.getenv('INGEST_CHECKPOINT_SECS','30'))
+INGEST_CHECKPOINT_CHUNKS=int(os.getenv('INGEST_CHECKPOINT_CHUNKS','5000'))
+INGEST_REPORT_SECS=float(os.getenv('INGEST_REPORT_SECS','5'))
+CHUNK_TOKENS=int(os.getenv('CHUNK_TOKENS','160'))
+CHUNK_OVERLAP=int(os.getenv('CHUNK_OVERLAP','24'))
+CHUNK_MMAP_BYTES=int(os.getenv('CHUNK_MMAP_BYTES',str(8<<20)))
+INGEST_DEDUPE=os.getenv('INGEST_DEDUPE','0')=='1'
+DEDUPE_DIR=os.getenv('DEDUPE_DIR',os.path.join(DATA_DIR,'dedupe'))
+DEDUPE_THRESHOLD=float(os.getenv('DEDUPE_THRESHOLD','0.85'))
+DEDUPE_PERMS=int(os.getenv('DEDUPE_PERMS','128'))
+DEDUPE_BANDS=int(os.getenv('DEDUPE_BANDS','32'))
+DEDUPE_SHINGLE=int(os.getenv('DEDUPE_SHINGLE','3'))
+RAG_CACHE_SIZE=int(os.getenv('RAG_CACHE_SIZE','1024'))
+RAG_CACHE_TTL=float(os.getenv('RAG_CACHE_TTL','300'))
+RAG_GENERATION_FILE=os.getenv('RAG_GENERATION_FILE',os.path.join(DATA_DIR,'generation'))
+WATCH_DEBOUNCE_SECS=float(os.getenv('WATCH_DEBOUNCE_SECS','1.0'))
+WATCH_POLL_SECS=float(os.getenv('WATCH_POLL_SECS','1.0'))
+WATCH_BACKEND=os.getenv('WATCH_BACKEND','auto')
+SNAPSHOT_DTYPE=os.getenv('SNAPSHOT_DTYPE','float16')
+SNAPSHOT_BLOCK=int(os.getenv('SNAPSHOT_BLOCK','65536'))
+SNAPSHOT_UPSERT_BATCH=int(os.getenv('SNAPSHOT_UPSERT_BATCH','1024'))
+ORCH_DEADLINE_MS=float(os.getenv('ORCH_DEADLINE_MS','5000'))
+TOOL_TIMEOUT_MS=float(os.getenv('TOOL_TIMEOUT_MS','2000'))
+TOOL_TIMEOUTS={k:float(v) for k,v in json.loads(os.getenv('TOOL_TIMEOUTS','{}') or '{}').items()}
+TOOL_REQUIRED={t.strip() for t in os.getenv('TOOL_REQUIRED','').split(',') if t.strip()}
+INTENT_ROUTING=os.getenv('INTENT_ROUTING','1')=='1'
+INTENT_MIN_SCORE=float(os.getenv('INTENT_MIN_SCORE','0.35'))
+INTENT_SMALLTALK_TOKENS=int(os.getenv('INTENT_SMALLTALK_TOKENS','8'))
+ORCH_BATCH_MAX=int(os.getenv('ORCH_BATCH_MAX','1000'))
+SESSION_REDIS=os.getenv('SESSION_REDIS','1')=='1'
+SESSION_TTL=int(os.getenv('SESSION_TTL','1800'))
+SESSION_MAX_MESSAGES=int(os.getenv('SESSION_MAX_MESSAGES','12'))
+SESSION_SUMMARY_CHARS=int(os.getenv('SESSION_SUMMARY_CHARS','2000'))
+SESSION_MEMORY_SIZE=int(os.getenv('SESSION_MEMORY_SIZE','10000'))
+REPLY_CACHE_SIZE=int(os.getenv('REPLY_CACHE_SIZE','512'))
+REPLY_CACHE_THRESHOLD=float(os.getenv('REPLY_CACHE_THRESHOLD','0.92'))
+REPLY_CACHE_TTL=float(os.getenv('REPLY_CACHE_TTL','600'))
+SINGLEFLIGHT=os.getenv('SINGLEFLIGHT','1')=='1'
+RESILIENCE=os.getenv('RESILIENCE','1')=='1'
+BREAKER_FAILURES=int(os.getenv('BREAKER_FAILURES','5'))
+BREAKER_COOLDOWN_SECS=float(os.getenv('BREAKER_COOLDOWN_SECS','10'))
+BREAKER_HALF_OPEN_PROBES=int(os.getenv('BREAKER_HALF_OPEN_PROBES','1'))
+ADAPTIVE_TIMEOUT_WINDOW=int(os.getenv('ADAPTIVE_TIMEOUT_WINDOW','200'))
+ADAPTIVE_TIMEOUT_MIN_SAMPLES=int(os.getenv('ADAPTIVE_TIMEOUT_MIN_SAMPLES','20'))
+ADAPTIVE_TIMEOUT_PERCENTILE=float(os.getenv('ADAPTIVE_TIMEOUT_PERCENTILE','99'))
+ADAPTIVE_TIMEOUT_FACTOR=float(os.getenv('ADAPTIVE_TIMEOUT_FACTOR','2.0'))
+ADAPTIVE_TIMEOUT_FLOOR_MS=float(os.getenv('ADAPTIVE_TIMEOUT_FLOOR_MS','50'))
+REDIS_TIMEOUT=float(os.getenv('REDIS_TIMEOUT','0.25'))
+MONGO_TIMEOUT=float(os.getenv('MONGO_TIMEOUT','3'))
@@ -0,0 +1,110 @@
+"""MinHash/LSH near-duplicate detection for ingest.
+
+Each chunk gets a MinHash signature over word shingles; LSH banding turns the signatures into bucket keys so a
+lookup only compares against chunks that share a band, and a candidate counts as a duplicate when the estimated
+Jaccard similarity reaches DEDUPE_THRESHOLD. The index is per namespace and reference-counts the (source, chunk)
+pairs that point at each canonical chunk, so a point survives until the last chunk carrying its text goes away.
+"""
+import io, json, os, threading, zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from . import config
+from .lexical import tokenize
+
+_PRIME=np.uint64(4294967311)
+
+def _perms(n:int, seed:int=1)->Tuple[np.ndarray,np.ndarray]:
+    rng=np.random.default_rng(seed)
+    return rng.integers(1,1<<32,n,dtype=np.uint64), rng.integers(0,1<<32,n,dtype=np.uint64)
+
+def shingles(text:str, size:int=3)->np.ndarray:
+    toks=tokenize(text)
+    grams={' '.join(toks[i:i+size]) for i in range(max(1,len(toks)-size+1))} if toks else set()
+    return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams),dtype=np.uint64,count=len(grams))
+
+def minhash(text:str, num_perm:Optional[int]=None, size:Optional[int]=None)->np.ndarray:
+    """uint64 signature; a*x stays below 2**64 because both factors are below 2**32."""
+    a,b=_perms(num_perm or config.DEDUPE_PERMS)
+    x=shingles(text,size or config.DEDUPE_SHINGLE)
+    if not len(x): return np.full(len(a),np.iinfo(np.uint64).max,dtype=np.uint64)
+    return (((a[:,None]*x[None,:])%_PRIME+b[:,None])%_PRIME).min(axis=1)
+
+def similarity(s1:np.ndarray, s2:np.ndarray)->float: return float(np.mean(s1==s2))
+
+class DedupeIndex:
+    def __init__(self, bands:Optional[int]=None, threshold:Optional[float]=None):
+        self.bands=bands or config.DEDUPE_BANDS; self.threshold=config.DEDUPE_THRESHOLD if threshold is None else threshold
+        self.sigs:Dict[str,np.ndarray]={}; self.refs:Dict[str,List[List[str]]]={}; self.dirty:Set[str]=set()
+        self.buckets:Dict[Tuple[int,bytes],Set[str]]=defaultdict(set); self.lock=threading.Lock()
+
+    def _keys(self, sig:np.ndarray)->Iterable[Tuple[int,bytes]]:
+        rows=max(1,len(sig)//self.bands)
+        return ((band,sig[band*rows:(band+1)*rows].tobytes()) for band in range(self.bands))
+
+    def find(self, sig:np.ndarray)->Optional[str]:
+        """Best canonical chunk at or above the threshold, if any."""
+        with self.lock:
+            cands=set().union(*(self.buckets.get(key,()) for key in self._keys(sig)))
+            best=max(((similarity(sig,self.sigs[pid]),pid) for pid in cands),default=(0.0,None))
+        return best[1] if best[0]>=self.threshold else None
+
+    def add(self, pid:str, sig:np.ndarray, source:str):
+        with self.lock:
+            if pid not in self.sigs:
+                self.sigs[pid]=sig
+                for key in self._keys(sig): self.buckets[key].add(pid)
+        self.ref(pid,source,pid)
+
+    @staticmethod
+    def _sources(refs:List[List[str]])->List[str]: return list(dict.fromkeys(src for src,_ in refs))
+
+    def ref(self, pid:str, source:str, chunk:str):
+        """Record that chunk `chunk` of `source` is served by canonical point `pid`."""
+        with self.lock:
+            refs=self.refs.setdefault(pid,[])
+            if [source,chunk] not in refs: refs.append([source,chunk]); self.dirty.add(pid)
+
+    def unref(self, pid:str, source:str, chunk:str)->List[str]:
+        """Drop one (source, chunk) reference; returns the sources still referencing `pid` (empty: delete it)."""
+        with self.lock:
+            refs=self.refs.get(pid)
+            if refs is None: return []
+            if [source,chunk] in refs: refs.remove([source,chunk]); self.dirty.add(pid)
+            if refs: return self._sources(refs)
+            del self.refs[pid]; self.dirty.discard(pid)
+            for key in self._keys(self.sigs.pop(pid)): self.buckets[key].discard(pid)
+            return []
+
+    def take_dirty(self)->Dict[str,List[str]]:
+        """Sources of the canonical chunks whose references changed since the last call."""
+        with self.lock:
+            out={pid:self._sources(self.refs[pid]) for pid in self.dirty if pid in self.refs}; self.dirty.clear()
+        return out
+
+    def __len__(self): return len(self.sigs)
+
+    @staticmethod
+    def path_for(ns:str)->str: return os.path.join(config.DEDUPE_DIR,ns.replace('/','__')+'.npz')
+
+    def save(self, path:str):
+        os.makedirs(os.path.dirname(path) or '.',exist_ok=True)
+        with self.lock:
+            ids=list(self.sigs); sigs=np.stack([self.sigs[i] for i in ids]) if ids else np.zeros((0,config.DEDUPE_PERMS),dtype=np.uint64)
+            meta=json.dumps({'bands':self.bands,'threshold':self.threshold,'refs':self.refs,'dirty':sorted(self.dirty)})
+        buf=io.BytesIO(); np.savez(buf,ids=np.asarray(ids,dtype=str),sigs=sigs,meta=np.asarray(meta))
+        tmp=f'{path}.{os.getpid()}.tmp'
+        with open(tmp,'wb') as f: f.write(buf.getvalue())
+        os.replace(tmp,path)
+
+    @classmethod
+    def load(cls, path:str)->Optional['DedupeIndex']:
+        try: z=np.load(path)
+        except FileNotFoundError: return None
+        with z:
+            meta=json.loads(str(z['meta'])); idx=cls(meta['bands'],meta['threshold'])
+            for pid,sig in zip(z['ids'].tolist(),z['sigs']):
+                idx.sigs[pid]=sig
+                for key in idx._keys(sig): idx.buckets[key].add(pid)
+        idx.refs=meta['refs']; idx.dirty=set(meta['dirty'])
+        return idx
@@ -0,0 +1,98 @@
+"""Two-tier embedding cache: bounded in-process LRU in front of an optional Redis tier."""
+import hashlib, threading, time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from . import resilience
+
+def normalize(text:str)->str: return ' '.join(text.split())
+
+def cache_key(provider:str, model:str, dim:int, text:str)->str:
+    digest=hashlib.sha256(normalize(text).encode('utf-8')).hexdigest()
+    return f'emb:{provider}:{model}:{dim}:{digest}'
+
+class EmbeddingCache:
+    """LRU of float32 vectors; misses fall through to Redis, which stores raw float16/float32 bytes with a TTL.
+    `aredis_client` (redis.asyncio) backs the a*-methods used from async handlers. Redis failures are counted and the tier is skipped for `redis_cooldown` seconds (or while the shared redis circuit breaker is open) instead of failing the caller."""
+    def __init__(self, max_items:int=4096, redis_client=None, ttl:int=604800, dtype:str='float16', redis_cooldown:float=30.0, aredis_client=None):
+        self.max_items=max_items; self.redis=redis_client; self.aredis=aredis_client; self.ttl=ttl; self.dtype=np.dtype(dtype)
+        self.redis_cooldown=redis_cooldown; self._redis_down_until=0.0
+        self._lru:'OrderedDict[str,np.ndarray]'=OrderedDict(); self._lock=threading.Lock()
+        self.hits=0; self.redis_hits=0; self.misses=0; self.redis_errors=0
+
+    def _redis_ok(self)->bool: return self.redis is not None and time.monotonic()>=self._redis_down_until and resilience.breaker('redis').available()
+
+    def _redis_failed(self):
+        self.redis_errors+=1; self._redis_down_until=time.monotonic()+self.redis_cooldown
+
+    def _remember(self, key:str, vec:np.ndarray):
+        self._lru[key]=vec; self._lru.move_to_end(key)
+        while len(self._lru)>self.max_items: self._lru.popitem(last=False)
+
+    def _local(self, keys:Sequence[str]):
+        out:List[Optional[np.ndarray]]=[None]*len(keys); missing=[]
+        with self._lock:
+            for i,k in enumerate(keys):
+                v=self._lru.get(k)
+                if v is None: missing.append(i)
+                else: self._lru.move_to_end(k); out[i]=v; self.hits+=1
+        return out, missing
+
+    def _absorb(self, keys:Sequence[str], out:list, missing:List[int], raw:Sequence[Optional[bytes]]):
+        still=[]
+        with self._lock:
+            for i,b in zip(missing,raw):
+                if b is None: still.append(i); continue
+                v=np.frombuffer(b,dtype=self.dtype).astype(np.float32); out[i]=v
+                self._remember(keys[i],v); self.redis_hits+=1
+            self.misses+=len(still)
+        return out
+
+    def _encode(self, keys:Sequence[str], vecs:Sequence[Sequence[float]]):
+        arrs=[np.asarray(v,dtype=np.float32) for v in vecs]
+        with self._lock:
+            for k,v in zip(keys,arrs): self._remember(k,v)
+        return [(k,v.astype(self.dtype).tobytes()) for k,v in zip(keys,arrs)]
+
+    def get_many(self, keys:Sequence[str])->List[Optional[np.ndarray]]:
+        out,missing=self._local(keys); raw=[None]*len(missing)
+        if missing and self._redis_ok():
+            try: raw=resilience.call('redis', lambda: self.redis.mget([keys[i] for i in missing]))
+            except Exception: self._redis_failed()
+        return self._absorb(keys,out,missing,raw)
+
+    def put_many(self, keys:Sequence[str], vecs:Sequence[Sequence[float]]):
+        blobs=self._encode(keys,vecs)
+        if blobs and self._redis_ok():
+            try:
+                pipe=self.redis.pipeline(transaction=False)
+                for k,b in blobs: pipe.set(k,b,ex=self.ttl)
+                resilience.call('redis', pipe.execute)
+            except Exception: self._redis_failed()
+
+    async def aget_many(self, keys:Sequence[str])->List[Optional[np.ndarray]]:
+        """Like get_many, but the Redis tier goes through the asyncio client so the event loop never blocks."""
+        out,missing=self._local(keys); raw=[None]*len(missing)
+        if missing and self.aredis is not None and self._redis_ok():
+            try: raw=await resilience.acall('redis', lambda: self.aredis.mget([keys[i] for i in missing]))
+            except Exception: self._redis_failed()
+        return self._absorb(keys,out,missing,raw)
+
+    async def aput_many(self, keys:Sequence[str], vecs:Sequence[Sequence[float]]):
+        blobs=self._encode(keys,vecs)
+        if blobs and self.aredis is not None and self._redis_ok():
+            try:
+                pipe=self.aredis.pipeline(transaction=False)
+                for k,b in blobs: pipe.set(k,b,ex=self.ttl)
+                await resilience.acall('redis', pipe.execute)
+            except Exception: self._redis_failed()
+
+    def stats(self)->Dict[str,object]:
+        with self._lock:
+            lookups=self.hits+self.redis_hits+self.misses
+            return {'size':len(self._lru),'max_items':self.max_items,'hits':self.hits,'redis_hits':self.redis_hits,
+                    'misses':self.misses,'redis_errors':self.redis_errors,'redis_enabled':self.redis is not None,
+                    'hit_rate':round((self.hits+self.redis_hits)/lookups,4) if lookups else 0.0}
+
+    def clear(self):
+        with self._lock: self._lru.clear()
@@ -0,0 +1,112 @@
+"""Pooled, batching HTTP client for OpenAI-compatible /embeddings endpoints (OpenAI, OpenRouter)."""
+import asyncio, random, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+import httpx
+from . import config
+
+RETRY_STATUS={429,500,502,503,504}
+
+class EmbeddingError(RuntimeError): pass
+
+class EmbeddingClient:
+    """Packs inputs into requests of up to `batch_size`, runs at most `max_concurrency` requests at once
+    over one keep-alive session, retries 429/5xx with exponential backoff and returns vectors in input order."""
+    def __init__(self, base_url:str, api_key:str, model:str, batch_size:int=128, max_concurrency:int=4,
+                 max_retries:int=4, backoff:float=0.5, timeout:float=30.0):
+        self.url=base_url.rstrip('/')+'/embeddings'; self.model=model
+        self.batch_size=max(1,batch_size); self.max_concurrency=max(1,max_concurrency)
+        self.max_retries=max(0,max_retries); self.backoff=backoff; self.timeout=timeout
+        self.session=requests.Session()
+        self.session.headers.update({'Authorization':f'Bearer {api_key}','Content-Type':'application/json'})
+        adapter=HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount('http://',adapter); self.session.mount('https://',adapter)
+        self.headers=dict(self.session.headers)
+        self._pool:Optional[ThreadPoolExecutor]=None; self._lock=threading.Lock()
+        self._aclient:Optional[httpx.AsyncClient]=None; self._asem:Optional[asyncio.Semaphore]=None
+
+    @classmethod
+    def from_config(cls, provider:str)->'EmbeddingClient':
+        if provider=='openrouter': base,key=config.OPENROUTER_BASE_URL,config.OPENROUTER_API_KEY
+        elif provider=='openai': base,key=config.OPENAI_BASE_URL,config.OPENAI_API_KEY
+        else: raise ValueError(f'unknown remote embedding provider: {provider}')
+        return cls(base,key,config.EMBEDDING_MODEL,batch_size=config.EMBED_BATCH_SIZE,max_concurrency=config.EMBED_MAX_CONCURRENCY,
+                   max_retries=config.EMBED_MAX_RETRIES,backoff=config.EMBED_BACKOFF,timeout=config.EMBED_TIMEOUT)
+
+    def _executor(self)->ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None: self._pool=ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='embed')
+            return self._pool
+
+    def _delay(self, attempt:int, resp)->float:
+        retry_after=resp.headers.get('Retry-After') if resp is not None else None
+        if retry_after:
+            try: return float(retry_after)
+            except ValueError: pass
+        return self.backoff*(2**attempt)*(0.5+random.random()/2)
+
+    def _parse(self, batch:List[str], payload:dict)->List[List[float]]:
+        data=sorted(payload['data'],key=lambda d:d.get('index',0))
+        if len(data)!=len(batch): raise EmbeddingError(f'expected {len(batch)} embeddings, got {len(data)}')
+        return [d['embedding'] for d in data]
+
+    def _post(self, batch:List[str])->List[List[float]]:
+        for attempt in range(self.max_retries+1):
+            resp=None
+            try:
+                resp=self.session.post(self.url,json={'model':self.model,'input':batch},timeout=self.timeout)
+                if resp.status_code not in RETRY_STATUS:
+                    resp.raise_for_status(); return self._parse(batch,resp.json())
+                err=EmbeddingError(f'HTTP {resp.status_code} from {self.url}')
+            except (requests.ConnectionError, requests.Timeout) as e:
+                err=e
+            if attempt<self.max_retries: time.sleep(self._delay(attempt,resp))
+        raise err
+
+    def embed(self, texts:List[str])->List[List[float]]:
+        texts=list(texts)
+        batches=[texts[i:i+self.batch_size] for i in range(0,len(texts),self.batch_size)]
+        if len(batches)<=1: return self._post(batches[0]) if batches else []
+        out=[]
+        for vecs in self._executor().map(self._post,batches): out.extend(vecs)
+        return out
+
+    def _async_client(self)->httpx.AsyncClient:
+        if self._aclient is None:
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            self._aclient=httpx.AsyncClient(headers=self.headers, timeout=self.timeout, limits=limits)
+            self._asem=asyncio.Semaphore(self.max_concurrency)
+        return self._aclient
+
+    async def _apost(self, batch:List[str])->List[List[float]]:
+        client=self._async_client()
+        async with self._asem:
+            for attempt in range(self.max_retries+1):
+                resp=None
+                try:
+                    resp=await client.post(self.url,json={'model':self.model,'input':batch})
+                    if resp.status_code not in RETRY_STATUS:
+                        resp.raise_for_status(); return self._parse(batch,resp.json())
+                    err=EmbeddingError(f'HTTP {resp.status_code} from {self.url}')
+                except httpx.TransportError as e:
+                    err=e
+                if attempt<self.max_retries: await asyncio.sleep(self._delay(attempt,resp))
+            raise err
+
+    async def aembed(self, texts:List[str])->List[List[float]]:
+        """Async twin of `embed` on a pooled httpx.AsyncClient; batches run concurrently up to `max_concurrency`."""
+        texts=list(texts)
+        batches=[texts[i:i+self.batch_size] for i in range(0,len(texts),self.batch_size)]
+        out=[]
+        for vecs in await asyncio.gather(*(self._apost(b) for b in batches)): out.extend(vecs)
+        return out
+
+    async def aclose(self):
+        if self._aclient is not None: await self._aclient.aclose(); self._aclient=None
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None: self._pool.shutdown(wait=False); self._pool=None
+        self.session.close()
@@ -1,29 +1,113 @@
-import hashlib, math, requests
-from typing import List
-from . import config
+import hashlib, threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from . import config, resilience
+from .embed_client import EmbeddingClient
+from .embed_cache import EmbeddingCache, cache_key
+from .singleflight import GROUP
 DIM=config.EMBED_DIM
 
-def _hash_token(t:str)->int: return int(hashlib.sha256(t.encode('utf-8')).hexdigest(),16)
+def _hash_token(t:str)->int: return int.from_bytes(hashlib.sha256(t.encode('utf-8')).digest(),'big')
 
-def _hash_embed(text:str, dim:int=DIM)->List[float]:
-    vec=[0.0]*dim
-    toks=text.lower().split()
-    if not toks: return vec
-    for tok in toks:
-        h=_hash_token(tok); idx=h%dim; val=((h>>8)%1000)/1000.0
-        vec[idx]+=val
-    norm=math.sqrt(sum(v*v for v in vec)) or 1.0
-    return [v/norm for v in vec]
+@lru_cache(maxsize=1<<16)
+def _token_slot(tok:str, dim:int)->Tuple[int,float]:
+    """(bucket, weight) for one token; cached since vocabularies repeat heavily across texts."""
+    h=_hash_token(tok); return h%dim, ((h>>8)%1000)/1000.0
 
-def embed_text(text:str)->List[float]:
+def _hash_embed_batch(texts:List[str], dim:int=DIM)->np.ndarray:
+    """Hash-embed a batch into one (len(texts), dim) float32 matrix with L2-normalized rows."""
+    rows=[]; cols=[]; vals=[]
+    for i,text in enumerate(texts):
+        for tok in text.lower().split():
+            j,v=_token_slot(tok,dim); rows.append(i); cols.append(j); vals.append(v)
+    n=len(texts)
+    if not rows: return np.zeros((n,dim),dtype=np.float32)
+    flat=np.asarray(rows,dtype=np.int64)*dim+np.asarray(cols,dtype=np.int64)
+    mat=np.bincount(flat,weights=vals,minlength=n*dim).reshape(n,dim)
+    norms=np.linalg.norm(mat,axis=1,keepdims=True); norms[norms==0]=1.0
+    return (mat/norms).astype(np.float32)
+
+def _hash_embed(text:str, dim:int=DIM)->List[float]: return _hash_embed_batch([text],dim)[0].tolist()
+
+_REMOTE:Dict[str,EmbeddingClient]={}; _REMOTE_LOCK=threading.Lock()
+
+def remote_client(provider:str)->EmbeddingClient:
+    """Process-wide pooled client per remote provider."""
+    with _REMOTE_LOCK:
+        if provider not in _REMOTE: _REMOTE[provider]=EmbeddingClient.from_config(provider)
+        return _REMOTE[provider]
+
+_CACHE:Optional[EmbeddingCache]=None; _CACHE_LOCK=threading.Lock()
+
+async def aclose():
+    """Release pooled provider connections (lifespan shutdown)."""
+    with _REMOTE_LOCK: clients=list(_REMOTE.values()); _REMOTE.clear()
+    for c in clients: await c.aclose(); c.close()
+
+def get_cache()->Optional[EmbeddingCache]:
+    """Process-wide embedding cache, or None when EMBED_CACHE_SIZE is 0."""
+    global _CACHE
+    if config.EMBED_CACHE_SIZE<=0: return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            rc=arc=None
+            if config.EMBED_CACHE_REDIS:
+                import redis, redis.asyncio
+                rc=redis.from_url(config.REDIS_URL, socket_timeout=config.REDIS_TIMEOUT, socket_connect_timeout=config.REDIS_TIMEOUT)
+                arc=redis.asyncio.from_url(config.REDIS_URL, socket_timeout=config.REDIS_TIMEOUT, socket_connect_timeout=config.REDIS_TIMEOUT)
+            _CACHE=EmbeddingCache(config.EMBED_CACHE_SIZE, rc, config.EMBED_CACHE_TTL, config.EMBED_CACHE_DTYPE, aredis_client=arc)
+        return _CACHE
+
+def _model_id(prov:str)->str: return config.EMBEDDING_MODEL if prov in ('openrouter','openai') else 'hash'
+
+def _embed_uncached(texts:List[str])->List[List[float]]:
     prov=config.EMBED_PROVIDER
-    if prov=='hash': return _hash_embed(text,DIM)
-    if prov=='openrouter':
-        import requests
-        url='https://openrouter.ai/api/v1/embeddings'; headers={'Authorization':f'Bearer {config.OPENROUTER_API_KEY}'}; payload={'model':config.EMBEDDING_MODEL,'input':text}
-        r=requests.post(url,headers=headers,json=payload,timeout=30); r.raise_for_status(); return r.json()['data'][0]['embedding']
-    if prov=='openai':
-        import requests
-        url='https://api.openai.com/v1/embeddings'; headers={'Authorization':f'Bearer {config.OPENAI_API_KEY}'}; payload={'model':config.EMBEDDING_MODEL,'input':text}
-        r=requests.post(url,headers=headers,json=payload,timeout=30); r.raise_for_status(); return r.json()['data'][0]['embedding']
-    return _hash_embed(text,DIM)
+    if prov in ('openrouter','openai'): return resilience.call('embedding', lambda: remote_client(prov).embed(texts), batch=len(texts)>1)
+    return _hash_embed_batch(texts,DIM).tolist()
+
+def embed_texts(texts:List[str], use_cache:bool=True)->List[List[float]]:
+    """Embed a batch of texts, preserving input order. Cached vectors are reused and only misses
+    (deduplicated within the batch) reach the provider; identical concurrent misses share one provider call."""
+    texts=list(texts)
+    if not texts: return []
+    cache=get_cache() if use_cache else None
+    if cache is None: return _embed_uncached(texts)
+    prov=config.EMBED_PROVIDER
+    keys=[cache_key(prov,_model_id(prov),DIM,t) for t in texts]
+    found=cache.get_many(keys)
+    todo:Dict[str,str]={}
+    for k,t,v in zip(keys,texts,found):
+        if v is None: todo.setdefault(k,t)
+    if todo:
+        fresh=dict(zip(todo.keys(),GROUP.do(('embed',)+tuple(todo),lambda: _embed_uncached(list(todo.values())))))
+        cache.put_many(list(fresh.keys()),list(fresh.values()))
+        found=[fresh[k] if v is None else v for k,v in zip(keys,found)]
+    return [v.tolist() if isinstance(v,np.ndarray) else list(v) for v in found]
+
+def embed_text(text:str)->List[float]: return embed_texts([text])[0]
+
+async def _aembed_uncached(texts:List[str])->List[List[float]]:
+    prov=config.EMBED_PROVIDER
+    if prov in ('openrouter','openai'): return await resilience.acall('embedding', lambda: remote_client(prov).aembed(texts), batch=len(texts)>1)
+    return _hash_embed_batch(texts,DIM).tolist()
+
+async def aembed_texts(texts:List[str], use_cache:bool=True)->List[List[float]]:
+    """Async twin of `embed_texts`: remote providers and the Redis cache tier are awaited, never blocking the loop."""
+    texts=list(texts)
+    if not texts: return []
+    cache=get_cache() if use_cache else None
+    if cache is None: return await _aembed_uncached(texts)
+    prov=config.EMBED_PROVIDER
+    keys=[cache_key(prov,_model_id(prov),DIM,t) for t in texts]
+    found=await cache.aget_many(keys)
+    todo:Dict[str,str]={}
+    for k,t,v in zip(keys,texts,found):
+        if v is None: todo.setdefault(k,t)
+    if todo:
+        fresh=dict(zip(todo.keys(),await GROUP.ado(('embed',)+tuple(todo),lambda: _aembed_uncached(list(todo.values())))))
+        await cache.aput_many(list(fresh.keys()),list(fresh.values()))
+        found=[fresh[k] if v is None else v for k,v in zip(keys,found)]
+    return [v.tolist() if isinstance(v,np.ndarray) else list(v) for v in found]
+
+async def aembed_text(text:str)->List[float]: return (await aembed_texts([text]))[0]
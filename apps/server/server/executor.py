@@ -0,0 +1,85 @@
+"""Dependency-aware concurrent tool execution for /orchestrate, with per-tool timeouts and a request deadline.
+
+Every step starts as soon as the steps named in its `deps` have finished, so independent tools overlap and
+only true dependencies wait. A step that times out or raises is *degraded*: its dependents are skipped and the
+request carries on, unless the tool is listed in TOOL_REQUIRED ('fail' policy), which aborts the run with
+ToolFailure. Sync tool functions run in the default thread pool; a timed-out thread is abandoned, not killed.
+"""
+import asyncio, inspect, time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from . import config
+
+@dataclass
+class Step:
+    name:str
+    run:Callable[[Dict[str, Any]], Awaitable[Any]]  # called with {dep name: dep value}; None means "not applicable"
+    deps:Tuple[str, ...]=()
+    input:Dict[str, Any]=field(default_factory=dict)
+    summary:Callable[[Any], Dict[str, Any]]=lambda value: {}
+    timeout:Optional[float]=None
+    policy:Optional[str]=None
+    after:Tuple[str, ...]=()  # waited for like deps, but their failure does not skip this step
+
+@dataclass
+class Outcome:
+    name:str
+    status:str  # ok | timeout | error | skipped
+    value:Any=None
+    elapsed_ms:float=0.0
+    error:str=''
+
+    @property
+    def degraded(self)->bool: return self.status in ('timeout', 'error')
+
+class ToolFailure(Exception):
+    def __init__(self, outcome:Outcome):
+        super().__init__(f'{outcome.name} {outcome.status}: {outcome.error}'.rstrip(': ')); self.outcome=outcome
+
+def timeout_for(name:str)->float: return float(config.TOOL_TIMEOUTS.get(name, config.TOOL_TIMEOUT_MS)) / 1000.0
+
+def policy_for(name:str)->str: return 'fail' if name in config.TOOL_REQUIRED else 'degrade'
+
+def deadline_in(ms:Optional[float]=None)->float:
+    return time.monotonic() + (config.ORCH_DEADLINE_MS if ms is None else ms) / 1000.0
+
+async def call(fn:Callable[..., Any], *args, **kwargs)->Any:
+    """Await `fn` if it is a coroutine function, otherwise run it off the event loop."""
+    if inspect.iscoroutinefunction(fn): return await fn(*args, **kwargs)
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+async def execute(steps:Sequence[Step], deadline:Optional[float]=None,
+                  on_done:Optional[Callable[[Step, Outcome], Awaitable[None]]]=None)->Dict[str, Outcome]:
+    """Run `steps` (dependencies must come first) and return their outcomes by name. Each step gets
+    min(its timeout, time left before `deadline`); `on_done` is awaited as each step finishes."""
+    deadline=deadline_in() if deadline is None else deadline
+    tasks:Dict[str, 'asyncio.Task[Outcome]']={}
+
+    async def run_one(step:Step)->Outcome:
+        deps:List[Outcome]=[await tasks[d] for d in step.deps if d in tasks]
+        after:List[Outcome]=[await tasks[d] for d in step.after if d in tasks]
+        start=time.monotonic()
+        if any(d.status != 'ok' for d in deps): out=Outcome(step.name, 'skipped')
+        else:
+            budget=max(0.0, min(step.timeout or timeout_for(step.name), deadline - start))
+            given={d.name: d.value for d in deps + after if d.status == 'ok'}
+            try: out=Outcome(step.name, 'ok', await asyncio.wait_for(step.run(given), budget))
+            except asyncio.TimeoutError: out=Outcome(step.name, 'timeout', error=f'no result within {budget * 1000:.0f}ms')
+            except Exception as e: out=Outcome(step.name, 'error', error=f'{type(e).__name__}: {e}')
+            out.elapsed_ms=round((time.monotonic() - start) * 1000, 1)
+        if out.degraded and (step.policy or policy_for(step.name)) == 'fail': raise ToolFailure(out)
+        if on_done is not None: await on_done(step, out)
+        return out
+
+    for step in steps: tasks[step.name]=asyncio.ensure_future(run_one(step))
+    try: await asyncio.gather(*tasks.values())
+    except BaseException:
+        for t in tasks.values(): t.cancel()
+        raise
+    return {name: t.result() for name, t in tasks.items()}
+
+def event_output(step:Step, out:Outcome)->Optional[Dict[str, Any]]:
+    """ToolEvent output for a finished step, or None when it did not apply (skipped or returned None)."""
+    if out.degraded: return {'degraded': True, 'reason': out.status, 'error': out.error, 'elapsed_ms': out.elapsed_ms}
+    if out.status != 'ok' or out.value is None: return None
+    return step.summary(out.value)
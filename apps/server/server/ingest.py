@@ -0,0 +1,280 @@
+"""Incremental, idempotent, streaming ingestion of a source tree into one namespace.
+
+Point IDs are deterministic (UUIDv5 of namespace, source, chunk index and chunk hash) and a JSON manifest records
+each file's hash and chunk IDs per namespace. A run re-embeds only new chunks, reuses vectors of chunks
+that merely moved, deletes chunks and files that disappeared, and never touches other namespaces.
+"""
+import hashlib, json, os, queue, threading, time, uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from qdrant_client.http.models import PointStruct, PointIdsList
+from . import config, collection
+from .chunking import SUPPORTED, chunk_file, file_sha, files_from_src, signature
+from .dedupe import DedupeIndex, minhash
+from .embedding import embed_texts
+from .lexical import BM25Index
+from .local_index import Journal, LocalIndex, merge
+
+POINT_NAMESPACE=uuid.UUID('6f1c3c52-5d4e-4b8e-9a51-0f6a1d2b7c90')
+
+def sha256(text:str)->str: return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def point_id(ns:str, source:str, index:int, chunk_sha:str)->str:
+    return str(uuid.uuid5(POINT_NAMESPACE, f'{ns}\x00{source}\x00{index}\x00{chunk_sha}'))
+
+def _under(source:str, src:str)->bool:
+    src=src.rstrip('/'); return source==src or source.startswith(src+'/')
+
+class Manifest:
+    """{namespace: {source: {'sha': file hash, 'chunks': [{'id', 'sha'}, ...]}}} persisted as JSON."""
+    def __init__(self, path:str, data:Optional[Dict[str,Any]]=None):
+        self.path=path; self.data=data or {'version':1,'namespaces':{}}
+
+    @classmethod
+    def load(cls, path:str)->'Manifest':
+        try:
+            with open(path,'r',encoding='utf-8') as f: return cls(path,json.load(f))
+        except FileNotFoundError: return cls(path)
+
+    def files(self, ns:str)->Dict[str,Dict[str,Any]]: return self.data['namespaces'].setdefault(ns,{})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.',exist_ok=True)
+        tmp=f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp,'w',encoding='utf-8') as f: json.dump(self.data,f)
+        os.replace(tmp,self.path)
+
+def plan_file(ns:str, source:str, sha:str, chunks:Iterable[Tuple[Optional[str],str]], old:Optional[Dict[str,Any]],
+              rewrite:bool=False)->Tuple[Dict[str,Any],List[Dict[str,Any]],List[str]]:
+    """(manifest entry, chunks to write, stale point ids) for one changed file; `rewrite` writes every chunk."""
+    old_ids={c['id'] for c in (old or {}).get('chunks',[])}
+    entry={'sha':sha,'chunker':signature(),'chunks':[]}; fresh=[]
+    for i,(section,chunk) in enumerate(chunks):
+        csha=sha256(chunk); pid=point_id(ns,source,i,csha)
+        entry['chunks'].append({'id':pid,'sha':csha})
+        if rewrite or pid not in old_ids:
+            payload={'text':chunk,'source':source,'namespace':ns,'chunk':i,'sha':csha}
+            if section: payload['section']=section
+            fresh.append({'id':pid,'sha':csha,'payload':payload})
+    keep={c['id'] for c in entry['chunks']}
+    return entry, fresh, sorted(old_ids-keep)
+
+def dedupe_file(dd:DedupeIndex, source:str, entry:Dict[str,Any], fresh:List[Dict[str,Any]],
+                old:Optional[Dict[str,Any]])->List[Dict[str,Any]]:
+    """Collapse near-duplicate chunks of one file onto canonical points: duplicates are recorded in the manifest
+    entry as {'dup': canonical id} and reference the canonical point instead of being written; returns the chunks
+    that still need a point of their own."""
+    prev={c['id']:c['dup'] for c in (old or {}).get('chunks',[]) if c.get('dup')}
+    by_id={c['id']:c for c in entry['chunks']}
+    for pid,canon in prev.items():
+        if pid in by_id: by_id[pid]['dup']=canon
+    write=[]
+    for c in fresh:
+        canon=prev.get(c['id'])
+        if canon is None and c['id'] not in dd.sigs:
+            sig=minhash(c['payload']['text']); canon=dd.find(sig)
+            if canon is None: dd.add(c['id'],sig,source)
+        if canon is not None: by_id[c['id']]['dup']=canon; dd.ref(canon,source,c['id']); continue
+        dd.ref(c['id'],source,c['id']); c['payload']['sources']=[source]; write.append(c)
+    return write
+
+def release(dd:Optional[DedupeIndex], source:str, chunks:Iterable[Dict[str,Any]])->List[str]:
+    """Point ids no longer referenced once `source` drops `chunks` (all of them without dedupe)."""
+    if dd is None: return [c['id'] for c in chunks]
+    out=[]
+    for c in chunks:
+        pid=c.get('dup') or c['id']
+        if not dd.unref(pid,source,c['id']) and pid not in out: out.append(pid)
+    return out
+
+def publish_local(base:Optional[LocalIndex], journal:Journal)->str:
+    """Merge the journal into a new local index version with rebuilt BM25 postings (once per run)."""
+    def lexical(vdir, payloads):
+        BM25Index.build([p.get('text','') for p in payloads],[p.get('namespace','') for p in payloads]).save(vdir)
+    return merge(config.LOCAL_INDEX_DIR, base, journal, extras=lexical)
+
+def bump_generation():
+    """Tell running servers that indexed content changed, so they drop cached search results."""
+    path=config.RAG_GENERATION_FILE; os.makedirs(os.path.dirname(path) or '.',exist_ok=True)
+    tmp=f'{path}.{os.getpid()}.tmp'
+    with open(tmp,'w',encoding='utf-8') as f: f.write(str(time.time_ns()))
+    os.replace(tmp,path)
+
+_DONE=object()
+
+class Throughput:
+    """Thread-safe chunk/byte counters with a periodic progress callback."""
+    def __init__(self, report:Optional[Callable[[Dict[str,Any]],None]]=None, every:float=5.0):
+        self.report=report; self.every=every; self.t0=self._last=time.monotonic()
+        self.chunks=0; self.bytes=0; self.files=0; self._lock=threading.Lock()
+
+    def add(self, chunks:int=0, nbytes:int=0, files:int=0):
+        with self._lock: self.chunks+=chunks; self.bytes+=nbytes; self.files+=files
+
+    def snapshot(self)->Dict[str,Any]:
+        with self._lock:
+            dt=max(time.monotonic()-self.t0,1e-9)
+            return {'files':self.files,'chunks':self.chunks,'bytes':self.bytes,'elapsed_s':round(dt,2),
+                    'chunks_per_s':round(self.chunks/dt,1),'bytes_per_s':round(self.bytes/dt,1)}
+
+    def tick(self):
+        if self.report is None or time.monotonic()-self._last<self.every: return
+        self._last=time.monotonic(); self.report(self.snapshot())
+
+def _put(q:'queue.Queue', item, stop:threading.Event)->bool:
+    while not stop.is_set():
+        try: q.put(item,timeout=0.1); return True
+        except queue.Full: pass
+    return False
+
+def _get(q:'queue.Queue', stop:threading.Event):
+    while not stop.is_set():
+        try: return q.get(timeout=0.1)
+        except queue.Empty: pass
+    return _DONE
+
+def ingest(ns:str, src:str, client=None, full:bool=False, workers:Optional[int]=None, batch_size:Optional[int]=None,
+           report:Optional[Callable[[Dict[str,Any]],None]]=None, dedupe:bool=False, paths:Optional[Iterable[str]]=None)->Dict[str,Any]:
+    """Sync `src` into namespace `ns` through a bounded streaming pipeline:
+    reader -> chunker -> `workers` embedding threads -> writer (batched upserts with wait=False).
+
+    `client` is a QdrantClient (None with RAG_BACKEND=local); `full` rewrites every chunk (IDs stay the same, so
+    this is still idempotent). The writer checkpoints completed files into the local index journal and the manifest
+    every INGEST_CHECKPOINT_SECS / INGEST_CHECKPOINT_CHUNKS, so an interrupted run resumes where it stopped; the
+    journal (including one left by an interrupted run) is merged into a new local index version once at the end.
+    `dedupe` collapses near-duplicate chunks (MinHash/LSH) into one point whose payload lists every source; it
+    stays on for a namespace once used, because its reference counts decide when shared points are deleted.
+    `paths` limits the run to those files under `src` (watch mode); a listed path that no longer exists is removed."""
+    workers=workers or config.INGEST_WORKERS; batch_size=batch_size or config.INGEST_BATCH_SIZE
+    manifest=Manifest.load(config.INGEST_MANIFEST); files=manifest.files(ns)
+    base=LocalIndex.load(config.LOCAL_INDEX_DIR)
+    if base is not None and base.dim!=config.EMBED_DIM: base=None
+    journal=Journal(os.path.join(config.LOCAL_INDEX_DIR,'journal'), config.EMBED_DIM)
+    name=collection.name_for(ns)
+    if client is not None: collection.ensure(client, name, config.EMBED_DIM)
+    stats={'namespace':ns,'collection':name,'changed':0,'unchanged':0,'removed':0,'embedded':0,'reused':0,'deleted':0}
+    dd_path=DedupeIndex.path_for(ns); dd=DedupeIndex.load(dd_path) or (DedupeIndex() if dedupe else None)
+    if dd is not None: stats['duplicates']=0
+    tp=Throughput(report, config.INGEST_REPORT_SECS); stop=threading.Event(); errors:List[BaseException]=[]
+    q_files:'queue.Queue'=queue.Queue(config.INGEST_QUEUE_SIZE); q_batches:'queue.Queue'=queue.Queue(config.INGEST_QUEUE_SIZE)
+    q_out:'queue.Queue'=queue.Queue(config.INGEST_QUEUE_SIZE); seen=set()
+
+    def stage(fn):
+        def run():
+            try: fn()
+            except BaseException as e: errors.append(e); stop.set()
+        return threading.Thread(target=run, daemon=True)
+
+    targets=None if paths is None else sorted({p for p in paths if _under(p,src)})
+
+    def reader():
+        todo=files_from_src(src) if targets is None else (Path(p) for p in targets if Path(p).suffix.lower() in SUPPORTED and Path(p).is_file())
+        for fp in todo:
+            source=str(fp); seen.add(source); tp.add(nbytes=fp.stat().st_size)
+            if not _put(q_files,(source,fp),stop): return
+        _put(q_files,_DONE,stop)
+
+    def chunker():
+        batch=[]
+        while (item:=_get(q_files,stop)) is not _DONE:
+            source,fp=item; old=files.get(source); sha=file_sha(fp)
+            if old and old['sha']==sha and old.get('chunker')==signature() and not full:
+                stats['unchanged']+=1; tp.add(files=1); continue
+            reuse={c['sha']:c['id'] for c in (old or {}).get('chunks',[]) if not c.get('dup')}
+            entry,new,stale=plan_file(ns,source,sha,chunk_file(fp),old,rewrite=full); stats['changed']+=1
+            if dd is not None:
+                prev={c['id']:c for c in (old or {}).get('chunks',[])}
+                n=len(new); new=dedupe_file(dd,source,entry,new,old); stats['duplicates']+=n-len(new)
+                stale=release(dd,source,[prev[pid] for pid in stale])
+            if not _put(q_out,('file',source,entry,stale,len(new)),stop): return
+            for c in new:
+                c['reuse']=reuse.get(c['sha']); batch.append(c)
+                if len(batch)>=batch_size:
+                    if not _put(q_batches,batch,stop): return
+                    batch=[]
+        if batch: _put(q_batches,batch,stop)
+        for _ in range(workers): _put(q_batches,_DONE,stop)
+
+    def embedder():
+        while (batch:=_get(q_batches,stop)) is not _DONE:
+            vecs=[base.vector(c['reuse']) if base is not None and c['reuse'] else None for c in batch]
+            todo=[i for i,v in enumerate(vecs) if v is None]
+            for i,v in zip(todo,embed_texts([batch[i]['payload']['text'] for i in todo], use_cache=False)): vecs[i]=v
+            if not _put(q_out,('chunks',batch,vecs,len(batch)-len(todo)),stop): return
+        _put(q_out,_DONE,stop)
+
+    pending:Dict[str,Dict[str,Any]]={}; ready={'ids':[],'vecs':[],'payloads':[],'deletes':[],'patches':{},'entries':{}}
+    last_ckpt=[time.monotonic()]
+
+    def delete_points(ids:List[str]):
+        if client is not None and ids: client.delete(collection_name=name, points_selector=PointIdsList(points=ids), wait=False)
+        ready['deletes'].extend(ids); stats['deleted']+=len(ids)
+
+    def complete(source:str):
+        f=pending.pop(source); delete_points(f['stale']); ready['entries'][source]=f['entry']
+        ready['ids'].extend(f['ids']); ready['vecs'].extend(f['vecs']); ready['payloads'].extend(f['payloads']); tp.add(files=1)
+
+    def checkpoint(force:bool=False):
+        due=time.monotonic()-last_ckpt[0]>=config.INGEST_CHECKPOINT_SECS or len(ready['ids'])>=config.INGEST_CHECKPOINT_CHUNKS
+        if not (force or due) or not (ready['ids'] or ready['deletes'] or ready['patches'] or ready['entries']): return
+        journal.append(ready['ids'],ready['vecs'],ready['payloads'],ready['deletes'],ready['patches'])
+        files.update(ready['entries']); manifest.save()
+        if dd is not None: dd.save(dd_path)
+        for v in ready.values(): v.clear()
+        last_ckpt[0]=time.monotonic()
+
+    def sync_sources():
+        """Point each shared chunk's payload at its current sources (first one becomes `source`)."""
+        for pid,srcs in dd.take_dirty().items():
+            patch={'source':srcs[0],'sources':srcs}
+            if client is not None: client.set_payload(collection_name=name, payload=patch, points=[pid], wait=False)
+            ready['patches'][pid]=patch
+
+    def handle(item):
+        if item[0]=='file':
+            _,source,entry,stale,n=item
+            pending[source]={'entry':entry,'stale':stale,'left':n,'ids':[],'vecs':[],'payloads':[]}
+            if n==0: complete(source)
+            return
+        _,batch,vecs,reused=item
+        if client is not None:
+            client.upsert(collection_name=name, points=[PointStruct(id=c['id'],vector=v,payload=c['payload']) for c,v in zip(batch,vecs)], wait=False)
+        stats['reused']+=reused; stats['embedded']+=len(batch)-reused; tp.add(chunks=len(batch))
+        for c,v in zip(batch,vecs):
+            f=pending[c['payload']['source']]; f['ids'].append(c['id']); f['vecs'].append(v); f['payloads'].append(c['payload']); f['left']-=1
+            if f['left']==0: complete(c['payload']['source'])
+
+    def writer():
+        done=0
+        while done<workers:
+            item=_get(q_out,stop)
+            if item is _DONE:
+                if stop.is_set(): return
+                done+=1; continue
+            handle(item); checkpoint(); tp.tick()
+
+    def drain():
+        """After a failure, keep whatever finished before it so the next run resumes from there."""
+        while True:
+            try: item=q_out.get_nowait()
+            except queue.Empty: return
+            if item is not _DONE: handle(item)
+
+    threads=[stage(reader),stage(chunker)]+[stage(embedder) for _ in range(workers)]
+    for t in threads: t.start()
+    try: writer()
+    except BaseException as e: errors.append(e); stop.set()
+    for t in threads: t.join()
+    if errors:
+        try: drain()
+        except Exception: pass
+    gone=[] if errors else [s for s in (files if targets is None else [t for t in targets if t in files]) if _under(s,src) and s not in seen]
+    for source in gone: delete_points(release(dd,source,files.pop(source)['chunks'])); stats['removed']+=1
+    if dd is not None and not errors: sync_sources()
+    checkpoint(force=True)
+    if journal: stats['local_index']=publish_local(base,journal); journal.clear()
+    if errors: raise errors[0]
+    if gone: manifest.save()
+    if stats['changed'] or stats['removed']: bump_generation()
+    stats['throughput']=tp.snapshot()
+    return stats
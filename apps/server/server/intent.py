@@ -0,0 +1,88 @@
+"""Cheap intent routing for /orchestrate: decide which of a persona's tools a turn actually needs.
+
+Keyword rules run first (a turn made only of small-talk words needs no tools at all; otherwise every matched
+intent contributes its tools). Turns no rule matches fall back to the nearest intent centroid over the hash
+embedding, whose token slots are cached, so routing never calls the embedding provider. Below
+INTENT_MIN_SCORE the route is 'general' and every allowed tool runs, as before.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import numpy as np
+from . import config
+from .embedding import _hash_embed_batch
+from .lexical import tokenize
+
+# intent -> tools it needs (None: all of the persona's tools)
+TOOLS:Dict[str,Optional[FrozenSet[str]]]={
+    'smalltalk':frozenset(),
+    'account':frozenset({'crm.lookup','kyc.verify'}),
+    'knowledge':frozenset({'rag.search'}),
+    'budget':frozenset({'budget.analyze','rag.search'}),
+    'insights':frozenset({'rag.search'}),
+    'general':None,
+}
+SMALLTALK=frozenset('hi hello hey hiya yo thanks thank thx ty you so much very bye goodbye cheers ok okay cool great good '
+                    'morning afternoon evening night there nice awesome perfect yes no sure see later have a day'.split())
+KEYWORDS:Dict[str,FrozenSet[str]]={
+    'account':frozenset('balance balances transfer transfers deposit deposits withdraw withdrawal statement statements card '
+                        'cards transaction transactions overdraft payment payments verify verification identity'.split()),
+    'knowledge':frozenset('policy policies requirement requirements rule rules procedure procedures kyc fee fees rate rates '
+                          'hours document documents documentation eligibility faq terms limit limits'.split()),
+    'budget':frozenset('budget budgets budgeting spending spend save saving savings cashflow expenses expense goal goals '
+                       'afford'.split()),
+    'insights':frozenset('insight insights report reports kpi kpis trend trends strategy nps metrics performance business '
+                         'revenue churn'.split()),
+}
+EXAMPLES:Dict[str,List[str]]={
+    'smalltalk':['hi there','thanks a lot','good morning','bye for now','how are you today'],
+    'account':['what is my account balance','show my recent transactions','i want to move money to savings',
+               'my card was declined','check my account'],
+    'knowledge':['what do i need to open an account','how do i reset my pin','which documents are required',
+                 'what are your opening hours','how does the process work'],
+    'budget':['help me plan my money','how much can i put aside each month','where is my money going',
+              'can i afford a new car'],
+    'insights':['show me the numbers for this quarter','how are our branches doing','summarize customer feedback',
+                'where can we cut costs'],
+}
+
+@dataclass(frozen=True)
+class Route:
+    intent:str
+    source:str  # rule | centroid | default
+    score:float=1.0
+    tools:Optional[FrozenSet[str]]=None
+    matched:Tuple[str,...]=field(default=())
+
+@lru_cache(maxsize=1)
+def _centroids()->Tuple[Tuple[str,...],np.ndarray]:
+    names=tuple(EXAMPLES); rows=[]
+    for name in names:
+        c=_hash_embed_batch(EXAMPLES[name]).mean(axis=0); n=np.linalg.norm(c); rows.append(c/n if n else c)
+    return names,np.stack(rows)
+
+def _union(intents)->Optional[FrozenSet[str]]:
+    out=set()
+    for i in intents:
+        if TOOLS[i] is None: return None
+        out|=TOOLS[i]
+    return frozenset(out)
+
+@lru_cache(maxsize=4096)
+def classify(text:str)->Route:
+    toks=tokenize(text)
+    if not toks: return Route('smalltalk','rule',tools=TOOLS['smalltalk'])
+    if len(toks)<=config.INTENT_SMALLTALK_TOKENS and all(t in SMALLTALK for t in toks):
+        return Route('smalltalk','rule',tools=TOOLS['smalltalk'])
+    hits={name:sum(t in words for t in toks) for name,words in KEYWORDS.items()}
+    matched=tuple(sorted((n for n,c in hits.items() if c),key=lambda n:(-hits[n],n)))
+    if matched: return Route(matched[0],'rule',tools=_union(matched),matched=matched)
+    names,mat=_centroids()
+    sims=mat@_hash_embed_batch([text])[0]; best=int(np.argmax(sims)); score=round(float(sims[best]),3)
+    if score<config.INTENT_MIN_SCORE: return Route('general','default',score,TOOLS['general'])
+    return Route(names[best],'centroid',score,TOOLS[names[best]])
+
+def route(text:str, allowed:List[str])->Tuple[Route,Optional[List[str]]]:
+    """(route, tool hint for the persona's plan); the hint is None when every tool should run."""
+    r=classify(text.strip())
+    return r,(None if r.tools is None else [t for t in allowed if t in r.tools])
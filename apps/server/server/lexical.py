@@ -0,0 +1,84 @@
+"""BM25 lexical index over the local index corpus, plus reciprocal rank fusion for hybrid retrieval.
+
+Postings are stored CSR-style: one `indptr` row per (namespace, term) pointing into flat `docs` (int32
+row ids into the local index) and `tfs` (uint16 term frequencies) arrays, so a namespace-scoped lookup
+only touches that namespace's postings.
+"""
+import json, math, os, re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+TOKEN_RE=re.compile(r'[a-z0-9]+')
+
+def tokenize(text:str)->List[str]: return TOKEN_RE.findall(text.lower())
+
+class BM25Index:
+    def __init__(self, k1:float=1.2, b:float=0.75):
+        self.k1=k1; self.b=b
+        self.terms:Dict[str,Dict[str,int]]={}; self.stats:Dict[str,Tuple[int,float]]={}
+        self.indptr=np.zeros(1,dtype=np.int64); self.docs=np.zeros(0,dtype=np.int32)
+        self.tfs=np.zeros(0,dtype=np.uint16); self.doc_len=np.zeros(0,dtype=np.float32)
+
+    @classmethod
+    def build(cls, texts:Sequence[str], namespaces:Sequence[str], k1:float=1.2, b:float=0.75)->'BM25Index':
+        idx=cls(k1,b); post:Dict[Tuple[str,str],List[Tuple[int,int]]]=defaultdict(list)
+        lens=np.zeros(len(texts),dtype=np.float32); totals:Dict[str,List[float]]=defaultdict(lambda:[0,0.0])
+        for row,(text,ns) in enumerate(zip(texts,namespaces)):
+            counts=Counter(tokenize(text)); dl=sum(counts.values()); lens[row]=dl
+            totals[ns][0]+=1; totals[ns][1]+=dl
+            for term,tf in counts.items(): post[(ns,term)].append((row,min(tf,65535)))
+        indptr=[0]; docs=[]; tfs=[]
+        for (ns,term),plist in post.items():
+            idx.terms.setdefault(ns,{})[term]=len(indptr)-1
+            docs.extend(r for r,_ in plist); tfs.extend(t for _,t in plist); indptr.append(len(docs))
+        idx.indptr=np.asarray(indptr,dtype=np.int64); idx.docs=np.asarray(docs,dtype=np.int32)
+        idx.tfs=np.asarray(tfs,dtype=np.uint16); idx.doc_len=lens
+        idx.stats={ns:(int(n),(tot/n) if n else 0.0) for ns,(n,tot) in totals.items()}
+        return idx
+
+    def save(self, vdir:str):
+        np.savez(os.path.join(vdir,'bm25.npz'),indptr=self.indptr,docs=self.docs,tfs=self.tfs,doc_len=self.doc_len)
+        with open(os.path.join(vdir,'bm25.json'),'w',encoding='utf-8') as f:
+            json.dump({'k1':self.k1,'b':self.b,'terms':self.terms,'stats':self.stats},f)
+
+    @classmethod
+    def load(cls, vdir:str)->Optional['BM25Index']:
+        try:
+            with open(os.path.join(vdir,'bm25.json'),'r',encoding='utf-8') as f: meta=json.load(f)
+        except FileNotFoundError: return None
+        idx=cls(meta['k1'],meta['b']); idx.terms=meta['terms']; idx.stats={ns:tuple(v) for ns,v in meta['stats'].items()}
+        with np.load(os.path.join(vdir,'bm25.npz')) as z:
+            idx.indptr=z['indptr']; idx.docs=z['docs']; idx.tfs=z['tfs']; idx.doc_len=z['doc_len']
+        return idx
+
+    def search(self, query:str, namespaces:Optional[Iterable[str]], k:int)->List[Tuple[int,float]]:
+        """Top-k (row, score) pairs; rows index the local index the BM25 index was built from."""
+        qterms=set(tokenize(query))
+        if not qterms or k<=0: return []
+        scores=np.zeros(len(self.doc_len),dtype=np.float32)
+        for ns in (namespaces or self.terms.keys()):
+            vocab=self.terms.get(ns)
+            if not vocab: continue
+            n,avgdl=self.stats[ns]
+            for term in qterms:
+                row=vocab.get(term)
+                if row is None: continue
+                lo,hi=self.indptr[row],self.indptr[row+1]; docs=self.docs[lo:hi]; tf=self.tfs[lo:hi].astype(np.float32)
+                idf=math.log(1+(n-(hi-lo)+0.5)/((hi-lo)+0.5))
+                norm=self.k1*(1-self.b+self.b*self.doc_len[docs]/(avgdl or 1.0))
+                scores[docs]+=idf*tf*(self.k1+1)/(tf+norm)
+        hits=np.flatnonzero(scores)
+        if not len(hits): return []
+        k=min(k,len(hits)); top=hits[np.argpartition(-scores[hits],k-1)[:k]]
+        top=top[np.argsort(-scores[top],kind='stable')]
+        return [(int(r),float(scores[r])) for r in top]
+
+def rrf(rankings:Sequence[Sequence[Dict[str,Any]]], k:int, c:int=60)->List[Dict[str,Any]]:
+    """Reciprocal rank fusion of ranked chunk lists (deduplicated by id); `score` becomes the fused score."""
+    fused:Dict[str,float]={}; first:Dict[str,Dict[str,Any]]={}
+    for ranking in rankings:
+        for rank,item in enumerate(ranking):
+            fused[item['id']]=fused.get(item['id'],0.0)+1.0/(c+rank+1); first.setdefault(item['id'],item)
+    order=sorted(fused,key=lambda i:-fused[i])[:k]
+    return [dict(first[i],score=fused[i]) for i in order]
@@ -0,0 +1,233 @@
+"""In-process exact vector index used when Qdrant is unavailable (or disabled with RAG_BACKEND=local).
+
+Vectors live in one contiguous float32 matrix of unit rows; each row carries a uint64 bitmask of its
+namespace so filtered top-k is a single matrix-vector product plus `argpartition`. Every save writes a
+new version directory and flips the CURRENT pointer atomically; loads memory-map the vector file so all
+workers on a host share the same pages.
+
+Ingest does not rewrite the index per checkpoint: completed writes go to an append-only `Journal`, and `merge`
+publishes base + journal once, streaming vectors from the memory-mapped base into a memory-mapped output.
+"""
+import json, os, shutil, time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+MAX_NAMESPACES=64
+COPY_BLOCK=65536
+
+class LocalIndex:
+    def __init__(self, dim:int):
+        self.dim=dim; self.ids:List[str]=[]; self.payloads:List[Dict[str,Any]]=[]
+        self.vectors=np.zeros((0,dim),dtype=np.float32); self.ns_bits=np.zeros(0,dtype=np.uint64)
+        self.namespaces:Dict[str,int]={}; self.version:Optional[str]=None
+        self._pos:Dict[str,int]={}
+
+    def __len__(self): return len(self.ids)
+
+    @staticmethod
+    def current_version(path:str)->Optional[str]:
+        try:
+            with open(os.path.join(path,'CURRENT'),'r',encoding='utf-8') as f: return f.read().strip() or None
+        except FileNotFoundError: return None
+
+    @classmethod
+    def load(cls, path:str, mmap:bool=True)->Optional['LocalIndex']:
+        version=cls.current_version(path)
+        if version is None: return None
+        vdir=os.path.join(path,version)
+        with open(os.path.join(vdir,'meta.json'),'r',encoding='utf-8') as f: meta=json.load(f)
+        idx=cls(meta['dim']); idx.ids=meta['ids']; idx.payloads=meta['payloads']; idx.namespaces=meta['namespaces']
+        idx.vectors=np.load(os.path.join(vdir,'vectors.npy'),mmap_mode='r' if mmap else None)
+        idx.ns_bits=np.load(os.path.join(vdir,'ns_bits.npy'))
+        idx._pos={pid:i for i,pid in enumerate(idx.ids)}; idx.version=version
+        return idx
+
+    @classmethod
+    def load_or_empty(cls, path:str, dim:int)->'LocalIndex':
+        idx=cls.load(path,mmap=False)
+        return idx if idx is not None and idx.dim==dim else cls(dim)
+
+    @staticmethod
+    def _publish(path:str, write:Callable[[str],None], keep:int=2)->str:
+        """Write a new version dir with `write(vdir)`, then flip CURRENT and prune old versions."""
+        os.makedirs(path,exist_ok=True)
+        version=f'v{time.time_ns()}'; vdir=os.path.join(path,version); os.makedirs(vdir)
+        try: write(vdir)
+        except BaseException:
+            shutil.rmtree(vdir,ignore_errors=True); raise
+        tmp=os.path.join(path,f'CURRENT.{os.getpid()}')
+        with open(tmp,'w',encoding='utf-8') as f: f.write(version)
+        os.replace(tmp,os.path.join(path,'CURRENT'))
+        # Mapped files stay valid after unlink, so readers of older versions are unaffected.
+        old=sorted(d for d in os.listdir(path) if d.startswith('v') and d!=version)
+        for d in old[:max(0,len(old)-(keep-1))]: shutil.rmtree(os.path.join(path,d),ignore_errors=True)
+        return version
+
+    @staticmethod
+    def _write_meta(vdir:str, dim:int, ids:List[str], payloads:List[Dict[str,Any]], namespaces:Dict[str,int], ns_bits:np.ndarray):
+        np.save(os.path.join(vdir,'ns_bits.npy'),ns_bits)
+        with open(os.path.join(vdir,'meta.json'),'w',encoding='utf-8') as f:
+            json.dump({'dim':dim,'ids':ids,'payloads':payloads,'namespaces':namespaces},f)
+
+    def save(self, path:str, keep:int=2, extras:Optional[Callable[[str],None]]=None)->str:
+        """Publish a new version; `extras(vdir)` may add companion files (e.g. BM25) before the pointer flips."""
+        def write(vdir):
+            np.save(os.path.join(vdir,'vectors.npy'),np.ascontiguousarray(self.vectors,dtype=np.float32))
+            self._write_meta(vdir,self.dim,self.ids,self.payloads,self.namespaces,self.ns_bits)
+            if extras is not None: extras(vdir)
+        self.version=self._publish(path,write,keep)
+        return self.version
+
+    def _bit(self, ns:str)->int:
+        if ns not in self.namespaces:
+            if len(self.namespaces)>=MAX_NAMESPACES: raise ValueError(f'local index supports at most {MAX_NAMESPACES} namespaces')
+            self.namespaces[ns]=len(self.namespaces)
+        return 1<<self.namespaces[ns]
+
+    def mask_for(self, namespaces:Iterable[str])->int:
+        m=0
+        for ns in namespaces:
+            if ns in self.namespaces: m|=1<<self.namespaces[ns]
+        return m
+
+    def upsert(self, ids:Sequence[str], vectors:Sequence[Sequence[float]], payloads:Sequence[Dict[str,Any]]):
+        if not ids: return
+        vecs=np.asarray(vectors,dtype=np.float32).reshape(len(ids),self.dim)
+        norms=np.linalg.norm(vecs,axis=1,keepdims=True); norms[norms==0]=1.0; vecs=vecs/norms
+        bits=np.array([self._bit(p.get('namespace','')) for p in payloads],dtype=np.uint64)
+        mat=np.array(self.vectors,dtype=np.float32); nsb=self.ns_bits.copy(); new=[]
+        for i,(pid,p) in enumerate(zip(ids,payloads)):
+            j=self._pos.get(pid)
+            if j is None: new.append(i); continue
+            mat[j]=vecs[i]; nsb[j]=bits[i]; self.payloads[j]=dict(p)
+        if new:
+            mat=np.concatenate([mat,vecs[new]]); nsb=np.concatenate([nsb,bits[new]])
+            for i in new: self._pos[ids[i]]=len(self.ids); self.ids.append(ids[i]); self.payloads.append(dict(payloads[i]))
+        self.vectors=np.ascontiguousarray(mat); self.ns_bits=nsb
+
+    def delete(self, ids:Iterable[str])->int:
+        drop={self._pos[i] for i in ids if i in self._pos}
+        if not drop: return 0
+        keep=np.array([i for i in range(len(self.ids)) if i not in drop],dtype=np.int64)
+        self.vectors=np.ascontiguousarray(np.asarray(self.vectors)[keep]) if len(keep) else np.zeros((0,self.dim),dtype=np.float32)
+        self.ns_bits=self.ns_bits[keep] if len(keep) else np.zeros(0,dtype=np.uint64)
+        self.ids=[self.ids[i] for i in keep]; self.payloads=[self.payloads[i] for i in keep]
+        self._pos={pid:i for i,pid in enumerate(self.ids)}
+        return len(drop)
+
+    def search(self, qvec:Sequence[float], namespaces:Optional[List[str]], k:int)->List[Dict[str,Any]]:
+        if not self.ids or k<=0: return []
+        q=np.asarray(qvec,dtype=np.float32); qn=float(np.linalg.norm(q))
+        if qn==0: return []
+        scores=self.vectors@(q/qn)
+        if namespaces:
+            m=self.mask_for(namespaces)
+            if m==0: return []
+            scores=np.where((self.ns_bits&np.uint64(m))!=0,scores,-np.inf)
+        k=min(k,len(scores))
+        top=np.argpartition(-scores,k-1)[:k]; top=top[np.argsort(-scores[top],kind='stable')]
+        return [self.chunk(int(j),float(scores[j])) for j in top if np.isfinite(scores[j])]
+
+    def vector(self, pid:str)->Optional[List[float]]:
+        j=self._pos.get(pid)
+        return None if j is None else np.asarray(self.vectors[j]).tolist()
+
+    def payload(self, pid:str)->Optional[Dict[str,Any]]:
+        j=self._pos.get(pid)
+        return None if j is None else self.payloads[j]
+
+    def chunk(self, row:int, score:float)->Dict[str,Any]:
+        p=self.payloads[row]
+        return {'id':self.ids[row],'text':p.get('text',''),'source':p.get('source',''),'namespace':p.get('namespace',''),'score':score}
+
+
+def _unit(vectors, dim:int)->np.ndarray:
+    vecs=np.asarray(vectors,dtype=np.float32).reshape(-1,dim)
+    norms=np.linalg.norm(vecs,axis=1,keepdims=True); norms[norms==0]=1.0
+    return vecs/norms
+
+class Journal:
+    """Append-only log of local index writes between publishes: raw float32 unit rows (`vectors.f32`) plus
+    JSON ops (`ops.jsonl`) that reference them by row. Appends cost O(batch), whatever the index size."""
+    def __init__(self, path:str, dim:int):
+        self.path=path; self.dim=dim
+        self._vecs=os.path.join(path,'vectors.f32'); self._ops=os.path.join(path,'ops.jsonl')
+        try:
+            with open(os.path.join(path,'meta.json'),'r',encoding='utf-8') as f: stale=json.load(f).get('dim')!=dim
+        except FileNotFoundError: stale=False
+        if stale: self.clear()
+
+    def rows(self)->int:
+        try: return os.path.getsize(self._vecs)//(4*self.dim)
+        except FileNotFoundError: return 0
+
+    def __bool__(self): return os.path.exists(self._ops) and os.path.getsize(self._ops)>0
+
+    def append(self, ids:Sequence[str], vectors, payloads:Sequence[Dict[str,Any]], deletes:Iterable[str]=(),
+               patches:Optional[Dict[str,Dict[str,Any]]]=None):
+        """Durably log deletes, then upserts, then payload patches (replayed in that order)."""
+        os.makedirs(self.path,exist_ok=True)
+        with open(os.path.join(self.path,'meta.json'),'w',encoding='utf-8') as f: json.dump({'dim':self.dim},f)
+        row=self.rows(); lines=[json.dumps({'op':'delete','id':pid}) for pid in deletes]
+        if ids:
+            with open(self._vecs,'ab') as f:
+                f.write(_unit(vectors,self.dim).tobytes()); f.flush(); os.fsync(f.fileno())
+            lines+=[json.dumps({'op':'upsert','id':pid,'row':row+i,'payload':p}) for i,(pid,p) in enumerate(zip(ids,payloads))]
+        lines+=[json.dumps({'op':'patch','id':pid,'patch':p}) for pid,p in (patches or {}).items()]
+        if not lines: return
+        with open(self._ops,'a',encoding='utf-8') as f:
+            f.write('\n'.join(lines)+'\n'); f.flush(); os.fsync(f.fileno())
+
+    def replay(self)->Tuple[Dict[str,Optional[Tuple[int,Dict[str,Any]]]],Dict[str,Dict[str,Any]]]:
+        """({id: (row, payload) or None if deleted}, {id: patch for base rows}) after applying ops in order."""
+        live:Dict[str,Optional[Tuple[int,Dict[str,Any]]]]={}; patches:Dict[str,Dict[str,Any]]={}
+        try: f=open(self._ops,'r',encoding='utf-8')
+        except FileNotFoundError: return live,patches
+        with f:
+            for line in f:
+                try: op=json.loads(line)
+                except json.JSONDecodeError: break  # torn tail of an interrupted append
+                pid=op['id']
+                if op['op']=='upsert': live[pid]=(op['row'],op['payload']); patches.pop(pid,None)
+                elif op['op']=='delete': live[pid]=None; patches.pop(pid,None)
+                elif live.get(pid) is not None: live[pid][1].update(op['patch'])
+                else: patches.setdefault(pid,{}).update(op['patch'])
+        return live,patches
+
+    def vectors(self)->np.ndarray:
+        n=self.rows()
+        return np.memmap(self._vecs,dtype=np.float32,mode='r',shape=(n,self.dim)) if n else np.zeros((0,self.dim),dtype=np.float32)
+
+    def clear(self): shutil.rmtree(self.path,ignore_errors=True)
+
+def merge(path:str, base:Optional[LocalIndex], journal:Journal, keep:int=2,
+          extras:Optional[Callable[[str,List[Dict[str,Any]]],None]]=None)->str:
+    """Publish `base` with `journal` applied as a new version. Vectors are copied block-wise from the memory-mapped
+    base and journal into a memory-mapped output, so the matrix is never materialised; payload dicts are shared with
+    `base`. `extras(vdir, payloads)` may add companion files before the pointer flips."""
+    dim=journal.dim; live,patches=journal.replay()
+    if base is not None and base.dim!=dim: base=None
+    keep_rows=np.array([i for i,pid in enumerate(base.ids) if pid not in live],dtype=np.int64) if base is not None else np.zeros(0,dtype=np.int64)
+    added=[(pid,v) for pid,v in live.items() if v is not None]
+    ids=[base.ids[i] for i in keep_rows]+[pid for pid,_ in added]
+    payloads=[{**base.payloads[i],**patches[base.ids[i]]} if base.ids[i] in patches else base.payloads[i] for i in keep_rows]
+    payloads+=[p for _,(_,p) in added]
+    namespaces=dict(base.namespaces) if base is not None else {}
+    def bit(ns:str)->int:
+        if ns not in namespaces:
+            if len(namespaces)>=MAX_NAMESPACES: raise ValueError(f'local index supports at most {MAX_NAMESPACES} namespaces')
+            namespaces[ns]=len(namespaces)
+        return 1<<namespaces[ns]
+    ns_bits=np.array([bit(p.get('namespace','')) for p in payloads],dtype=np.uint64)
+    jrows=np.array([row for _,(row,_) in added],dtype=np.int64)
+
+    def write(vdir):
+        out=np.lib.format.open_memmap(os.path.join(vdir,'vectors.npy'),mode='w+',dtype=np.float32,shape=(len(ids),dim))
+        o=0
+        for src,rows in ((base.vectors if base is not None else None,keep_rows),(journal.vectors(),jrows)):
+            for s in range(0,len(rows),COPY_BLOCK):
+                blk=rows[s:s+COPY_BLOCK]; out[o:o+len(blk)]=src[blk]; o+=len(blk)
+        out.flush(); del out
+        LocalIndex._write_meta(vdir,dim,ids,payloads,namespaces,ns_bits)
+        if extras is not None: extras(vdir,payloads)
+    return LocalIndex._publish(path,write,keep)
@@ -1,8 +1,14 @@
 from typing import List, Literal, Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 class Message(BaseModel): role: Literal['user','assistant','system']; content: str
-class OrchestrateReq(BaseModel): persona: str; user_id: str; messages: List[Message]; tools_hint: Optional[List[str]] = None
+class OrchestrateReq(BaseModel): persona: str; user_id: str; messages: List[Message]; tools_hint: Optional[List[str]] = None; session: bool = False
 class ToolEvent(BaseModel): name: str; input: Dict[str, Any]; output: Dict[str, Any]
 class Reply(BaseModel): text: str; media: Optional[Dict[str, Any]] = None
 class Offer(BaseModel): id: str; name: str; copy: str; cta: Dict[str, Any]
 class OrchestrateRes(BaseModel): reply: Reply; offers: List[Offer]; tool_events: List[ToolEvent]
+class OrchestrateBatchReq(BaseModel): requests: List[OrchestrateReq]
+class OrchestrateBatchItem(BaseModel): status: int = 200; result: Optional[OrchestrateRes] = None; error: Optional[str] = None
+class OrchestrateBatchRes(BaseModel): results: List[OrchestrateBatchItem]
+class RagSearchBatchReq(BaseModel): queries: List[str]; namespaces: List[str] = []; per_query_namespaces: Optional[List[List[str]]] = None; k: int = Field(3, ge=1, le=100); mode: Optional[Literal['vector','hybrid']] = None
+class RagChunk(BaseModel): id: str; text: str; source: str = ''; namespace: str = ''; score: float
+class RagSearchBatchRes(BaseModel): results: List[List[RagChunk]]
@@ -4,12 +4,15 @@ def _base_dir():
     return os.path.abspath(os.path.join(os.path.dirname(__file__),'..','..','..'))
 OFFERS=json.load(open(os.path.join(_base_dir(),'configs','offers','catalog.json'),'r',encoding='utf-8'))['items']
 
-def evaluate(user, session):
-    segs=set(user.get('segments', [])); balance=user.get('balance',0); out=[]
-    for it in OFFERS:
-        rules=it.get('rules',{}); ok=True
-        req=set(rules.get('requireSegments', []))
-        if req and not req.intersection(segs): ok=False
-        if 'minBalance' in rules and balance<rules['minBalance']: ok=False
-        if ok: out.append(it)
-    return out[:2]
+def _compiled():
+    return [(it,set(it.get('rules',{}).get('requireSegments',[])),it.get('rules',{}).get('minBalance')) for it in OFFERS]
+
+def evaluate_many(users, sessions):
+    """Offers for many (user, session) pairs in one pass; each catalog rule is prepared once."""
+    rules=_compiled(); out=[]
+    for user in users:
+        segs=set(user.get('segments', [])); balance=user.get('balance',0)
+        out.append([it for it,req,min_bal in rules if (not req or req&segs) and (min_bal is None or balance>=min_bal)][:2])
+    return out
+
+def evaluate(user, session): return evaluate_many([user],[session])[0]
@@ -0,0 +1,245 @@
+"""The /orchestrate pipeline, shared by the JSON and the streaming endpoints.
+
+`run` routes the turn, runs the persona's tool plan, composes the reply and evaluates offers. With an `emit`
+callback it also reports progress as it happens: each ToolEvent as soon as its tool finishes, then the reply
+in chunks, then offers and media. The returned OrchestrateRes is the same either way (tool events in plan order). `run_batch` serves
+/orchestrate/batch, sharing batched tool calls and the offer pass across many requests (batch items are
+stateless: `session` is ignored there).
+"""
+import asyncio
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from . import config, intent, reply_cache, sessions
+from .embedding import aembed_text
+from .executor import Outcome, Step, call, deadline_in, event_output, execute, timeout_for
+from .models import OrchestrateReq, OrchestrateRes, Reply, ToolEvent, Offer
+from .offer_engine import evaluate as offers_eval, evaluate_many as offers_eval_many
+from .tools import REGISTRY, Plan, avatar
+
+Emit = Callable[[str, Any], Awaitable[None]]
+
+
+def last_user_text(messages: List[Dict[str, Any]]) -> str:
+    for m in reversed(messages):
+        if m['role'] == 'user': return m['content']
+    return ''
+
+
+def route_turn(text: str, plan: Plan, hint: Optional[List[str]]) -> Tuple[Optional[List[str]], Optional[ToolEvent]]:
+    """Tool hint for this turn: the client's tools_hint, else the intent router's pick (reported as an event)."""
+    if hint is not None or not config.INTENT_ROUTING: return hint, None
+    route, hint = intent.route(text, plan.default_names)
+    planned = {s.name for s in plan.prune(hint)}
+    return hint, ToolEvent(name='intent.route', input={'query': text}, output={
+        'intent': route.intent, 'source': route.source, 'score': route.score,
+        'skipped': [n for n in plan.default_names if n not in planned]})
+
+
+def apply_outcome(plan: Plan, step: Step, out: Outcome, context_data: Dict[str, Any]) -> Optional[ToolEvent]:
+    """Record a finished tool's value in the reply context; returns its ToolEvent, if any."""
+    spec = _spec(plan, step.name)
+    value = spec.extract(out.value) if out.status == 'ok' and out.value is not None else None
+    if value is not None: context_data[spec.provides] = value
+    output = event_output(step, out)
+    return ToolEvent(name=step.name, input=step.input, output=output) if output is not None else None
+
+
+def content_parts(persona: Dict[str, Any], rag_chunks: List[Dict[str, Any]]) -> List[str]:
+    """The reply sentences that depend only on the persona and the retrieved documents (safe to cache)."""
+    parts: List[str] = []
+    if rag_chunks:
+        parts.append(f"I found {len(rag_chunks)} relevant documents.")
+        if persona.get('id') == 'teller-v1':
+            parts.append("I can help you with account services and transactions.")
+        elif persona.get('id') == 'exec-v1':
+            parts.append("Here are the key insights from our knowledge base.")
+    return parts
+
+
+# Context keys `reply_parts` and the offer rules read; tools providing anything else only run when hinted.
+REPLY_USES = ('rag_results', 'budget', 'customer')
+
+
+def reply_parts(persona: Dict[str, Any], context_data: Dict[str, Any], content: Optional[List[str]] = None) -> List[str]:
+    """Persona-appropriate reply, as the sentences it is made of; `content` replaces the RAG-derived sentences
+    (a reply cache hit)."""
+    budget_insights = context_data.get('budget') or {}
+    customer_data = context_data.get('customer') or {}
+    if content is None: content = content_parts(persona, context_data.get('rag_results') or [])
+    
+    display_name = persona.get('displayName', 'Assistant')
+    parts = [f"[{display_name}]"] + content
+    
+    if budget_insights:
+        parts.append(f"Budget outlook: {budget_insights.get('summary', 'Analysis complete.')}")
+    
+    if customer_data:
+        parts.append(f"Hello {customer_data.get('name', 'valued customer')}!")
+        if customer_data.get('segment') == 'premium':
+            parts.append("As a premium member, I'm here to provide personalized assistance.")
+    
+    if not content and not budget_insights and not customer_data:
+        parts.append("How can I help you today?")
+    return parts
+
+
+def user_profile(customer_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'segments': [customer_data.get('segment', 'newcomer')],
+        'balance': customer_data.get('balance', 250),
+        'products': customer_data.get('products', [])
+    }
+
+
+def speak(persona: Dict[str, Any], reply_text: str) -> Optional[Dict[str, Any]]:
+    """Avatar/TTS payload, for personas allowed to speak."""
+    if 'avatar.speak' not in persona.get('tools', []): return None
+    return avatar.speak(text=reply_text, persona_voice=persona.get('voice', {}).get('tone', 'neutral'))
+
+
+async def _silent(kind: str, data: Any) -> None: return None
+
+
+@dataclass
+class Turn:
+    """One request, routed and ready to run against its persona pack."""
+    req: OrchestrateReq
+    persona: Dict[str, Any]
+    plan: Plan
+    ctx: Dict[str, Any]
+    hint: Optional[List[str]]
+    routed: Optional[ToolEvent]
+
+    @property
+    def tools(self) -> List[str]:
+        return [s.name for s in self.plan.steps(self.ctx, self.hint)]
+
+
+def prepare(req: OrchestrateReq, pack: Tuple[Dict[str, Any], Plan]) -> Turn:
+    persona, plan = pack
+    text = last_user_text([m.model_dump() for m in req.messages])
+    hint, routed = route_turn(text, plan, req.tools_hint)
+    ctx = {'text': text, 'user_id': req.user_id, 'namespaces': persona.get('ragNamespaces', []), 'persona': persona.get('id')}
+    return Turn(req, persona, plan, ctx, hint, routed)
+
+
+def _with_reply_cache(turn: Turn, steps: List[Step], cache: reply_cache.ReplyCache, state: Dict[str, Any]) -> List[Step]:
+    """Add a `reply.cache` lookup beside rag.search. The search starts at once; the lookup waits for the customer
+    tool (entries are scoped by segment, and it still runs when that tool fails) and overlaps the search. On a hit
+    a search still in flight is cancelled and the cached sentences are used."""
+    rag = next((s for s in steps if s.name == 'rag.search'), None)
+    if rag is None: return steps
+    personal = [s.name for s in steps if _spec(turn.plan, s.name).provides == 'customer']
+    decided = asyncio.get_running_loop().create_future()
+    async def lookup(deps: Dict[str, Any]):
+        try:
+            customer = next((_spec(turn.plan, n).extract(v) for n, v in deps.items() if v is not None), None)
+            state['scope'] = (turn.persona.get('id', ''), reply_cache.segment_of(customer))
+            try:
+                state['vec'] = await aembed_text(turn.ctx['text'])
+                state['hit'] = cache.get(state['scope'], state['vec'])
+            except Exception as e:
+                return {'hit': False, 'segment': state['scope'][1], 'error': f'{type(e).__name__}: {e}'}
+            hit = state['hit']
+            return {'hit': hit is not None, 'segment': state['scope'][1], **({'score': hit.score, 'age_s': hit.age_s} if hit else {})}
+        finally:
+            if not decided.done(): decided.set_result(state.get('hit'))
+    async def search(deps: Dict[str, Any]):
+        task = asyncio.ensure_future(rag.run(deps))
+        try: await asyncio.wait({task, decided}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            task.cancel(); raise
+        if not task.done() and decided.result() is not None:
+            task.cancel(); return None
+        return await task
+    cached = Step('reply.cache', lookup, after=tuple(personal), input={'query': turn.ctx['text']}, summary=lambda out: out)
+    return [s for s in steps if s.name != 'rag.search'] + [cached, replace(rag, run=search)]
+
+
+def _spec(plan: Plan, name: str):
+    return next(s for s in plan.specs if s.name == name)
+
+
+async def compose(turn: Turn, emit: Emit = _silent, prefetched: Optional[Dict[str, Any]] = None,
+                  remembered: Optional[Dict[str, Any]] = None, cache: Optional[reply_cache.ReplyCache] = None
+                  ) -> Tuple[str, List[ToolEvent], Dict[str, Any], Dict[str, Any]]:
+    """Run the turn's tools (independent ones concurrently) and build the reply. Tools found in `remembered`
+    (session results) are not called again and their events say so; with `cache`, RAG-derived sentences come
+    from the semantic reply cache when possible. Returns (text, tool events, context, values of the tools that ran)."""
+    tool_events: List[ToolEvent] = []
+    context_data: Dict[str, Any] = {}
+    values: Dict[str, Any] = {}
+    if turn.routed is not None:
+        tool_events.append(turn.routed); await emit('tool', turn.routed)
+    
+    remembered = remembered or {}
+    steps = turn.plan.steps(turn.ctx, turn.hint, {**(prefetched or {}), **remembered})
+    state: Dict[str, Any] = {}
+    if cache is not None: steps = _with_reply_cache(turn, steps, cache, state)
+    done: Dict[str, Optional[ToolEvent]] = {}
+    async def on_done(step: Step, out: Outcome):
+        if step.name == 'reply.cache': done[step.name] = event = ToolEvent(name=step.name, input=step.input, output=event_output(step, out) or {})
+        else: done[step.name] = event = apply_outcome(turn.plan, step, out, context_data)
+        if step.name in remembered:
+            if event is not None: event.output['cached'] = 'session'
+        elif out.status == 'ok' and out.value is not None: values[step.name] = out.value
+        if event is not None: await emit('tool', event)
+    await execute(steps, deadline_in(), on_done)
+    tool_events.extend(done[s.name] for s in steps if done.get(s.name) is not None)
+    
+    hit = state.get('hit')
+    parts = reply_parts(turn.persona, context_data, hit.parts if hit is not None else None)
+    if hit is None and 'rag.search' in values and state.get('vec') is not None:
+        cache.put(state['scope'], state['vec'], content_parts(turn.persona, context_data.get('rag_results') or []))
+    for i, part in enumerate(parts): await emit('reply', {'text': part if i == 0 else ' ' + part})
+    return " ".join(parts), tool_events, context_data, values
+
+
+async def run(req: OrchestrateReq, pack: Tuple[Dict[str, Any], Plan], emit: Optional[Emit] = None) -> OrchestrateRes:
+    """Orchestrate one request for an already loaded (persona, plan) pack; raises ToolFailure for required tools.
+    With `req.session` the turn is recorded in the (user_id, persona) session and its CRM/KYC results reused;
+    anonymous requests (empty user_id) never get a session."""
+    emit = emit or _silent
+    turn = prepare(req, pack)
+    store = session = None
+    if req.session and req.user_id:
+        store = sessions.get_store()
+        session = await store.get(req.user_id, turn.persona.get('id', req.persona))
+    reply_text, tool_events, context_data, values = await compose(turn, emit, remembered=session['tools'] if session else None,
+                                                                  cache=reply_cache.get_cache())
+    offers = [Offer(**o) for o in offers_eval(user_profile(context_data.get('customer') or {}), {'persona': req.persona, 'context': context_data})]
+    await emit('offers', offers)
+    media = speak(turn.persona, reply_text)
+    await emit('media', media)
+    if session is not None:
+        fresh = {name: v for name, v in values.items() if REGISTRY[name].per_session}
+        await store.put(req.user_id, turn.persona.get('id', req.persona),
+                        sessions.remember(session, [m.model_dump() for m in req.messages], reply_text, fresh))
+    return OrchestrateRes(reply=Reply(text=reply_text, media=media), offers=offers, tool_events=tool_events)
+
+
+async def _prefetch(name: str, turns: List[Turn], idx: List[int], out: List[Dict[str, Any]]):
+    try: values = await asyncio.wait_for(call(REGISTRY[name].run_many, [turns[i].ctx for i in idx]), timeout_for(name))
+    except Exception as e: values = [e] * len(idx)
+    for i, v in zip(idx, values): out[i][name] = v
+
+
+async def run_batch(turns: List[Turn]) -> List[Union[OrchestrateRes, Exception]]:
+    """Orchestrate many turns, sharing work across them: every batchable tool (`run_many`) is called once for all
+    turns that need it, and offers are evaluated in one pass. Results (or per-turn exceptions) keep input order."""
+    prefetched: List[Dict[str, Any]] = [{} for _ in turns]
+    needs: Dict[str, List[int]] = {}
+    for i, turn in enumerate(turns):
+        for name in turn.tools:
+            if REGISTRY[name].run_many is not None and not REGISTRY[name].deps: needs.setdefault(name, []).append(i)
+    await asyncio.gather(*(_prefetch(name, turns, idx, prefetched) for name, idx in needs.items()))
+    composed = await asyncio.gather(*(compose(t, prefetched=p) for t, p in zip(turns, prefetched)), return_exceptions=True)
+    ok = [i for i, c in enumerate(composed) if not isinstance(c, BaseException)]
+    offers = offers_eval_many([user_profile(composed[i][2].get('customer') or {}) for i in ok],
+                              [{'persona': turns[i].req.persona, 'context': composed[i][2]} for i in ok])
+    results: List[Union[OrchestrateRes, Exception]] = list(composed)
+    for i, items in zip(ok, offers):
+        reply_text, tool_events = composed[i][:2]
+        results[i] = OrchestrateRes(reply=Reply(text=reply_text, media=speak(turns[i].persona, reply_text)),
+                                    offers=[Offer(**o) for o in items], tool_events=tool_events)
+    return results
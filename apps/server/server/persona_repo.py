@@ -1,12 +1,28 @@
 import json, os
+from .orchestrator import REPLY_USES
+from .tools import compile_plan
+
+_PACKS={}  # pack path -> (mtime, persona, plan)
 
 def _base_dir():
     return os.path.abspath(os.path.join(os.path.dirname(__file__),'..','..','..'))
 
-def load_persona(persona_id: str):
+def _pack_path(persona_id: str):
     pdir=os.path.join(_base_dir(),'configs','personaPacks')
     fname=os.path.join(pdir,f"{persona_id}.json")
     if not os.path.exists(fname):
         for cand in os.listdir(pdir):
             if cand.startswith(persona_id): fname=os.path.join(pdir,cand); break
-    return json.load(open(fname,'r',encoding='utf-8'))
+    return fname
+
+def load_pack(persona_id: str):
+    """(persona, compiled tool Plan); both are cached until the pack file changes."""
+    fname=_pack_path(persona_id); mtime=os.path.getmtime(fname); hit=_PACKS.get(fname)
+    if hit and hit[0]==mtime: return hit[1],hit[2]
+    with open(fname,'r',encoding='utf-8') as f: persona=json.load(f)
+    plan=compile_plan(persona.get('tools',[]),persona.get('replyUses',REPLY_USES))
+    _PACKS[fname]=(mtime,persona,plan)
+    return persona,plan
+
+def load_persona(persona_id: str):
+    return load_pack(persona_id)[0]
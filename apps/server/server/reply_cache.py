@@ -0,0 +1,81 @@
+"""Semantic reply cache for /orchestrate.
+
+Entries hold only the non-personal part of a reply (the sentences derived from RAG results), scoped by
+(persona, customer segment). A lookup embeds the query and scans its scope with one matrix product (a scope
+holds at most REPLY_CACHE_SIZE entries, so brute force is the right ANN here); the best entry at or above
+REPLY_CACHE_THRESHOLD cosine similarity and younger than REPLY_CACHE_TTL is a hit. Greetings, budget figures and
+offers are never cached: they are rebuilt from the customer's own data on every turn. The cache is dropped when
+ingest publishes new content (local index version or generation file).
+"""
+import threading, time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from . import config
+from .local_index import LocalIndex
+from .tools.rag import read_generation
+
+Scope=Tuple[str,str]
+
+@dataclass
+class Hit:
+    parts:List[str]
+    score:float
+    age_s:float
+
+def segment_of(customer:Optional[Dict[str,Any]])->str: return (customer or {}).get('segment') or 'anonymous'
+
+class ReplyCache:
+    def __init__(self, size:Optional[int]=None, threshold:Optional[float]=None, ttl:Optional[float]=None):
+        self.size=config.REPLY_CACHE_SIZE if size is None else size
+        self.threshold=config.REPLY_CACHE_THRESHOLD if threshold is None else threshold
+        self.ttl=config.REPLY_CACHE_TTL if ttl is None else ttl
+        self._scopes:Dict[Scope,Tuple[np.ndarray,np.ndarray,List[List[str]]]]={}  # vectors, stored-at, parts
+        self._lock=threading.Lock(); self._gen:Optional[tuple]=None; self._gen_checked=float('-inf')
+        self.hits=0; self.misses=0
+
+    def _check_generation(self):
+        now=time.monotonic()
+        if now-self._gen_checked<config.LOCAL_INDEX_RELOAD_SECS: return
+        self._gen_checked=now
+        gen=(LocalIndex.current_version(config.LOCAL_INDEX_DIR),read_generation())
+        if gen!=self._gen: self._gen=gen; self.clear()
+
+    def get(self, scope:Scope, vec)->Optional[Hit]:
+        self._check_generation()
+        q=np.asarray(vec,dtype=np.float32); n=np.linalg.norm(q)
+        with self._lock:
+            entry=self._scopes.get(scope)
+            if entry is None or not n: self.misses+=1; return None
+            vecs,at,parts=entry; sims=vecs@(q/n); age=time.monotonic()-at
+            sims[age>self.ttl]=-1.0; best=int(np.argmax(sims))
+            if sims[best]<self.threshold: self.misses+=1; return None
+            self.hits+=1
+            return Hit(list(parts[best]),round(float(sims[best]),4),round(float(age[best]),1))
+
+    def put(self, scope:Scope, vec, parts:List[str]):
+        self._check_generation()
+        q=np.asarray(vec,dtype=np.float32); n=np.linalg.norm(q)
+        if not n or self.size<=0: return
+        with self._lock:
+            vecs,at,old=self._scopes.get(scope,(np.zeros((0,len(q)),dtype=np.float32),np.zeros(0),[]))
+            live=np.flatnonzero(time.monotonic()-at<=self.ttl); live=live[max(0,len(live)-self.size+1):]  # oldest go first
+            self._scopes[scope]=(np.vstack([vecs[live],(q/n)[None,:]]),np.append(at[live],time.monotonic()),
+                                 [old[i] for i in live]+[list(parts)])
+
+    def clear(self):
+        with self._lock: self._scopes.clear()
+
+    def stats(self)->Dict[str,object]:
+        with self._lock: size=sum(len(p) for _,_,p in self._scopes.values()); scopes=len(self._scopes)
+        return {'size':size,'scopes':scopes,'hits':self.hits,'misses':self.misses}
+
+_CACHE:Optional[ReplyCache]=None; _CACHE_LOCK=threading.Lock()
+
+def get_cache()->Optional[ReplyCache]:
+    """Process-wide reply cache, or None when REPLY_CACHE_SIZE is 0."""
+    global _CACHE
+    if config.REPLY_CACHE_SIZE<=0: return None
+    with _CACHE_LOCK:
+        if _CACHE is None: _CACHE=ReplyCache()
+        return _CACHE
@@ -0,0 +1,128 @@
+"""Per-dependency circuit breakers with latency-adaptive timeouts (Qdrant, Redis, Mongo, embedding provider).
+
+A breaker is closed while calls succeed. BREAKER_FAILURES consecutive failures (errors or timeouts) open it,
+and then every call fails at once with BreakerOpen, so callers take their fallback in microseconds instead of
+waiting on a dead dependency. After BREAKER_COOLDOWN_SECS it goes half-open and lets BREAKER_HALF_OPEN_PROBES
+trial calls through: a success closes it and a failure opens it again.
+
+Each breaker also keeps the latencies of its last ADAPTIVE_TIMEOUT_WINDOW successful calls. Async calls are
+cut off at ADAPTIVE_TIMEOUT_FACTOR x the ADAPTIVE_TIMEOUT_PERCENTILE latency, clamped between
+ADAPTIVE_TIMEOUT_FLOOR_MS and the dependency's configured client timeout (used as is until enough samples exist).
+Batch calls (`batch=True`: many texts or queries in one request) take longer than the single calls the window
+learns from, so they wait up to the configured timeout and do not feed the window. Sync calls cannot be
+interrupted safely; they only consult and feed the breaker.
+"""
+import asyncio, threading, time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import numpy as np
+from . import config
+
+CLOSED,OPEN,HALF_OPEN='closed','open','half_open'
+
+class BreakerOpen(RuntimeError):
+    def __init__(self, name:str, retry_in:float):
+        super().__init__(f'{name} circuit open (retry in {retry_in:.1f}s)'); self.name=name; self.retry_in=retry_in
+
+class Breaker:
+    def __init__(self, name:str, ceiling:float, failures:Optional[int]=None, cooldown:Optional[float]=None, probes:Optional[int]=None):
+        self.name=name; self.ceiling=ceiling
+        self.failures=config.BREAKER_FAILURES if failures is None else failures
+        self.cooldown=config.BREAKER_COOLDOWN_SECS if cooldown is None else cooldown
+        self.probes=config.BREAKER_HALF_OPEN_PROBES if probes is None else probes
+        self._lock=threading.Lock(); self._state=CLOSED; self._opened_at=0.0; self._streak=0; self._trials=0
+        self._latencies:Deque[float]=deque(maxlen=config.ADAPTIVE_TIMEOUT_WINDOW)
+        self.calls=0; self.errors=0; self.timeouts=0; self.rejected=0; self.opened=0
+
+    def _advance(self):
+        if self._state==OPEN and time.monotonic()-self._opened_at>=self.cooldown: self._state=HALF_OPEN; self._trials=0
+
+    @property
+    def state(self)->str:
+        with self._lock: self._advance(); return self._state
+
+    def available(self)->bool:
+        """Whether a call would currently be let through (does not take a half-open trial slot)."""
+        with self._lock: self._advance(); return self._state==CLOSED or (self._state==HALF_OPEN and self._trials<self.probes)
+
+    def acquire(self):
+        with self._lock:
+            self._advance()
+            if self._state==OPEN or (self._state==HALF_OPEN and self._trials>=self.probes):
+                self.rejected+=1; raise BreakerOpen(self.name, max(0.0, self.cooldown-(time.monotonic()-self._opened_at)))
+            if self._state==HALF_OPEN: self._trials+=1
+            self.calls+=1
+
+    def success(self, latency:Optional[float]=None):
+        with self._lock:
+            if latency is not None: self._latencies.append(latency)
+            self._streak=0
+            if self._state!=CLOSED: self._state=CLOSED; self._trials=0
+
+    def release(self):
+        """Give back a half-open trial slot taken by a call that was cancelled before it could tell."""
+        with self._lock:
+            if self._state==HALF_OPEN and self._trials: self._trials-=1
+
+    def failure(self, timeout:bool=False):
+        with self._lock:
+            self.errors+=1; self.timeouts+=timeout; self._streak+=1
+            if self._state==HALF_OPEN or (self._state==CLOSED and self._streak>=self.failures):
+                self._state=OPEN; self._opened_at=time.monotonic(); self.opened+=1
+
+    def timeout(self)->float:
+        """Seconds to wait for one call."""
+        with self._lock: lat=list(self._latencies)
+        if len(lat)<config.ADAPTIVE_TIMEOUT_MIN_SAMPLES: return self.ceiling
+        t=float(np.percentile(lat,config.ADAPTIVE_TIMEOUT_PERCENTILE))*config.ADAPTIVE_TIMEOUT_FACTOR
+        return min(self.ceiling,max(config.ADAPTIVE_TIMEOUT_FLOOR_MS/1000.0,t))
+
+    def reset(self):
+        with self._lock: self._state=CLOSED; self._streak=0; self._trials=0; self._latencies.clear()
+
+    def stats(self)->Dict[str,object]:
+        with self._lock:
+            self._advance()
+            p50=round(float(np.percentile(self._latencies,50))*1000,1) if self._latencies else None
+            out={'state':self._state,'consecutive_failures':self._streak,'calls':self.calls,'errors':self.errors,
+                 'timeouts':self.timeouts,'rejected':self.rejected,'opened':self.opened,'p50_ms':p50}
+        out['timeout_ms']=round(self.timeout()*1000,1)
+        return out
+
+def _ceilings()->Dict[str,float]:
+    return {'qdrant':float(config.QDRANT_TIMEOUT),'redis':config.REDIS_TIMEOUT,'mongo':config.MONGO_TIMEOUT,'embedding':config.EMBED_TIMEOUT}
+
+_BREAKERS:Dict[str,Breaker]={}; _LOCK=threading.Lock()
+
+def breaker(name:str)->Breaker:
+    with _LOCK:
+        if name not in _BREAKERS: _BREAKERS[name]=Breaker(name, _ceilings().get(name, config.EMBED_TIMEOUT))
+        return _BREAKERS[name]
+
+async def acall(name:str, fn:Callable[[],Awaitable[Any]], batch:bool=False)->Any:
+    """Await `fn()` through the `name` breaker with its adaptive timeout (the configured one for a `batch`
+    call); raises BreakerOpen when open."""
+    if not config.RESILIENCE: return await fn()
+    b=breaker(name); b.acquire(); start=time.monotonic()
+    try: out=await asyncio.wait_for(fn(), b.ceiling if batch else b.timeout())
+    except asyncio.TimeoutError: b.failure(timeout=True); raise
+    except asyncio.CancelledError: b.release(); raise  # the caller gave up; says nothing about the dependency
+    except Exception: b.failure(); raise
+    b.success(None if batch else time.monotonic()-start)
+    return out
+
+def call(name:str, fn:Callable[[],Any], batch:bool=False)->Any:
+    """Run blocking `fn()` through the `name` breaker (no timeout is imposed; the client's own applies)."""
+    if not config.RESILIENCE: return fn()
+    b=breaker(name); b.acquire(); start=time.monotonic()
+    try: out=fn()
+    except Exception: b.failure(); raise
+    b.success(None if batch else time.monotonic()-start)
+    return out
+
+def snapshot()->Dict[str,Dict[str,object]]:
+    """Breaker state and latency stats for /diagnostics."""
+    return {name:breaker(name).stats() for name in _ceilings()}
+
+def reset():
+    with _LOCK: _BREAKERS.clear()
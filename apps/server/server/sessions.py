@@ -0,0 +1,110 @@
+"""Conversation sessions for /orchestrate, keyed by (user_id, persona).
+
+A session holds the recent messages, an extractive summary of older ones (so its size stays flat however long
+the conversation runs) and per-session tool results (CRM profile, KYC status) that later turns reuse instead of
+calling the tool again. Sessions live in Redis as JSON with a sliding TTL; an in-process LRU with the same TTL
+serves when Redis is disabled or unreachable (failures skip Redis for `redis_cooldown` seconds, as does an
+open redis circuit breaker).
+"""
+import json, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from . import config, resilience
+
+def key_for(user_id:str, persona:str)->str: return f'sess:{persona}:{user_id}'
+
+def new_session()->Dict[str,Any]: return {'summary':'','messages':[],'tools':{},'turns':0}
+
+def compact(session:Dict[str,Any], max_messages:Optional[int]=None, summary_chars:Optional[int]=None)->Dict[str,Any]:
+    """Fold all but the last `max_messages` messages into the summary, keeping its most recent `summary_chars`."""
+    max_messages=config.SESSION_MAX_MESSAGES if max_messages is None else max_messages
+    summary_chars=config.SESSION_SUMMARY_CHARS if summary_chars is None else summary_chars
+    msgs=session['messages']
+    if len(msgs)<=max_messages: return session
+    old,session['messages']=msgs[:len(msgs)-max_messages],msgs[len(msgs)-max_messages:]
+    lines=[session['summary']] if session['summary'] else []
+    lines+=[f"{m['role']}: {' '.join(m['content'].split())[:160]}" for m in old]
+    session['summary']='\n'.join(lines)[-summary_chars:]
+    return session
+
+class SessionStore:
+    def __init__(self, aredis_client=None, ttl:int=1800, max_items:int=10000, redis_cooldown:float=30.0):
+        self.aredis=aredis_client; self.ttl=ttl; self.max_items=max_items; self.redis_cooldown=redis_cooldown
+        self._redis_down_until=0.0; self._lock=threading.Lock()
+        self._local:'OrderedDict[str,Tuple[float,str]]'=OrderedDict()
+        self.hits=0; self.misses=0; self.redis_errors=0
+
+    def _redis_ok(self)->bool: return self.aredis is not None and time.monotonic()>=self._redis_down_until and resilience.breaker('redis').available()
+
+    def _redis_failed(self):
+        self.redis_errors+=1; self._redis_down_until=time.monotonic()+self.redis_cooldown
+
+    def _remember(self, key:str, raw:str):
+        with self._lock:
+            self._local[key]=(time.monotonic()+self.ttl,raw); self._local.move_to_end(key)
+            while len(self._local)>self.max_items: self._local.popitem(last=False)
+
+    def _recall(self, key:str)->Optional[str]:
+        with self._lock:
+            hit=self._local.get(key)
+            if hit is None or hit[0]<time.monotonic(): self._local.pop(key,None); return None
+            return hit[1]
+
+    async def get(self, user_id:str, persona:str)->Dict[str,Any]:
+        """The stored session, or a fresh one."""
+        key=key_for(user_id,persona); raw=None
+        if self._redis_ok():
+            try: raw=await resilience.acall('redis', lambda: self.aredis.get(key))
+            except Exception: self._redis_failed()
+        if raw is None: raw=self._recall(key)
+        if raw is None: self.misses+=1; return new_session()
+        self.hits+=1
+        return json.loads(raw)
+
+    async def put(self, user_id:str, persona:str, session:Dict[str,Any]):
+        key=key_for(user_id,persona); raw=json.dumps(compact(session),separators=(',',':'))
+        self._remember(key,raw)
+        if self._redis_ok():
+            try: await resilience.acall('redis', lambda: self.aredis.set(key,raw,ex=self.ttl))
+            except Exception: self._redis_failed()
+
+    async def delete(self, user_id:str, persona:str):
+        key=key_for(user_id,persona)
+        with self._lock: self._local.pop(key,None)
+        if self._redis_ok():
+            try: await resilience.acall('redis', lambda: self.aredis.delete(key))
+            except Exception: self._redis_failed()
+
+    def stats(self)->Dict[str,object]:
+        with self._lock: size=len(self._local)
+        return {'local_size':size,'hits':self.hits,'misses':self.misses,'redis_errors':self.redis_errors,'redis_enabled':self.aredis is not None}
+
+_STORE:Optional[SessionStore]=None; _STORE_LOCK=threading.Lock()
+
+def get_store()->SessionStore:
+    """Process-wide session store (Redis-backed unless SESSION_REDIS=0)."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            arc=None
+            if config.SESSION_REDIS:
+                import redis.asyncio
+                arc=redis.asyncio.from_url(config.REDIS_URL, socket_timeout=0.25, socket_connect_timeout=0.25)
+            _STORE=SessionStore(arc, config.SESSION_TTL, config.SESSION_MEMORY_SIZE)
+        return _STORE
+
+def unseen(stored:List[Dict[str,Any]], messages:List[Dict[str,Any]])->List[Dict[str,Any]]:
+    """The part of `messages` after the last place the stored messages' tail lines up with it, so a client that
+    resends its whole history only adds what is new (all of `messages` when nothing lines up)."""
+    for end in range(len(messages),0,-1):
+        n=min(len(stored),end)
+        if n and messages[end-n:end]==stored[-n:]: return messages[end:]
+    return messages
+
+def remember(session:Dict[str,Any], messages:List[Dict[str,Any]], reply:str, tools:Dict[str,Any])->Dict[str,Any]:
+    """Record one turn: the client messages not already stored, the assistant reply and fresh per-session tool
+    results."""
+    msgs=[{'role':m['role'],'content':m['content']} for m in messages]
+    session['messages']+=unseen(session['messages'],msgs)+[{'role':'assistant','content':reply}]
+    session['tools'].update(tools); session['turns']+=1
+    return session
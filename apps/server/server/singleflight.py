@@ -0,0 +1,62 @@
+"""Single-flight call coalescing: concurrent callers with the same key share one execution and its result.
+
+`ado` serves coroutines on the event loop, `do` serves blocking functions from worker threads. The leader runs
+the call; followers wait for it and get a deep copy of its result (or its exception), so a burst of identical
+queries costs one downstream call. Nothing is cached: once the call finishes the key is free again. A follower
+that gives up (timeout, cancellation) does not cancel the shared call.
+"""
+import asyncio, copy, json, threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from . import config
+
+def _norm(value:Any)->Any:
+    if isinstance(value,dict): return {str(k):_norm(v) for k,v in value.items()}
+    if isinstance(value,(list,tuple,set,frozenset)): return [_norm(v) for v in (sorted(value,key=str) if isinstance(value,(set,frozenset)) else value)]
+    return value
+
+def key_for(name:str, *args:Any, **kwargs:Any)->Tuple[str,str]:
+    """(name, canonical JSON of the arguments): values are compared exactly, only dict key and set order do not
+    matter. Callers normalize whatever their call itself treats as equal."""
+    return name,json.dumps(_norm([args,kwargs]),sort_keys=True,default=str,separators=(',',':'))
+
+class _Call:
+    __slots__=('done','value','error')
+    def __init__(self): self.done=threading.Event(); self.value=None; self.error=None
+
+class Group:
+    def __init__(self):
+        self._lock=threading.Lock(); self._calls:Dict[Hashable,_Call]={}
+        self._futures:Dict[Tuple[int,Hashable],'asyncio.Future[Any]']={}
+        self.calls=0; self.shared=0
+
+    async def ado(self, key:Hashable, fn:Callable[[],Awaitable[Any]])->Any:
+        if not config.SINGLEFLIGHT: return await fn()
+        k=(id(asyncio.get_running_loop()),key)
+        fut=self._futures.get(k)
+        if fut is not None:
+            self.shared+=1
+            return copy.deepcopy(await asyncio.shield(fut))
+        fut=asyncio.ensure_future(fn()); self._futures[k]=fut; self.calls+=1
+        fut.add_done_callback(lambda f: self._futures.pop(k,None) if self._futures.get(k) is f else None)
+        return await asyncio.shield(fut)
+
+    def do(self, key:Hashable, fn:Callable[[],Any])->Any:
+        if not config.SINGLEFLIGHT: return fn()
+        with self._lock:
+            call=self._calls.get(key); leader=call is None
+            if leader: call=self._calls[key]=_Call(); self.calls+=1
+            else: self.shared+=1
+        if not leader:
+            call.done.wait()
+            if call.error is not None: raise call.error
+            return copy.deepcopy(call.value)
+        try: call.value=fn(); return call.value
+        except BaseException as e: call.error=e; raise
+        finally:
+            with self._lock: self._calls.pop(key,None)
+            call.done.set()
+
+    def stats(self)->Dict[str,int]:
+        with self._lock: return {'calls':self.calls,'shared':self.shared,'in_flight':len(self._calls)+len(self._futures)}
+
+GROUP=Group()
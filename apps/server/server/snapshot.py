@@ -0,0 +1,174 @@
+"""Compact vector snapshots for cold start: export the indexed corpus once, then bulk-load it into a fresh stack
+without a single embedding provider call.
+
+A snapshot is a directory:
+  snapshot.json          dim, dtype, embedding model, point count and the vector block list
+  vectors-NNNNN.npy      float16 rows, or int8 rows plus scales-NNNNN.npy (per-row float32 scale)
+  payloads.npz           columnar payloads: `id` plus one column per payload key (str, int or JSON-encoded)
+  ingest_manifest.json   the ingest manifest, so later incremental runs only embed what changed
+  dedupe/*.npz           near-duplicate indexes of deduped namespaces, so their shared points stay reference-counted
+
+`export_native`/`restore_native` use Qdrant's own collection snapshots instead, for when the target runs the
+same Qdrant version and payload/quantization settings must come along verbatim.
+"""
+import json, os, shutil
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import requests
+from qdrant_client.http.models import PointStruct
+from . import config, collection
+from .local_index import Journal, LocalIndex
+from .embedding import _model_id
+from .dedupe import DedupeIndex
+from .ingest import Manifest, bump_generation, publish_local
+
+FORMAT=1
+Batch=Tuple[List[str],np.ndarray,List[Dict[str,Any]]]
+
+def encode_block(vecs:np.ndarray, dtype:str)->Dict[str,np.ndarray]:
+    vecs=np.asarray(vecs,dtype=np.float32)
+    if dtype=='float16': return {'vectors':vecs.astype(np.float16)}
+    if dtype=='int8':
+        scale=np.abs(vecs).max(axis=1)/127.0; scale[scale==0]=1.0
+        return {'vectors':np.round(vecs/scale[:,None]).astype(np.int8),'scales':scale.astype(np.float32)}
+    raise ValueError(f'unsupported snapshot dtype {dtype!r} (float16 or int8)')
+
+def decode_block(vectors:np.ndarray, scales:Optional[np.ndarray]=None)->np.ndarray:
+    out=vectors.astype(np.float32)
+    return out*scales[:,None] if scales is not None else out
+
+def _column(values:List[Any])->Tuple[str,np.ndarray]:
+    present=[v for v in values if v is not None]
+    if present and all(isinstance(v,bool) for v in present): return 'json',np.asarray([json.dumps(v) for v in values])
+    if present and all(isinstance(v,int) and not isinstance(v,bool) for v in present): return 'int',np.asarray([v if v is not None else 0 for v in values],dtype=np.int64)
+    if all(isinstance(v,str) for v in present): return 'str',np.asarray([v if v is not None else '' for v in values],dtype=str)
+    return 'json',np.asarray([json.dumps(v) for v in values],dtype=str)
+
+def write_payloads(path:str, ids:Sequence[str], payloads:Sequence[Dict[str,Any]]):
+    keys=sorted({k for p in payloads for k in p}); cols={'id':np.asarray(ids,dtype=str)}; kinds={}
+    for i,key in enumerate(keys):
+        kinds[key],cols[f'c{i}']=_column([p.get(key) for p in payloads])
+        cols[f'm{i}']=np.asarray([key in p for p in payloads],dtype=bool)
+    np.savez_compressed(path,schema=np.asarray(json.dumps({'keys':keys,'kinds':kinds})),**cols)
+
+def read_payloads(path:str)->Tuple[List[str],List[Dict[str,Any]]]:
+    with np.load(path) as z:
+        schema=json.loads(str(z['schema'])); ids=z['id'].tolist(); out=[{} for _ in ids]
+        for i,key in enumerate(schema['keys']):
+            kind=schema['kinds'][key]; col=z[f'c{i}'].tolist(); mask=z[f'm{i}']
+            for j in np.flatnonzero(mask): out[j][key]=json.loads(col[j]) if kind=='json' else col[j]
+    return ids,out
+
+def iter_qdrant(client, names:Iterable[str], batch:int)->Iterator[Batch]:
+    for name in names:
+        offset=None
+        while True:
+            points,offset=client.scroll(collection_name=name, limit=batch, offset=offset, with_payload=True, with_vectors=True)
+            if points: yield [str(p.id) for p in points], np.asarray([p.vector for p in points],dtype=np.float32), [p.payload or {} for p in points]
+            if offset is None: break
+
+def iter_local(idx:LocalIndex, batch:int)->Iterator[Batch]:
+    for s in range(0,len(idx),batch):
+        yield idx.ids[s:s+batch], np.asarray(idx.vectors[s:s+batch],dtype=np.float32), idx.payloads[s:s+batch]
+
+def export(out:str, client=None, dtype:Optional[str]=None, namespaces:Optional[Sequence[str]]=None)->Dict[str,Any]:
+    """Write a snapshot of Qdrant (`client`) or, without a client, of the local index; `namespaces` filters points."""
+    dtype=dtype or config.SNAPSHOT_DTYPE; block=config.SNAPSHOT_BLOCK
+    if client is not None: src=iter_qdrant(client, collection.managed_names(client), block)
+    else:
+        idx=LocalIndex.load(config.LOCAL_INDEX_DIR)
+        src=iter_local(idx, block) if idx is not None else iter(())
+    tmp=f'{out.rstrip("/")}.{os.getpid()}.tmp'; shutil.rmtree(tmp,ignore_errors=True); os.makedirs(tmp)
+    ids:List[str]=[]; payloads:List[Dict[str,Any]]=[]; blocks=[]; dim=None
+    try:
+        for bids,vecs,bpay in src:
+            if namespaces:
+                keep=[i for i,p in enumerate(bpay) if p.get('namespace') in namespaces]
+                bids=[bids[i] for i in keep]; vecs=vecs[keep]; bpay=[bpay[i] for i in keep]
+            if not bids: continue
+            dim=vecs.shape[1]; n=len(blocks)
+            for key,arr in encode_block(vecs,dtype).items(): np.save(os.path.join(tmp,f'{key}-{n:05d}.npy'),arr)
+            blocks.append(len(bids)); ids.extend(bids); payloads.extend(bpay)
+        write_payloads(os.path.join(tmp,'payloads.npz'),ids,payloads)
+        if os.path.exists(config.INGEST_MANIFEST): shutil.copyfile(config.INGEST_MANIFEST,os.path.join(tmp,'ingest_manifest.json'))
+        _copy_dedupe(config.DEDUPE_DIR, os.path.join(tmp,'dedupe'), namespaces)
+        meta={'format':FORMAT,'dim':dim or config.EMBED_DIM,'dtype':dtype,'model':_model_id(config.EMBED_PROVIDER),'count':len(ids),'blocks':blocks}
+        with open(os.path.join(tmp,'snapshot.json'),'w',encoding='utf-8') as f: json.dump(meta,f)
+    except BaseException:
+        shutil.rmtree(tmp,ignore_errors=True); raise
+    shutil.rmtree(out,ignore_errors=True); os.replace(tmp,out)
+    return {'snapshot':out,'points':len(ids),'dtype':dtype,'bytes':sum(os.path.getsize(os.path.join(out,f)) for f in os.listdir(out))}
+
+def _copy_dedupe(src:str, dst:str, namespaces:Optional[Sequence[str]]=None):
+    """Copy per-namespace dedupe indexes (all of them, or those of `namespaces`); a copied file replaces the
+    target's index for that namespace."""
+    if not os.path.isdir(src): return
+    wanted={os.path.basename(DedupeIndex.path_for(ns)) for ns in namespaces} if namespaces else None
+    for fname in sorted(os.listdir(src)):
+        if not fname.endswith('.npz') or (wanted is not None and fname not in wanted): continue
+        os.makedirs(dst,exist_ok=True); tmp=os.path.join(dst,f'{fname}.{os.getpid()}.tmp')
+        shutil.copyfile(os.path.join(src,fname),tmp); os.replace(tmp,os.path.join(dst,fname))
+
+def read(path:str)->Tuple[Dict[str,Any],Iterator[Batch]]:
+    """(metadata, batches of (ids, float32 vectors, payloads)) in export order."""
+    with open(os.path.join(path,'snapshot.json'),'r',encoding='utf-8') as f: meta=json.load(f)
+    if meta.get('format')!=FORMAT: raise ValueError(f'unsupported snapshot format {meta.get("format")}')
+    ids,payloads=read_payloads(os.path.join(path,'payloads.npz'))
+    def batches():
+        o=0
+        for n,rows in enumerate(meta['blocks']):
+            vecs=np.load(os.path.join(path,f'vectors-{n:05d}.npy'))
+            spath=os.path.join(path,f'scales-{n:05d}.npy')
+            yield ids[o:o+rows], decode_block(vecs, np.load(spath) if os.path.exists(spath) else None), payloads[o:o+rows]; o+=rows
+    return meta,batches()
+
+def restore(path:str, client=None, force:bool=False)->Dict[str,Any]:
+    """Bulk-load a snapshot into Qdrant (batched upserts, when `client` is given) and the local index, and restore
+    the ingest manifest. Refuses a snapshot embedded with another model/dimension unless `force`."""
+    meta,batches=read(path)
+    model=_model_id(config.EMBED_PROVIDER)
+    if not force and (meta['dim']!=config.EMBED_DIM or meta['model']!=model):
+        raise ValueError(f"snapshot was embedded with {meta['model']}/{meta['dim']}, this stack uses {model}/{config.EMBED_DIM}")
+    journal=Journal(os.path.join(config.LOCAL_INDEX_DIR,'journal'), meta['dim']); ready=set()
+    for ids,vecs,payloads in batches:
+        if client is not None:
+            by_name:Dict[str,List[PointStruct]]={}
+            for pid,v,p in zip(ids,vecs,payloads): by_name.setdefault(collection.name_for(p.get('namespace','')),[]).append(PointStruct(id=pid,vector=v.tolist(),payload=p))
+            for name,points in by_name.items():
+                if name not in ready: collection.ensure(client, name, meta['dim']); ready.add(name)
+                for s in range(0,len(points),config.SNAPSHOT_UPSERT_BATCH):
+                    client.upsert(collection_name=name, points=points[s:s+config.SNAPSHOT_UPSERT_BATCH], wait=False)
+        journal.append(ids,vecs,payloads)
+    version=publish_local(LocalIndex.load(config.LOCAL_INDEX_DIR), journal) if journal else None; journal.clear()
+    src=os.path.join(path,'ingest_manifest.json')
+    if os.path.exists(src):
+        with open(src,'r',encoding='utf-8') as f: snap=json.load(f)
+        manifest=Manifest.load(config.INGEST_MANIFEST)
+        for ns,files in snap.get('namespaces',{}).items(): manifest.files(ns).update(files)
+        manifest.save()
+    _copy_dedupe(os.path.join(path,'dedupe'), config.DEDUPE_DIR)
+    bump_generation()
+    return {'snapshot':path,'points':meta['count'],'collections':sorted(ready),'local_index':version}
+
+def _snapshot_url(name:str, snap:str='')->str: return f"{config.QDRANT_URL.rstrip('/')}/collections/{name}/snapshots{'/'+snap if snap else ''}"
+
+def export_native(client, out:str)->Dict[str,Any]:
+    """Download a Qdrant-native snapshot of every managed collection into `out`."""
+    os.makedirs(out,exist_ok=True); files={}
+    for name in collection.managed_names(client):
+        snap=client.create_snapshot(collection_name=name, wait=True).name
+        with requests.get(_snapshot_url(name,snap), stream=True, timeout=config.QDRANT_TIMEOUT) as r:
+            r.raise_for_status()
+            with open(os.path.join(out,f'{name}.snapshot'),'wb') as f: shutil.copyfileobj(r.raw,f)
+        client.delete_snapshot(collection_name=name, snapshot_name=snap); files[name]=f'{name}.snapshot'
+    with open(os.path.join(out,'native.json'),'w',encoding='utf-8') as f: json.dump({'collections':files},f)
+    return {'snapshot':out,'collections':sorted(files)}
+
+def restore_native(path:str)->Dict[str,Any]:
+    """Upload and recover each collection snapshot written by `export_native` (replaces those collections)."""
+    with open(os.path.join(path,'native.json'),'r',encoding='utf-8') as f: files=json.load(f)['collections']
+    for name,fname in files.items():
+        with open(os.path.join(path,fname),'rb') as fh:
+            r=requests.post(_snapshot_url(name)+'/upload', params={'priority':'snapshot','wait':'true'}, files={'snapshot':(fname,fh)}, timeout=None)
+        r.raise_for_status()
+    return {'snapshot':path,'collections':sorted(files)}
@@ -1,4 +1,9 @@
 # Tool modules for the orchestrator
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
+from ..executor import Step, call
+from ..embed_cache import normalize
+from ..singleflight import GROUP, key_for
 from . import rag
 from . import budget
 from . import avatar
@@ -7,4 +12,150 @@ from . import kyc
 from . import case
 from . import payments
 
-__all__ = ["rag", "budget", "avatar", "crm", "kyc", "case", "payments"]
\ No newline at end of file
+__all__ = ["rag", "budget", "avatar", "crm", "kyc", "case", "payments", "ToolSpec", "Plan", "REGISTRY", "register", "compile_plan"]
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """A context tool the orchestrator may run before composing the reply.
+
+    `run(ctx, deps)` gets the request context (text, user_id, namespaces, persona) and the values of the tools
+    named in `deps`; sync functions are moved off the event loop. `inputs` maps tool-event input names to
+    context keys and must cover everything besides `deps` that the result depends on, since concurrent calls
+    with equal inputs and dependency values share one execution (single-flight). Inputs are compared exactly,
+    except those named in `normalized`, whose whitespace the tool itself ignores. `provides` is the context key
+    the reply reads, and `extract` turns the tool value into that context entry (None leaves it unset).
+    `cost` is a relative estimate used to start cheap tools first.
+    `run_many(ctxs)`, for tools without dependencies, answers many requests in one call (/orchestrate/batch).
+    `per_session` results are kept in the conversation session and reused by its later turns.
+    """
+    name: str
+    run: Callable[[Dict[str, Any], Dict[str, Any]], Any]
+    inputs: Mapping[str, str] = field(default_factory=dict)
+    deps: Tuple[str, ...] = ()
+    cost: float = 1.0
+    provides: str = ""
+    requires: Tuple[str, ...] = ()
+    summary: Callable[[Any], Dict[str, Any]] = lambda value: {}
+    extract: Callable[[Any], Any] = lambda value: value
+    run_many: Optional[Callable[[List[Dict[str, Any]]], Any]] = None
+    per_session: bool = False
+    normalized: Tuple[str, ...] = ()
+
+
+REGISTRY: Dict[str, ToolSpec] = {}
+
+
+def register(spec: ToolSpec) -> ToolSpec:
+    REGISTRY[spec.name] = spec
+    return spec
+
+
+@dataclass
+class Plan:
+    """Tools of one persona pack in dependency order (cheaper first among tools that are ready together).
+    `default` is what runs without a hint: the tools whose output the reply reads, and their dependencies."""
+    specs: Tuple[ToolSpec, ...]
+    default: Optional[Tuple[ToolSpec, ...]] = None
+
+    def __post_init__(self):
+        if self.default is None:
+            self.default = self.specs
+
+    @property
+    def names(self) -> List[str]:
+        return [s.name for s in self.specs]
+
+    @property
+    def default_names(self) -> List[str]:
+        return [s.name for s in self.default]
+
+    def prune(self, hint: Optional[Sequence[str]] = None) -> Tuple[ToolSpec, ...]:
+        """Only the hinted tools and what they depend on; None runs the default tools, an empty hint nothing."""
+        if hint is None:
+            return self.default
+        return _closure(self.specs, frozenset(hint))
+
+    def steps(self, ctx: Dict[str, Any], hint: Optional[Sequence[str]] = None,
+              prefetched: Optional[Mapping[str, Any]] = None) -> List[Step]:
+        """Executor steps for one request; tools missing a required context value are left out. A tool found in
+        `prefetched` (value, or the exception its batched call raised) reuses that result instead of running."""
+        specs = [s for s in self.prune(hint) if all(ctx.get(k) for k in s.requires)]
+        names = {s.name for s in specs}
+        prefetched = prefetched or {}
+        return [Step(s.name, (lambda deps, v=prefetched[s.name]: _ready(v)) if s.name in prefetched else (lambda deps, s=s: _run(s, ctx, deps)),
+                     deps=tuple(d for d in s.deps if d in names), input={arg: ctx.get(key) for arg, key in s.inputs.items()},
+                     summary=s.summary) for s in specs]
+
+
+async def _run(spec: ToolSpec, ctx: Dict[str, Any], deps: Dict[str, Any]) -> Any:
+    inputs = {arg: ctx.get(k) for arg, k in spec.inputs.items()}
+    inputs.update({arg: normalize(inputs[arg]) for arg in spec.normalized if isinstance(inputs.get(arg), str)})
+    key = key_for(spec.name, inputs, deps)
+    return await GROUP.ado(key, lambda: call(spec.run, ctx, deps))
+
+
+async def _ready(value: Any) -> Any:
+    if isinstance(value, BaseException):
+        raise value
+    return value
+
+
+def _closure(specs: Sequence[ToolSpec], wanted: FrozenSet[str]) -> Tuple[ToolSpec, ...]:
+    by_name = {s.name: s for s in specs}
+    keep, todo = set(), [n for n in wanted if n in by_name]
+    while todo:
+        name = todo.pop()
+        if name not in keep:
+            keep.add(name)
+            todo.extend(d for d in by_name[name].deps if d in by_name)
+    return tuple(s for s in specs if s.name in keep)
+
+
+def compile_plan(tools: Sequence[str], uses: Optional[Sequence[str]] = None) -> Plan:
+    """Compile a persona's `tools` into a Plan. With `uses` (the context keys the reply reads), tools whose
+    output is not among them only run when hinted, unless a default tool depends on them. Unregistered names
+    (post-reply tools such as avatar.speak) are ignored; a dependency the persona does not allow is simply not
+    waited for."""
+    specs = [REGISTRY[t] for t in dict.fromkeys(tools) if t in REGISTRY]
+    allowed = {s.name for s in specs}
+    waiting = {s.name: {d for d in s.deps if d in allowed} for s in specs}
+    order: List[ToolSpec] = []
+    while waiting:
+        ready = sorted((s for s in specs if s.name in waiting and not waiting[s.name]), key=lambda s: (s.cost, s.name))
+        if not ready:
+            raise ValueError(f"tool dependency cycle among {sorted(waiting)}")
+        for s in ready:
+            order.append(s)
+            del waiting[s.name]
+        for deps in waiting.values():
+            deps.difference_update(s.name for s in ready)
+    default = None if uses is None else _closure(order, frozenset(s.name for s in order if s.provides in set(uses)))
+    return Plan(tuple(order), default)
+
+
+async def _rag_search(ctx, deps):
+    return await rag.asearch(query=ctx["text"], namespaces=ctx.get("namespaces", []), user_id=ctx["user_id"], k=3)
+
+
+async def _rag_search_many(ctxs):
+    return await rag.asearch_many([c["text"] for c in ctxs], [list(c.get("namespaces", [])) for c in ctxs], k=3)
+
+
+def _kyc_verify(ctx, deps):
+    # mock trigger for new customers
+    if ((deps.get("crm.lookup") or {}).get("customer") or {}).get("segment") != "new":
+        return None
+    return kyc.verify(ctx["user_id"], ["passport", "utility_bill"])
+
+
+register(ToolSpec("rag.search", _rag_search, inputs={"query": "text", "namespaces": "namespaces"}, cost=3.0, provides="rag_results",
+                  summary=lambda out: {"count": len(out)}, run_many=_rag_search_many, normalized=("query",)))
+register(ToolSpec("budget.analyze", lambda ctx, deps: budget.analyze(user_id=ctx["user_id"], horizon_days=30),
+                  inputs={"user_id": "user_id"}, provides="budget", summary=lambda out: {"summary": out.get("summary")}))
+register(ToolSpec("crm.lookup", lambda ctx, deps: crm.lookup(ctx["user_id"]), inputs={"identifier": "user_id"},
+                  cost=2.0, provides="customer", requires=("user_id",), summary=lambda out: {"found": out.get("found")},
+                  extract=lambda out: out.get("customer") if out.get("found") else None,
+                  run_many=lambda ctxs: crm.lookup_many([c["user_id"] for c in ctxs]), per_session=True))
+register(ToolSpec("kyc.verify", _kyc_verify, inputs={"user_id": "user_id"}, deps=("crm.lookup",), cost=2.0,
+                  provides="kyc_status", summary=lambda out: {"status": out.get("overall_status")}, per_session=True))
\ No newline at end of file
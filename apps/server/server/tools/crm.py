@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 def lookup(identifier: str) -> Dict[str, Any]:
     """Mock CRM lookup - returns customer data based on identifier"""
@@ -41,3 +41,8 @@ def lookup(identifier: str) -> Dict[str, Any]:
             "customer": None,
             "suggested_actions": ["verify_identifier", "check_spelling", "search_by_phone"]
         }
+
+def lookup_many(identifiers: List[str]) -> List[Dict[str, Any]]:
+    """Bulk CRM lookup - one round-trip for many identifiers, repeats resolved once"""
+    found = {identifier: lookup(identifier) for identifier in dict.fromkeys(identifiers)}
+    return [found[identifier] for identifier in identifiers]
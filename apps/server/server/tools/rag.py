@@ -1,38 +1,266 @@
-from typing import List, Dict, Any, Optional
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, Filter, FieldCondition, MatchValue
-from .. import config
-from ..embedding import embed_text
+import asyncio, logging, os, threading, time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Set, Tuple, Union
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.http.models import Filter, FieldCondition, MatchValue, SearchRequest
+from .. import config, collection, resilience
+from ..embedding import embed_text, aembed_text, embed_texts, aembed_texts
+from ..local_index import LocalIndex
+from ..lexical import BM25Index, rrf
 
-def _client(): return QdrantClient(url=config.QDRANT_URL)
+logger=logging.getLogger(__name__)
+_CLIENT:Optional[QdrantClient]=None; _ACLIENT:Optional[AsyncQdrantClient]=None
+_LOCK=threading.Lock(); _READY:Set[str]=set()
+_LOCAL:Optional[LocalIndex]=None; _LEXICAL:Optional[BM25Index]=None; _LOCAL_CHECKED=float('-inf')
+_RESULTS:'OrderedDict[tuple,Tuple[float,List[Dict[str,Any]]]]'=OrderedDict(); _GENERATION:Optional[tuple]=None; _GEN_CHECKED=float('-inf')
 
-def _ensure_collection(client, vector_size:int):
-    try:
-        cols=client.get_collections().collections; names=[c.name for c in cols]
-        if config.COLLECTION_NAME not in names:
-            client.recreate_collection(collection_name=config.COLLECTION_NAME, vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE))
-    except Exception:
-        client.recreate_collection(collection_name=config.COLLECTION_NAME, vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE))
+def get_client()->QdrantClient:
+    """Process-wide sync client; its HTTP connection pool is reused across searches."""
+    global _CLIENT
+    with _LOCK:
+        if _CLIENT is None: _CLIENT=QdrantClient(url=config.QDRANT_URL, timeout=config.QDRANT_TIMEOUT, prefer_grpc=config.QDRANT_PREFER_GRPC)
+        return _CLIENT
+
+def get_aclient()->AsyncQdrantClient:
+    global _ACLIENT
+    with _LOCK:
+        if _ACLIENT is None: _ACLIENT=AsyncQdrantClient(url=config.QDRANT_URL, timeout=config.QDRANT_TIMEOUT, prefer_grpc=config.QDRANT_PREFER_GRPC)
+        return _ACLIENT
+
+def ensure_collection(client:QdrantClient, name:Optional[str]=None, vector_size:int=config.EMBED_DIM):
+    """Create the collection (and its payload indexes) if missing. Never drops data; errors propagate."""
+    name=name or config.COLLECTION_NAME
+    collection.ensure(client, name, vector_size); _READY.add(name)
+
+async def aensure_collection(client:AsyncQdrantClient, name:Optional[str]=None, vector_size:int=config.EMBED_DIM):
+    name=name or config.COLLECTION_NAME
+    await collection.aensure(client, name, vector_size); _READY.add(name)
+
+async def astartup():
+    """Lifespan hook: open the shared clients and bootstrap the collection once."""
+    local_index()
+    if config.RAG_BACKEND=='local': return
+    get_client(); client=get_aclient()
+    if config.COLLECTION_LAYOUT=='per_namespace': return
+    try: await aensure_collection(client)
+    except Exception as e: logger.warning('qdrant collection bootstrap failed, will retry on first search: %s', e)
+
+async def ashutdown():
+    global _CLIENT, _ACLIENT
+    with _LOCK: client, aclient, _CLIENT, _ACLIENT = _CLIENT, _ACLIENT, None, None; _READY.clear()
+    if aclient is not None: await aclient.close()
+    if client is not None: client.close()
 
 def _ns_filter(namespaces: List[str]) -> Optional[Filter]:
     if not namespaces: return None
     should=[FieldCondition(key='namespace', match=MatchValue(value=ns)) for ns in namespaces]
     return Filter(should=should)
 
-def search(query:str, namespaces:List[str], user_id:str, k:int=3)->List[Dict[str,Any]]:
+def _to_chunks(results)->List[Dict[str,Any]]:
+    out=[]
+    for r in results:
+        p=r.payload or {}
+        out.append({'id':str(r.id),'text':p.get('text',''),'source':p.get('source',''),'namespace':p.get('namespace',''),'score':float(r.score)})
+    return out
+
+def local_index()->Optional[LocalIndex]:
+    """The on-disk local index (memory-mapped), reloaded when ingest publishes a new version."""
+    global _LOCAL, _LEXICAL, _LOCAL_CHECKED
+    now=time.monotonic()
+    if now-_LOCAL_CHECKED<config.LOCAL_INDEX_RELOAD_SECS: return _LOCAL
+    with _LOCK:
+        _LOCAL_CHECKED=now
+        version=LocalIndex.current_version(config.LOCAL_INDEX_DIR)
+        if version is None: _LOCAL=_LEXICAL=None
+        elif _LOCAL is None or _LOCAL.version!=version:
+            try:
+                _LOCAL=LocalIndex.load(config.LOCAL_INDEX_DIR)
+                _LEXICAL=BM25Index.load(os.path.join(config.LOCAL_INDEX_DIR,version))
+            except Exception as e: logger.warning('failed to load local index %s: %s', version, e)
+        return _LOCAL
+
+def read_generation()->Optional[str]:
+    try:
+        with open(config.RAG_GENERATION_FILE,'r',encoding='utf-8') as f: return f.read().strip()
+    except OSError: return None
+
+def invalidate():
+    """Drop every cached search result (ingest in this process, or a new content generation on disk)."""
+    with _LOCK: _RESULTS.clear()
+
+def _check_generation():
+    """Clear the result cache when ingest has published new content (local index version or generation file)."""
+    global _GENERATION, _GEN_CHECKED
+    now=time.monotonic()
+    if now-_GEN_CHECKED<config.LOCAL_INDEX_RELOAD_SECS: return
+    _GEN_CHECKED=now
+    gen=(LocalIndex.current_version(config.LOCAL_INDEX_DIR),read_generation())
+    if gen!=_GENERATION: _GENERATION=gen; invalidate()
+
+def _cache_key(query:str, namespaces:List[str], k:int, mode:str)->Optional[tuple]:
+    if config.RAG_CACHE_SIZE<=0: return None
+    _check_generation()
+    return (config.RAG_BACKEND,mode,k,query,tuple(sorted(namespaces or [])))
+
+def _cache_get(key:Optional[tuple])->Optional[List[Dict[str,Any]]]:
+    if key is None: return None
+    with _LOCK:
+        hit=_RESULTS.get(key)
+        if hit is None: return None
+        if time.monotonic()-hit[0]>config.RAG_CACHE_TTL: del _RESULTS[key]; return None
+        _RESULTS.move_to_end(key)
+    return [dict(c) for c in hit[1]]
+
+def _cache_put(key:Optional[tuple], hits:List[Dict[str,Any]])->List[Dict[str,Any]]:
+    if key is not None:
+        with _LOCK:
+            _RESULTS[key]=(time.monotonic(),[dict(c) for c in hits])
+            while len(_RESULTS)>config.RAG_CACHE_SIZE: _RESULTS.popitem(last=False)
+    return hits
+
+def lexical_search(query:str, namespaces:List[str], k:int)->List[Dict[str,Any]]:
+    """BM25 hits over the local index corpus, in the same chunk shape as vector results."""
+    idx=local_index(); lex=_LEXICAL
+    if idx is None or lex is None: return []
+    return [idx.chunk(row,score) for row,score in lex.search(query, namespaces, k) if row<len(idx)]
+
+def _fuse(query:str, vec_hits:List[Dict[str,Any]], namespaces:List[str], k:int, mode:str)->List[Dict[str,Any]]:
+    if mode!='hybrid': return vec_hits[:k]
+    return rrf([vec_hits, lexical_search(query, namespaces, config.RAG_HYBRID_CANDIDATES)], k, config.RAG_RRF_K)
+
+def _candidates(k:int, mode:str)->int: return max(k, config.RAG_HYBRID_CANDIDATES) if mode=='hybrid' else k
+
+def _local_search(qvec:List[float], namespaces:List[str], k:int)->List[Dict[str,Any]]:
+    idx=local_index()
+    return idx.search(qvec, namespaces, k) if idx is not None else []
+
+def _fallback(query:str, qvec, namespaces:List[str], k:int, mode:str, err:Exception)->List[Dict[str,Any]]:
+    """Hits after a failed search: the local index when Qdrant was the one failing, otherwise only what `_fuse`
+    adds lexically; a failing fallback yields no hits rather than an error."""
+    local=config.RAG_BACKEND=='local'
+    if local: logger.warning('local index search failed: %s', err)
+    else: logger.warning('qdrant search failed, serving from local index: %s', err)
+    try: return _fuse(query, _local_search(qvec, namespaces, _candidates(k,mode)) if qvec is not None and not local else [], namespaces, k, mode)
+    except Exception as e:
+        logger.warning('local index fallback failed, returning no hits: %s', e); return []
+
+Route=Dict[str,List[Tuple[int,Optional[Filter]]]]
+
+def _routes(per_ns:List[List[str]], all_names:Optional[List[str]]=None)->Route:
+    """collection -> [(query index, namespace filter)]; queries without namespaces under the
+    per_namespace layout fan out to every routed collection (`all_names`)."""
+    out:Route={}
+    for qi,ns in enumerate(per_ns):
+        routes=collection.route(ns) if ns or config.COLLECTION_LAYOUT!='per_namespace' else {n:[] for n in (all_names or [])}
+        for name,sub in routes.items(): out.setdefault(name,[]).append((qi,_ns_filter(sub)))
+    return out
+
+def _needs_all(per_ns:List[List[str]])->bool: return config.COLLECTION_LAYOUT=='per_namespace' and any(not ns for ns in per_ns)
+
+def _merge(n:int, parts, limit:int)->List[List[Dict[str,Any]]]:
+    merged:List[List[Dict[str,Any]]]=[[] for _ in range(n)]
+    for items,results in parts:
+        for (qi,_),res in zip(items,results): merged[qi].extend(_to_chunks(res))
+    if config.COLLECTION_LAYOUT=='per_namespace': merged=[sorted(h,key=lambda c:-c['score'])[:limit] for h in merged]
+    return merged
+
+def _collection_search(client:QdrantClient, name:str, vecs, items, limit:int):
+    def call():
+        if len(items)==1:
+            qi,flt=items[0]
+            return [client.search(collection_name=name, query_vector=vecs[qi], query_filter=flt, limit=limit, with_payload=True, search_params=collection.search_params())]
+        return client.search_batch(collection_name=name, requests=_batch_requests(vecs, items, limit))
+    if name not in _READY: ensure_collection(client, name)
+    try: return call()
+    except Exception as e:
+        if not collection.is_not_found(e): raise
+        _READY.discard(name); ensure_collection(client, name); return call()
+
+async def _acollection_search(client:AsyncQdrantClient, name:str, vecs, items, limit:int):
+    async def call():
+        if len(items)==1:
+            qi,flt=items[0]
+            return [await client.search(collection_name=name, query_vector=vecs[qi], query_filter=flt, limit=limit, with_payload=True, search_params=collection.search_params())]
+        return await client.search_batch(collection_name=name, requests=_batch_requests(vecs, items, limit))
+    if name not in _READY: await aensure_collection(client, name)
+    try: return await call()
+    except Exception as e:
+        if not collection.is_not_found(e): raise
+        _READY.discard(name); await aensure_collection(client, name); return await call()
+
+def _qdrant_search(vecs, per_ns:List[List[str]], limit:int)->List[List[Dict[str,Any]]]:
+    """Vector hits per query: one search (or search_batch) call per collection touched."""
+    client=get_client()
+    routes=_routes(per_ns, collection.managed_names(client) if _needs_all(per_ns) else None)
+    return _merge(len(vecs), [(items,_collection_search(client,name,vecs,items,limit)) for name,items in routes.items()], limit)
+
+async def _aqdrant_search(vecs, per_ns:List[List[str]], limit:int)->List[List[Dict[str,Any]]]:
+    client=get_aclient()
+    routes=_routes(per_ns, await collection.amanaged_names(client) if _needs_all(per_ns) else None)
+    results=await asyncio.gather(*(_acollection_search(client,name,vecs,items,limit) for name,items in routes.items()))
+    return _merge(len(vecs), list(zip(routes.values(),results)), limit)
+
+def search(query:str, namespaces:List[str], user_id:str, k:int=3, mode:Optional[str]=None)->List[Dict[str,Any]]:
+    """Top-k chunks for `query` within `namespaces`. mode='hybrid' fuses vector and BM25 rankings with RRF.
+    Results are cached in-process (RAG_CACHE_SIZE/RAG_CACHE_TTL) until ingest publishes new content."""
+    mode=mode or config.RAG_MODE; limit=_candidates(k,mode); qvec=None
+    key=_cache_key(query, namespaces, k, mode)
+    if (hit:=_cache_get(key)) is not None: return hit
     try:
-        client=_client(); _ensure_collection(client, config.EMBED_DIM)
         qvec=embed_text(query or '')
-        flt=_ns_filter(namespaces)
-        results=client.search(collection_name=config.COLLECTION_NAME, query_vector=qvec, query_filter=flt, limit=k, with_payload=True)
-        out=[]
-        for r in results:
-            p=r.payload or {}
-            out.append({'id':str(r.id),'text':p.get('text',''),'source':p.get('source',''),'namespace':p.get('namespace',''),'score':float(r.score)})
-        return out
-    except Exception:
-        return [
-            {'id':'stub1','text':'KYC policy: verify ID and address for all new accounts.','source':'bank/policies/kyc.md','score':0.89},
-            {'id':'stub2','text':'Queue triage: escalate if wait > 10 minutes for premium clients.','source':'bank/ops/queue.md','score':0.77},
-            {'id':'stub3','text':'FAQ: appointment scheduling available via kiosk or web.','source':'bank/faqs/appointments.md','score':0.72},
-        ][:k]
+        if config.RAG_BACKEND=='local': return _cache_put(key, _fuse(query, _local_search(qvec, namespaces, limit), namespaces, k, mode))
+        return _cache_put(key, _fuse(query, resilience.call('qdrant', lambda: _qdrant_search([qvec], [list(namespaces or [])], limit))[0], namespaces, k, mode))
+    except Exception as e: return _fallback(query, qvec, namespaces, k, mode, e)
+
+async def asearch(query:str, namespaces:List[str], user_id:str, k:int=3, mode:Optional[str]=None)->List[Dict[str,Any]]:
+    """Async twin of `search` on the shared AsyncQdrantClient and the async embedding path."""
+    mode=mode or config.RAG_MODE; limit=_candidates(k,mode); qvec=None
+    key=_cache_key(query, namespaces, k, mode)
+    if (hit:=_cache_get(key)) is not None: return hit
+    try:
+        qvec=await aembed_text(query or '')
+        if config.RAG_BACKEND=='local': return _cache_put(key, _fuse(query, _local_search(qvec, namespaces, limit), namespaces, k, mode))
+        return _cache_put(key, _fuse(query, (await resilience.acall('qdrant', lambda: _aqdrant_search([qvec], [list(namespaces or [])], limit)))[0], namespaces, k, mode))
+    except Exception as e: return _fallback(query, qvec, namespaces, k, mode, e)
+
+def _per_query(queries:Sequence[str], namespaces:Union[List[str],List[List[str]]])->List[List[str]]:
+    if namespaces and isinstance(namespaces[0],(list,tuple)):
+        if len(namespaces)!=len(queries): raise ValueError('need one namespace list per query')
+        return [list(ns) for ns in namespaces]
+    return [list(namespaces or [])]*len(queries)
+
+def _batch_requests(vecs, items, limit:int)->List[SearchRequest]:
+    return [SearchRequest(vector=vecs[qi], filter=flt, limit=limit, with_payload=True, params=collection.search_params()) for qi,flt in items]
+
+def search_many(queries:Sequence[str], namespaces:Union[List[str],List[List[str]]], k:int=3, mode:Optional[str]=None, user_id:str='')->List[List[Dict[str,Any]]]:
+    """Batch `search`: one embedding call and one Qdrant search_batch per collection for all queries, results in
+    input order. `namespaces` is shared by all queries or given per query; failures fall back query by query."""
+    queries=list(queries); per_ns=_per_query(queries, namespaces)
+    if not queries: return []
+    mode=mode or config.RAG_MODE; limit=_candidates(k,mode)
+    try: vecs=embed_texts([q or '' for q in queries])
+    except Exception as e:
+        logger.warning('batch embedding failed, searching per query: %s', e)
+        return [search(q, ns, user_id, k, mode) for q,ns in zip(queries,per_ns)]
+    hits=None
+    if config.RAG_BACKEND!='local':
+        try: hits=resilience.call('qdrant', lambda: _qdrant_search(vecs, per_ns, limit), batch=len(vecs)>1)
+        except Exception as e: logger.warning('qdrant search_batch failed, serving from local index: %s', e)
+    if hits is None: hits=[_local_search(v, ns, limit) for v,ns in zip(vecs,per_ns)]
+    return [_fuse(q, h, ns, k, mode) for q,h,ns in zip(queries,hits,per_ns)]
+
+async def asearch_many(queries:Sequence[str], namespaces:Union[List[str],List[List[str]]], k:int=3, mode:Optional[str]=None, user_id:str='')->List[List[Dict[str,Any]]]:
+    """Async twin of `search_many`."""
+    queries=list(queries); per_ns=_per_query(queries, namespaces)
+    if not queries: return []
+    mode=mode or config.RAG_MODE; limit=_candidates(k,mode)
+    try: vecs=await aembed_texts([q or '' for q in queries])
+    except Exception as e:
+        logger.warning('batch embedding failed, searching per query: %s', e)
+        return [await asearch(q, ns, user_id, k, mode) for q,ns in zip(queries,per_ns)]
+    hits=None
+    if config.RAG_BACKEND!='local':
+        try: hits=await resilience.acall('qdrant', lambda: _aqdrant_search(vecs, per_ns, limit), batch=len(vecs)>1)
+        except Exception as e: logger.warning('qdrant search_batch failed, serving from local index: %s', e)
+    if hits is None: hits=[_local_search(v, ns, limit) for v,ns in zip(vecs,per_ns)]
+    return [_fuse(q, h, ns, k, mode) for q,h,ns in zip(queries,hits,per_ns)]
@@ -0,0 +1,69 @@
+"""Continuous ingestion: watch a source tree and feed debounced batches of changed files to `ingest`.
+
+Uses watchfiles (inotify/FSEvents, shipped with uvicorn[standard]) when available and falls back to polling
+file mtimes/sizes. Each batch goes through the incremental path with `paths=`, so only the touched files are
+hashed, chunked and embedded; `ingest` bumps the content generation, which clears servers' RAG result caches.
+"""
+import logging, threading, time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+from . import config
+from .chunking import SUPPORTED
+from .ingest import ingest
+
+logger=logging.getLogger(__name__)
+
+def as_source(src:str, path:str)->str:
+    """Map a watcher path back to the form `ingest` records sources in (rooted at `src` as given)."""
+    root=Path(src)
+    try: return str(root/Path(path).resolve().relative_to(root.resolve())) if root.is_dir() else src
+    except ValueError: return path
+
+def _wanted(path:str)->bool: return Path(path).suffix.lower() in SUPPORTED
+
+def snapshot(src:str)->Dict[str,Tuple[int,int]]:
+    root=Path(src); out={}
+    for f in (root.rglob('*') if root.is_dir() else [root]):
+        if not _wanted(str(f)): continue
+        try: st=f.stat()
+        except OSError: continue
+        if f.is_file(): out[str(f)]=(st.st_mtime_ns,st.st_size)
+    return out
+
+def poll_changes(src:str, stop:threading.Event, poll:Optional[float]=None, debounce:Optional[float]=None)->Iterator[Set[str]]:
+    """Changed paths, batched until the tree has been quiet for `debounce` seconds."""
+    poll=config.WATCH_POLL_SECS if poll is None else poll; debounce=config.WATCH_DEBOUNCE_SECS if debounce is None else debounce
+    prev=snapshot(src); pending:Set[str]=set(); last=0.0
+    while not stop.wait(poll):
+        cur=snapshot(src)
+        changed={p for p in cur.keys()|prev.keys() if cur.get(p)!=prev.get(p)}; prev=cur
+        if changed: pending|=changed; last=time.monotonic()
+        if pending and time.monotonic()-last>=debounce: yield pending; pending=set()
+
+def fs_changes(src:str, stop:threading.Event, debounce:Optional[float]=None)->Iterator[Set[str]]:
+    from watchfiles import watch
+    debounce=config.WATCH_DEBOUNCE_SECS if debounce is None else debounce
+    for batch in watch(src, debounce=int(debounce*1000), stop_event=stop, watch_filter=lambda _,p: _wanted(p)):
+        yield {p for _,p in batch}
+
+def changes(src:str, stop:threading.Event)->Iterator[Set[str]]:
+    backend=config.WATCH_BACKEND
+    if backend!='poll':
+        try: import watchfiles  # noqa: F401
+        except ImportError:
+            if backend=='inotify': raise
+            logger.info('watchfiles not installed, polling %s every %ss', src, config.WATCH_POLL_SECS)
+        else: return fs_changes(src, stop)
+    return poll_changes(src, stop)
+
+def watch(ns:str, src:str, client=None, stop:Optional[threading.Event]=None, on_result:Optional[Callable[[Dict[str,Any]],None]]=None,
+          **kw)->None:
+    """Sync once, then re-ingest each debounced batch of changes until `stop` is set. A failed batch is logged and
+    its paths are carried into the next one (unchanged files among them are skipped via the manifest)."""
+    stop=stop or threading.Event(); report=on_result or (lambda r: None); retry:Set[str]=set()
+    report(ingest(ns, src, client=client, **kw))
+    for batch in changes(src, stop):
+        paths=retry|{as_source(src,p) for p in batch}; retry=set()
+        try: report(ingest(ns, src, client=client, paths=paths, **kw))
+        except Exception as e: retry=paths; logger.warning('watch ingest of %d file(s) failed: %s', len(paths), e)
+        if stop.is_set(): break
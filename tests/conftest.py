@@ -0,0 +1,14 @@
+import os
+import sys
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent.parent / "apps" / "server"
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+# Unit tests never talk to a real Redis; keep the embedding cache and sessions in-process.
+os.environ.setdefault("EMBED_CACHE_REDIS", "0")
+os.environ.setdefault("SESSION_REDIS", "0")
+# Search results and replies are cached per process; tests that exercise the cache enable it explicitly.
+os.environ.setdefault("RAG_CACHE_SIZE", "0")
+os.environ.setdefault("REPLY_CACHE_SIZE", "0")
@@ -0,0 +1,40 @@
+from server import chunking, config
+
+
+def _chunks(tmp_path, name, body, **kw):
+    p = tmp_path / name
+    p.write_text(body)
+    return list(chunking.pack(chunking.events(p), **kw)) if kw else list(chunking.chunk_file(p))
+
+
+def test_pack_respects_budget_and_overlaps():
+    words = " ".join(f"w{i}" for i in range(50))
+    chunks = list(chunking.pack([(None, words)], max_tokens=20, overlap=5))
+    assert all(chunking.count_tokens(text) <= 20 for _, text in chunks)
+    first, second = chunks[0][1].split(), chunks[1][1].split()
+    assert first[-5:] == second[:5]
+    assert chunks[-1][1].split()[-1] == "w49"
+
+
+def test_markdown_chunks_never_cross_sections(tmp_path):
+    body = "# Fees\nNSF fees apply.\n\n## Waivers\nPremium clients are exempt.\n\n# KYC\nVerify ID.\n"
+    chunks = _chunks(tmp_path, "p.md", body, max_tokens=100, overlap=10)
+    assert chunks == [("Fees", "# Fees NSF fees apply."),
+                      ("Fees > Waivers", "## Waivers Premium clients are exempt."),
+                      ("KYC", "# KYC Verify ID.")]
+
+
+def test_html_csv_and_jsonl_are_read(tmp_path):
+    html = _chunks(tmp_path, "p.html", "<html><head><style>x{}</style></head><body><h1>Fees</h1><p>NSF &amp; overdraft</p></body></html>")
+    assert html == [("Fees", "Fees NSF & overdraft")]
+    rows = _chunks(tmp_path, "r.csv", "product,rate\nsavings,2.1\nchequing,0.1\n")
+    assert rows == [(None, "product: savings; rate: 2.1 product: chequing; rate: 0.1")]
+    docs = _chunks(tmp_path, "d.jsonl", '{"title": "FAQ", "text": "Cards ship in 5 days."}\n\n{"q": "hours", "a": "9-5"}\n')
+    assert docs == [("FAQ", "Cards ship in 5 days."), (None, "q: hours; a: 9-5")]
+
+
+def test_large_files_are_memory_mapped(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_MMAP_BYTES", 1)
+    p = tmp_path / "big.txt"
+    p.write_text("first paragraph\n\nsecond paragraph\n")
+    assert list(chunking.events(p)) == [(None, "first paragraph"), (None, "second paragraph")]
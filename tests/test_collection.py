@@ -0,0 +1,41 @@
+from qdrant_client.http.models import (CollectionConfig, CollectionInfo, CollectionParams, CollectionStatus,
+    Disabled, HnswConfig, OptimizersConfig, VectorParams, Distance, WalConfig)
+
+from server import collection, config
+
+
+def _info(m=16, ef=100, on_disk=False, quant=None):
+    return CollectionInfo(
+        status=CollectionStatus.GREEN, optimizer_status="ok", segments_count=1, payload_schema={},
+        config=CollectionConfig(
+            params=CollectionParams(vectors=VectorParams(size=8, distance=Distance.COSINE, on_disk=on_disk)),
+            hnsw_config=HnswConfig(m=m, ef_construct=ef, full_scan_threshold=10000),
+            optimizer_config=OptimizersConfig(deleted_threshold=0.2, vacuum_min_vector_number=1000,
+                                              default_segment_number=0, flush_interval_sec=5),
+            wal_config=WalConfig(wal_capacity_mb=32, wal_segments_ahead=0),
+            quantization_config=quant,
+        ),
+    )
+
+
+def test_no_changes_when_collection_matches(monkeypatch):
+    monkeypatch.setattr(config, "QDRANT_QUANTIZATION", "none")
+    assert collection._diff(_info()) == {}
+
+
+def test_diff_detects_hnsw_quantization_and_on_disk(monkeypatch):
+    monkeypatch.setattr(config, "QDRANT_HNSW_M", 32)
+    monkeypatch.setattr(config, "QDRANT_QUANTIZATION", "int8")
+    monkeypatch.setattr(config, "QDRANT_VECTORS_ON_DISK", True)
+    changes = collection._diff(_info())
+    assert changes["hnsw_config"].m == 32
+    assert changes["quantization_config"].scalar.type == "int8"
+    assert changes["vectors_config"][""].on_disk is True
+    params = collection.search_params()
+    assert params.quantization.rescore is True and params.hnsw_ef == config.QDRANT_HNSW_EF
+
+
+def test_disabling_quantization(monkeypatch):
+    monkeypatch.setattr(config, "QDRANT_QUANTIZATION", "none")
+    quant = collection.ScalarQuantization(scalar=collection.ScalarQuantizationConfig(type="int8"))
+    assert collection._diff(_info(quant=quant))["quantization_config"] == Disabled.DISABLED
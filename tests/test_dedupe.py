@@ -0,0 +1,26 @@
+from server import config, dedupe
+
+BOILER = "This communication is confidential and intended only for the named recipient of the bank."
+
+
+def test_minhash_estimates_similarity():
+    a = dedupe.minhash(BOILER + " Ref 1.")
+    assert dedupe.similarity(a, dedupe.minhash(BOILER + " Ref 2.")) > 0.7
+    assert dedupe.similarity(a, dedupe.minhash("NSF fees apply to bounced payments.")) < 0.2
+
+
+def test_index_refcounts_sources(tmp_path):
+    idx = dedupe.DedupeIndex(threshold=0.7)
+    sig = dedupe.minhash(BOILER)
+    idx.add("p1", sig, "a.md")
+    assert idx.find(dedupe.minhash(BOILER + " Thanks.")) == "p1"
+    assert idx.find(dedupe.minhash("Escalate premium clients after ten minutes.")) is None
+    idx.ref("p1", "b.md", "p2")
+    idx.ref("p1", "b.md", "p3")
+    assert idx.take_dirty() == {"p1": ["a.md", "b.md"]}
+    path = str(tmp_path / "ns.npz")
+    idx.save(path)
+    loaded = dedupe.DedupeIndex.load(path)
+    assert loaded.unref("p1", "a.md", "p1") == ["b.md"] and loaded.unref("p1", "b.md", "p2") == ["b.md"]
+    assert loaded.unref("p1", "b.md", "p3") == []
+    assert len(loaded) == 0 and loaded.find(sig) is None
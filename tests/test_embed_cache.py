@@ -0,0 +1,71 @@
+import numpy as np
+
+from server import embedding
+from server.embed_cache import EmbeddingCache, cache_key
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def mget(self, keys):
+        return [self.store.get(k) for k in keys]
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    def execute(self):
+        pass
+
+
+class BrokenRedis(FakeRedis):
+    def mget(self, keys):
+        raise ConnectionError("redis down")
+
+
+def test_key_ignores_whitespace_and_scopes_by_model():
+    assert cache_key("hash", "hash", 8, " what's  my\nbalance ") == cache_key("hash", "hash", 8, "what's my balance")
+    assert cache_key("hash", "hash", 8, "x") != cache_key("openai", "m", 8, "x")
+
+
+def test_lru_evicts_oldest_and_counts():
+    cache = EmbeddingCache(max_items=2)
+    cache.put_many(["a", "b"], [[1.0], [2.0]])
+    cache.get_many(["a"])
+    cache.put_many(["c"], [[3.0]])
+    found = cache.get_many(["a", "b", "c"])
+    assert found[1] is None and found[0][0] == 1.0 and found[2][0] == 3.0
+    stats = cache.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 1 and stats["size"] == 2
+
+
+def test_redis_tier_refills_lru():
+    redis = FakeRedis()
+    EmbeddingCache(max_items=4, redis_client=redis).put_many(["k"], [[0.5, 0.25]])
+    cold = EmbeddingCache(max_items=4, redis_client=redis)
+    (vec,) = cold.get_many(["k"])
+    np.testing.assert_allclose(vec, [0.5, 0.25])
+    assert cold.stats()["redis_hits"] == 1
+    cold.get_many(["k"])
+    assert cold.stats()["hits"] == 1
+
+
+def test_redis_errors_are_not_fatal():
+    cache = EmbeddingCache(max_items=4, redis_client=BrokenRedis())
+    assert cache.get_many(["x"]) == [None]
+    assert cache.stats()["redis_errors"] == 1
+
+
+def test_embed_texts_only_embeds_misses(monkeypatch):
+    monkeypatch.setattr(embedding.config, "EMBED_PROVIDER", "hash")
+    monkeypatch.setattr(embedding, "_CACHE", EmbeddingCache(max_items=16))
+    calls = []
+    real = embedding._embed_uncached
+    monkeypatch.setattr(embedding, "_embed_uncached", lambda texts: calls.append(list(texts)) or real(texts))
+    first = embedding.embed_texts(["hi there", "balance?", "hi  there"])
+    second = embedding.embed_texts(["balance?"])
+    assert calls == [["hi there", "balance?"]]
+    assert first[0] == first[2] and second[0] == first[1]
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from server.embed_client import EmbeddingClient, EmbeddingError
+
+
+class _MockEmbeddings(BaseHTTPRequestHandler):
+    fail_first = 0
+    calls = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = type(self)
+        cls.calls.append(body["input"])
+        if len(cls.calls) <= cls.fail_first:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        # Reverse the data order; the client must restore it from `index`.
+        data = [{"index": i, "embedding": [float(len(t)), float(i)]} for i, t in enumerate(body["input"])]
+        payload = json.dumps({"data": list(reversed(data))}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    handler = type("Handler", (_MockEmbeddings,), {"fail_first": 0, "calls": []})
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv, handler
+    srv.shutdown()
+
+
+def _client(srv, **kw):
+    return EmbeddingClient(f"http://127.0.0.1:{srv.server_port}/v1", "test-key", "m", backoff=0, **kw)
+
+
+def test_batches_requests_and_preserves_order(server):
+    srv, handler = server
+    texts = ["a" * n for n in range(1, 8)]
+    out = _client(srv, batch_size=3, max_concurrency=2).embed(texts)
+    assert [v[0] for v in out] == [float(n) for n in range(1, 8)]
+    assert sorted(len(c) for c in handler.calls) == [1, 3, 3]
+
+
+def test_retries_rate_limited_requests(server):
+    srv, handler = server
+    handler.fail_first = 2
+    out = _client(srv, max_retries=3).embed(["hi"])
+    assert out == [[2.0, 0.0]]
+    assert len(handler.calls) == 3
+
+
+def test_gives_up_after_max_retries(server):
+    srv, handler = server
+    handler.fail_first = 10
+    with pytest.raises(EmbeddingError):
+        _client(srv, max_retries=1).embed(["hi"])
+    assert len(handler.calls) == 2
+
+
+def test_async_embed_matches_sync(server):
+    srv, handler = server
+    texts = ["x" * n for n in range(1, 6)]
+    client = _client(srv, batch_size=2, max_concurrency=2)
+
+    async def run():
+        try:
+            return await client.aembed(texts)
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == client.embed(texts)
@@ -0,0 +1,44 @@
+import hashlib
+import math
+
+import numpy as np
+import pytest
+
+from server import embedding
+from server.embed_cache import EmbeddingCache
+
+
+@pytest.fixture(autouse=True)
+def local_cache(monkeypatch):
+    monkeypatch.setattr(embedding, "_CACHE", EmbeddingCache(max_items=64))
+
+
+def _reference_hash_embed(text, dim):
+    vec = [0.0] * dim
+    for tok in text.lower().split():
+        h = int(hashlib.sha256(tok.encode("utf-8")).hexdigest(), 16)
+        vec[h % dim] += ((h >> 8) % 1000) / 1000.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def test_batch_matches_per_text_reference():
+    texts = ["What's my balance?", "KYC policy for NEW accounts", "", "kyc kyc kyc"]
+    mat = embedding._hash_embed_batch(texts, 64)
+    assert mat.shape == (4, 64) and mat.dtype == np.float32
+    for row, text in zip(mat, texts):
+        np.testing.assert_allclose(row, _reference_hash_embed(text, 64), atol=1e-6)
+
+
+def test_rows_are_unit_norm_or_zero():
+    mat = embedding._hash_embed_batch(["a b c", "   ", "hello world"], 32)
+    norms = np.linalg.norm(mat, axis=1)
+    np.testing.assert_allclose(norms, [1.0, 0.0, 1.0], atol=1e-6)
+
+
+def test_embed_texts_preserves_order(monkeypatch):
+    monkeypatch.setattr(embedding.config, "EMBED_PROVIDER", "hash")
+    out = embedding.embed_texts(["first", "second"])
+    assert out[0] == embedding.embed_text("first")
+    assert out[1] == embedding.embed_text("second")
+    assert embedding.embed_texts([]) == []
@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+import pytest
+
+from server import executor
+from server.executor import Step
+
+
+def _sleep(value, secs):
+    async def run(deps):
+        await asyncio.sleep(secs)
+        return value
+    return run
+
+
+def test_independent_steps_overlap_and_dependents_wait():
+    seen = {}
+
+    async def kyc(deps):
+        seen.update(deps)
+        return "kyc"
+
+    steps = [Step("rag", _sleep("r", 0.1)), Step("crm", _sleep("c", 0.1)), Step("kyc", kyc, deps=("crm",))]
+    start = time.monotonic()
+    out = asyncio.run(executor.execute(steps, executor.deadline_in(1000)))
+    assert time.monotonic() - start < 0.18
+    assert {n: o.value for n, o in out.items()} == {"rag": "r", "crm": "c", "kyc": "kyc"} and seen == {"crm": "c"}
+
+
+def test_timeout_degrades_and_skips_dependents(monkeypatch):
+    monkeypatch.setattr(executor.config, "TOOL_TIMEOUTS", {"crm": 20})
+    steps = [Step("crm", _sleep("c", 1), summary=lambda v: {"found": True}), Step("kyc", _sleep("k", 0), deps=("crm",))]
+    out = asyncio.run(executor.execute(steps, executor.deadline_in(1000)))
+    assert (out["crm"].status, out["kyc"].status) == ("timeout", "skipped")
+    assert executor.event_output(steps[0], out["crm"])["degraded"] is True
+    assert executor.event_output(steps[1], out["kyc"]) is None
+
+
+def test_deadline_caps_every_step_and_required_tools_fail(monkeypatch):
+    out = asyncio.run(executor.execute([Step("rag", _sleep("r", 1))], executor.deadline_in(30)))
+    assert out["rag"].status == "timeout" and out["rag"].elapsed_ms < 200
+    monkeypatch.setattr(executor.config, "TOOL_REQUIRED", {"rag"})
+    with pytest.raises(executor.ToolFailure):
+        asyncio.run(executor.execute([Step("rag", _sleep("r", 1)), Step("other", _sleep("o", 0))], executor.deadline_in(30)))
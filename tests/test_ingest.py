@@ -0,0 +1,117 @@
+import pytest
+
+from server import config, ingest
+from server.local_index import LocalIndex
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(config, "INGEST_MANIFEST", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(config, "RAG_GENERATION_FILE", str(tmp_path / "generation"))
+    monkeypatch.setattr(config, "DEDUPE_DIR", str(tmp_path / "dedupe"))
+    src = tmp_path / "src"
+    (src / "policies").mkdir(parents=True)
+    (src / "ops").mkdir()
+    (src / "policies" / "kyc.md").write_text("KYC: verify ID and address.")
+    (src / "policies" / "fees.md").write_text("NSF fees apply to bounced payments.")
+    (src / "ops" / "queue.md").write_text("Escalate premium clients after 10 minutes.")
+    return src
+
+
+def _sources():
+    return sorted(p["source"].rsplit("/", 1)[-1] for p in LocalIndex.load(config.LOCAL_INDEX_DIR).payloads)
+
+
+def test_point_ids_are_deterministic():
+    assert ingest.point_id("bank", "a.md", 0, "x") == ingest.point_id("bank", "a.md", 0, "x")
+    assert ingest.point_id("bank", "a.md", 0, "x") != ingest.point_id("bank", "a.md", 1, "x")
+    assert ingest.point_id("bank", "a.md", 0, "x") != ingest.point_id("role", "a.md", 0, "x")
+
+
+def test_same_source_in_two_namespaces_is_independent(env):
+    ingest.ingest("bank/policies", str(env / "policies"))
+    ingest.ingest("role/teller", str(env / "policies"))
+    payloads = LocalIndex.load(config.LOCAL_INDEX_DIR).payloads
+    assert sorted(p["namespace"] for p in payloads) == ["bank/policies"] * 2 + ["role/teller"] * 2
+    (env / "policies" / "fees.md").unlink()
+    assert ingest.ingest("role/teller", str(env / "policies"))["deleted"] == 1
+    left = [(p["namespace"], p["source"].rsplit("/", 1)[-1]) for p in LocalIndex.load(config.LOCAL_INDEX_DIR).payloads]
+    assert sorted(left) == [("bank/policies", "fees.md"), ("bank/policies", "kyc.md"), ("role/teller", "kyc.md")]
+
+
+def test_rerun_is_a_noop(env):
+    first = ingest.ingest("bank/policies", str(env / "policies"))
+    again = ingest.ingest("bank/policies", str(env / "policies"))
+    assert first["embedded"] == 2 and again["unchanged"] == 2
+    assert again["embedded"] == again["deleted"] == 0 and "local_index" not in again
+
+
+def test_only_changed_chunks_are_embedded_and_removed_files_deleted(env):
+    ingest.ingest("bank/policies", str(env / "policies"))
+    ingest.ingest("bank/ops", str(env / "ops"))
+    (env / "policies" / "kyc.md").write_text("KYC: verify ID, address and date of birth.")
+    (env / "policies" / "fees.md").unlink()
+    stats = ingest.ingest("bank/policies", str(env / "policies"))
+    assert (stats["changed"], stats["removed"], stats["embedded"], stats["deleted"]) == (1, 1, 1, 2)
+    assert _sources() == ["kyc.md", "queue.md"]
+
+
+def test_full_rewrite_reuses_vectors(env):
+    ingest.ingest("bank/policies", str(env / "policies"))
+    stats = ingest.ingest("bank/policies", str(env / "policies"), full=True)
+    assert stats["embedded"] == 0 and stats["reused"] == 2 and stats["deleted"] == 0
+    assert len(LocalIndex.load(config.LOCAL_INDEX_DIR)) == 2
+
+
+def test_interrupted_run_resumes_from_checkpoint(env, monkeypatch):
+    monkeypatch.setattr(config, "INGEST_CHECKPOINT_CHUNKS", 1)
+    for i in range(4):
+        (env / "policies" / f"extra{i}.md").write_text(f"extra policy number {i}")
+    real = ingest.embed_texts
+    calls = []
+
+    def flaky(texts, **kw):
+        calls.append(texts)
+        if len(calls) == 3:
+            raise RuntimeError("provider went away")
+        return real(texts, **kw)
+
+    monkeypatch.setattr(ingest, "embed_texts", flaky)
+    with pytest.raises(RuntimeError):
+        ingest.ingest("bank/policies", str(env / "policies"), workers=1, batch_size=1)
+    monkeypatch.setattr(ingest, "embed_texts", real)
+    resumed = ingest.ingest("bank/policies", str(env / "policies"), workers=1, batch_size=1)
+    assert resumed["unchanged"] == 2 and resumed["embedded"] == 4
+    assert resumed["throughput"]["chunks"] == 4
+    assert len(LocalIndex.load(config.LOCAL_INDEX_DIR)) == 6
+
+
+def test_dedupe_collapses_boilerplate_and_refcounts_deletes(env, monkeypatch):
+    monkeypatch.setattr(config, "DEDUPE_THRESHOLD", 0.7)
+    boiler = "This message is confidential and intended only for the named recipient of the bank"
+    for i in range(3):
+        (env / "ops" / f"notice{i}.md").write_text(f"{boiler} {i}.")
+    stats = ingest.ingest("bank/ops", str(env / "ops"), dedupe=True)
+    assert stats["duplicates"] == 2 and stats["embedded"] == 2
+    notices = [p for p in LocalIndex.load(config.LOCAL_INDEX_DIR).payloads if "sources" in p and len(p["sources"]) > 1]
+    assert [len(p["sources"]) for p in notices] == [3]
+    (env / "ops" / "notice0.md").unlink()
+    stats = ingest.ingest("bank/ops", str(env / "ops"))
+    assert stats["removed"] == 1 and stats["deleted"] == 0
+    payload = next(p for p in LocalIndex.load(config.LOCAL_INDEX_DIR).payloads if "notice" in p["source"])
+    assert [s.rsplit("/", 1)[-1] for s in payload["sources"]] == ["notice1.md", "notice2.md"]
+    assert payload["source"].endswith("notice1.md")
+
+
+def test_dedupe_keeps_canonical_when_same_file_drops_its_duplicate(env, monkeypatch):
+    monkeypatch.setattr(config, "DEDUPE_THRESHOLD", 0.7)
+    boiler = "This message is confidential and intended only for the named recipient of the bank"
+    doc = env / "ops" / "notice.md"
+    doc.write_text(f"# One\n{boiler} one.\n\n# Fees\nNSF fees apply to bounced payments.\n\n# Two\n{boiler} two.\n")
+    assert ingest.ingest("bank/ops", str(env / "ops"), dedupe=True)["duplicates"] == 1
+    doc.write_text(f"# One\n{boiler} one.\n\n# Fees\nNSF fees apply to bounced payments.\n")
+    stats = ingest.ingest("bank/ops", str(env / "ops"), dedupe=True)
+    assert stats["deleted"] == 0
+    texts = [p["text"] for p in LocalIndex.load(config.LOCAL_INDEX_DIR).payloads if p["source"].endswith("notice.md")]
+    assert sorted(texts) == ["# Fees NSF fees apply to bounced payments.", f"# One {boiler} one."]
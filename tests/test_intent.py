@@ -0,0 +1,21 @@
+from server import intent
+
+
+def test_rules_route_small_talk_and_keywords():
+    assert intent.classify("Thanks, bye!").tools == frozenset()
+    r = intent.classify("What's the fee for a card transfer?")
+    assert r.source == "rule" and set(r.matched) == {"account", "knowledge"} and r.tools == {"crm.lookup", "kyc.verify", "rag.search"}
+
+
+def test_centroid_fallback_and_general_default(monkeypatch):
+    r = intent.classify("how do I open an account")
+    assert (r.intent, r.source) == ("knowledge", "centroid")
+    monkeypatch.setattr(intent.config, "INTENT_MIN_SCORE", 1.1)
+    intent.classify.cache_clear()
+    r, hint = intent.route("how do I open an account", ["rag.search", "crm.lookup"])
+    assert r.intent == "general" and hint is None
+    intent.classify.cache_clear()
+
+
+def test_route_limits_hint_to_allowed_tools():
+    assert intent.route("Help me create a budget plan", ["rag.search", "avatar.speak"])[1] == ["rag.search"]
@@ -0,0 +1,36 @@
+from server.lexical import BM25Index, rrf, tokenize
+
+TEXTS = [
+    "KYC policy: verify ID and address for all new accounts.",
+    "NSF fees are charged when a payment bounces.",
+    "Appointments can be booked at the kiosk.",
+    "Strategy memo: reduce KYC onboarding time.",
+]
+NAMESPACES = ["bank/policies", "bank/policies", "bank/faqs", "bank/strategy"]
+
+
+def test_tokenize_lowercases_and_strips_punctuation():
+    assert tokenize("KYC-check: NSF!") == ["kyc", "check", "nsf"]
+
+
+def test_exact_terms_rank_first_within_namespaces():
+    idx = BM25Index.build(TEXTS, NAMESPACES)
+    assert idx.search("what is an NSF fee", ["bank/policies"], 3)[0][0] == 1
+    assert [row for row, _ in idx.search("kyc", ["bank/policies"], 5)] == [0]
+    assert {row for row, _ in idx.search("kyc", None, 5)} == {0, 3}
+    assert idx.search("zebra", None, 5) == []
+
+
+def test_save_load_roundtrip(tmp_path):
+    idx = BM25Index.build(TEXTS, NAMESPACES)
+    idx.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded.search("kiosk appointments", None, 2) == idx.search("kiosk appointments", None, 2)
+
+
+def test_rrf_rewards_agreement():
+    vec = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    lex = [{"id": "c"}, {"id": "d"}]
+    fused = rrf([vec, lex], k=4)
+    assert [f["id"] for f in fused] == ["c", "a", "b", "d"]
+    assert fused[0]["score"] > fused[1]["score"]
@@ -0,0 +1,56 @@
+import numpy as np
+
+from server.local_index import Journal, LocalIndex, merge
+
+
+def _index():
+    idx = LocalIndex(dim=3)
+    idx.upsert(
+        ["a", "b", "c", "d"],
+        [[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0], [0.8, 0, 0.2]],
+        [{"text": t, "source": f"{t}.md", "namespace": ns} for t, ns in
+         [("a", "global"), ("b", "bank/policies"), ("c", "global"), ("d", "bank/strategy")]],
+    )
+    return idx
+
+
+def test_topk_is_ordered_and_namespace_filtered():
+    idx = _index()
+    assert [r["id"] for r in idx.search([1, 0, 0], None, 3)] == ["a", "b", "d"]
+    assert [r["id"] for r in idx.search([1, 0, 0], ["global", "bank/policies"], 3)] == ["a", "b", "c"]
+    assert [r["id"] for r in idx.search([1, 0, 0], ["bank/strategy"], 5)] == ["d"]
+    assert idx.search([1, 0, 0], ["role/unknown"], 3) == []
+
+
+def test_upsert_replaces_and_delete_compacts():
+    idx = _index()
+    idx.upsert(["a"], [[0, 0, 1]], [{"text": "a2", "namespace": "global"}])
+    assert len(idx) == 4 and idx.search([0, 0, 1], ["global"], 1)[0]["text"] == "a2"
+    assert idx.delete(["b", "missing"]) == 1
+    assert idx.ids == ["a", "c", "d"]
+    assert [r["id"] for r in idx.search([0.1, 1, 0.5], None, 4)] == ["c", "a", "d"]
+
+
+def test_save_and_mmap_load_roundtrip(tmp_path):
+    idx = _index()
+    first = idx.save(str(tmp_path))
+    idx.delete(["c"])
+    second = idx.save(str(tmp_path))
+    assert first != second and LocalIndex.current_version(str(tmp_path)) == second
+    loaded = LocalIndex.load(str(tmp_path))
+    assert isinstance(loaded.vectors, np.memmap) and loaded.ids == ["a", "b", "d"]
+    assert loaded.search([0.8, 0, 0.2], ["bank/strategy"], 1)[0]["id"] == "d"
+
+
+def test_journal_merge_applies_ops_in_order(tmp_path):
+    _index().save(str(tmp_path))
+    journal = Journal(str(tmp_path / "journal"), 3)
+    journal.append(["e"], [[0, 0, 2]], [{"text": "e", "namespace": "bank/ops"}], deletes=["b"])
+    journal.append(["a"], [[0, 0.6, 0.8]], [{"text": "a2", "namespace": "global"}], patches={"c": {"source": "z.md"}})
+    journal.append([], [], [], deletes=["e"])
+    journal.append(["e"], [[0, 0, 1]], [{"text": "e2", "namespace": "bank/ops"}])
+    merge(str(tmp_path), LocalIndex.load(str(tmp_path)), journal)
+    loaded = LocalIndex.load(str(tmp_path))
+    assert loaded.ids == ["c", "d", "e", "a"] and loaded.payload("c")["source"] == "z.md"
+    assert loaded.search([0, 0, 1], ["bank/ops"], 1)[0]["text"] == "e2"
+    assert loaded.search([0, 0.6, 0.8], ["global"], 1)[0]["text"] == "a2"
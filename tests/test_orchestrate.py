@@ -0,0 +1,108 @@
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from routers import orchestrate
+from server import config
+from server.tools import crm, rag
+from main import app
+
+client = TestClient(app)
+
+
+def _post(persona="teller-v1", user_id="C001", text="What's the overdraft policy for my account balance?"):
+    resp = client.post("/orchestrate", json={"persona": persona, "user_id": user_id, "messages": [{"role": "user", "content": text}]})
+    assert resp.status_code == 200
+    return resp.json()
+
+
+async def _no_docs(**kw):
+    return []
+
+
+def test_slow_tool_is_degraded_not_fatal(monkeypatch):
+    monkeypatch.setattr(rag, "asearch", _no_docs)
+    monkeypatch.setattr(config, "TOOL_TIMEOUTS", {"crm.lookup": 50})
+    monkeypatch.setattr(crm, "lookup", lambda ident: time.sleep(0.5) or {"found": True})
+    data = _post()
+    events = {e["name"]: e["output"] for e in data["tool_events"]}
+    assert events["crm.lookup"]["degraded"] is True and events["crm.lookup"]["reason"] == "timeout"
+    assert events["rag.search"] == {"count": 0} and "kyc.verify" not in events
+
+
+def test_kyc_only_runs_when_hinted_since_the_reply_never_reads_it(monkeypatch):
+    monkeypatch.setattr(rag, "asearch", _no_docs)
+    monkeypatch.setattr(crm, "lookup", lambda ident: {"found": True, "customer": {"name": "Ana", "segment": "new"}})
+    events = [e["name"] for e in _post()["tool_events"]][1:]
+    assert sorted(events) == ["crm.lookup", "rag.search"]
+
+
+def test_tools_hint_prunes_the_plan_to_hinted_tools_and_their_deps(monkeypatch):
+    monkeypatch.setattr(crm, "lookup", lambda ident: {"found": True, "customer": {"name": "Ana", "segment": "new"}})
+    resp = client.post("/orchestrate", json={"persona": "teller-v1", "user_id": "C001", "tools_hint": ["kyc.verify"],
+                                             "messages": [{"role": "user", "content": "verify me"}]})
+    assert [e["name"] for e in resp.json()["tool_events"]] == ["crm.lookup", "kyc.verify"]
+
+
+def test_small_talk_skips_every_context_tool(monkeypatch):
+    async def boom(**kw):
+        raise AssertionError("rag should not run")
+    monkeypatch.setattr(rag, "asearch", boom)
+    events = _post(text="hi, thanks!")["tool_events"]
+    assert [e["name"] for e in events] == ["intent.route"]
+    assert events[0]["output"]["intent"] == "smalltalk" and set(events[0]["output"]["skipped"]) == {"rag.search", "crm.lookup"}
+
+
+def test_intent_keeps_the_tools_a_question_needs(monkeypatch):
+    monkeypatch.setattr(rag, "asearch", _no_docs)
+    names = [e["name"] for e in _post(text="What are the KYC requirements for new accounts?")["tool_events"]]
+    assert names == ["intent.route", "rag.search"]
+    names = [e["name"] for e in _post(persona="budget-v1", text="Help me create a budget plan")["tool_events"]]
+    assert "budget.analyze" in names
+
+
+def test_stream_emits_tool_events_as_they_finish_then_reply_offers_media(monkeypatch):
+    monkeypatch.setattr(rag, "asearch", _no_docs)
+    monkeypatch.setattr(crm, "lookup", lambda ident: time.sleep(0.2) or {"found": True, "customer": {"name": "Ana", "segment": "premium"}})
+    body = {"persona": "teller-v1", "user_id": "C001", "messages": [{"role": "user", "content": "What's the overdraft policy for my account balance?"}]}
+    with client.stream("POST", "/orchestrate/stream", json=body) as resp:
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        frames = [f for f in resp.read().decode().split("\n\n") if f]
+    events = [(f.split("\n")[0][len("event: "):], json.loads(f.split("\n")[1][len("data: "):])) for f in frames]
+    kinds = [k for k, _ in events]
+    assert [d["name"] for k, d in events if k == "tool"] == ["intent.route", "rag.search", "crm.lookup"]
+    assert kinds[-3:] == ["offers", "media", "done"] and kinds.index("reply") > kinds.index("tool")
+    done = events[-1][1]
+    assert "".join(d["text"] for k, d in events if k == "reply") == done["reply"]["text"] and "Hello Ana!" in done["reply"]["text"]
+    assert done == _post(text="What's the overdraft policy for my account balance?")
+
+
+def test_batch_shares_tool_calls_and_keeps_input_order(monkeypatch):
+    calls = {"rag": 0, "crm": 0}
+
+    async def search_many(queries, namespaces, **kw):
+        calls["rag"] += 1
+        assert len(queries) == 3 and namespaces[0] != namespaces[2]
+        return [[] for _ in queries]
+
+    def lookup_many(ids):
+        calls["crm"] += 1
+        return [{"found": True, "customer": {"name": "Ana", "segment": "premium", "balance": 5000}} for _ in ids]
+
+    monkeypatch.setattr(rag, "asearch_many", search_many)
+    monkeypatch.setattr(crm, "lookup_many", lookup_many)
+    msg = lambda text: [{"role": "user", "content": text}]
+    body = {"requests": [
+        {"persona": "teller-v1", "user_id": "C001", "messages": msg("What's the overdraft policy for my account balance?")},
+        {"persona": "nobody", "user_id": "C002", "messages": msg("hi")},
+        {"persona": "teller-v1", "user_id": "C003", "messages": msg("What are the KYC requirements?")},
+        {"persona": "budget-v1", "user_id": "C004", "messages": msg("Help me create a budget plan")},
+    ]}
+    resp = client.post("/orchestrate/batch", json=body)
+    assert resp.status_code == 200
+    items = resp.json()["results"]
+    assert [i["status"] for i in items] == [200, 400, 200, 200] and "nobody" in items[1]["error"]
+    assert calls == {"rag": 1, "crm": 1}
+    assert "Hello Ana!" in items[0]["result"]["reply"]["text"] and items[0]["result"]["offers"]
+    assert "Budget outlook" in items[3]["result"]["reply"]["text"]
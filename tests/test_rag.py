@@ -0,0 +1,183 @@
+import pytest
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+from server.tools import rag
+
+
+class FakeHit:
+    def __init__(self, id, score, payload):
+        self.id, self.score, self.payload = id, score, payload
+
+
+class FakeQdrant:
+    def __init__(self, exists=True, search_errors=()):
+        self.exists = exists
+        self.search_errors = list(search_errors)
+        self.calls = []
+
+    def collection_exists(self, name):
+        self.calls.append("collection_exists")
+        return self.exists
+
+    def create_collection(self, **kw):
+        self.calls.append("create_collection")
+        self.exists = True
+
+    def get_collection(self, name):
+        self.calls.append("get_collection")
+        return type("Info", (), {"payload_schema": {"namespace": "keyword"}})()
+
+    def create_payload_index(self, collection_name, field_name, field_schema):
+        self.calls.append(f"index:{field_name}")
+
+    def recreate_collection(self, **kw):
+        raise AssertionError("search must never recreate the collection")
+
+    def search(self, **kw):
+        self.calls.append("search")
+        if self.search_errors:
+            raise self.search_errors.pop(0)
+        return [FakeHit("p1", 0.5, {"text": "t", "source": "s", "namespace": "global"})]
+
+
+def _not_found():
+    return UnexpectedResponse(404, "Not Found", b"", None)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    def install(client, ready=True):
+        monkeypatch.setattr(rag, "_CLIENT", client)
+        monkeypatch.setattr(rag, "_READY", {rag.config.COLLECTION_NAME} if ready else set())
+        return client
+
+    return install
+
+
+def test_bootstrap_runs_once(fake):
+    client = fake(FakeQdrant(exists=False), ready=False)
+    rag.search("q", ["global"], "u")
+    rag.search("q", ["global"], "u")
+    assert client.calls == ["collection_exists", "create_collection", "index:namespace", "index:source", "search", "search"]
+
+
+def test_bootstrap_adds_missing_payload_indexes(fake):
+    client = fake(FakeQdrant(exists=True), ready=False)
+    rag.search("q", ["global"], "u")
+    assert client.calls == ["collection_exists", "get_collection", "index:source", "search"]
+
+
+def test_transient_error_does_not_touch_collection(fake):
+    client = fake(FakeQdrant(search_errors=[ConnectionError("boom")]))
+    rag.search("q", ["global"], "u")
+    assert client.calls == ["search"]
+
+
+def test_not_found_rebootstraps_and_retries(fake):
+    client = fake(FakeQdrant(exists=False, search_errors=[_not_found()]))
+    out = rag.search("q", ["global"], "u")
+    assert client.calls == ["search", "collection_exists", "create_collection", "index:namespace", "index:source", "search"]
+    assert out[0]["id"] == "p1"
+
+
+def test_qdrant_failure_serves_from_local_index(fake, monkeypatch, tmp_path):
+    from server.embedding import embed_text
+    from server.local_index import LocalIndex
+
+    idx = LocalIndex(dim=len(embed_text("x")))
+    idx.upsert(["k1", "k2"], [embed_text("kyc policy"), embed_text("queue triage")],
+               [{"text": "kyc policy", "namespace": "bank/policies"}, {"text": "queue triage", "namespace": "bank/ops"}])
+    idx.save(str(tmp_path))
+    monkeypatch.setattr(rag.config, "LOCAL_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(rag, "_LOCAL_CHECKED", float("-inf"))
+    fake(FakeQdrant(search_errors=[ConnectionError("down")]))
+    out = rag.search("kyc policy", ["bank/policies"], "u", k=3)
+    assert [r["id"] for r in out] == ["k1"]
+
+
+class FakeBatchQdrant(FakeQdrant):
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+
+    def search_batch(self, collection_name, requests):
+        self.calls.append(("search_batch", len(requests)))
+        if self.fail:
+            raise ConnectionError("down")
+        return [[FakeHit(f"p{i}", 1.0, {"text": str(r.filter)})] for i, r in enumerate(requests)]
+
+
+def test_search_many_sends_one_batch_in_input_order(fake):
+    client = fake(FakeBatchQdrant())
+    out = rag.search_many(["a", "b", "c"], [["global"], [], ["bank/ops"]], k=1)
+    assert client.calls == [("search_batch", 3)]
+    assert [r[0]["id"] for r in out] == ["p0", "p1", "p2"]
+    assert out[1][0]["text"] == "None" and "bank/ops" in out[2][0]["text"]
+
+
+def test_search_many_falls_back_per_query(fake, monkeypatch):
+    fake(FakeBatchQdrant(fail=True))
+    monkeypatch.setattr(rag, "_local_search", lambda qvec, ns, k: [{"id": ",".join(ns)}])
+    out = rag.search_many(["a", "b"], ["global"], k=1)
+    assert out == [[{"id": "global"}], [{"id": "global"}]]
+
+
+def test_per_namespace_layout_routes_to_top_level_collections(fake, monkeypatch):
+    monkeypatch.setattr(rag.config, "COLLECTION_LAYOUT", "per_namespace")
+    client = fake(FakeBatchQdrant())
+    client.searched = []
+    original = client.search_batch
+    client.search = lambda **kw: client.searched.append(kw["collection_name"]) or [FakeHit(kw["collection_name"], 0.5, {})]
+    client.search_batch = lambda collection_name, requests: client.searched.append(collection_name) or original(collection_name, requests)
+    monkeypatch.setattr(rag, "_READY", {"docs__bank", "docs__role", "docs__global"})
+    out = rag.search("q", ["global", "bank/policies", "role/teller"], "u", k=3)
+    assert sorted(client.searched) == ["docs__bank", "docs__global", "docs__role"]
+    assert len(out) == 3
+    client.searched.clear()
+    rag.search_many(["a", "b"], [["bank/policies"], ["bank/strategy", "global"]], k=1)
+    assert sorted(client.searched) == ["docs__bank", "docs__global"]
+
+
+def test_result_cache_is_invalidated_by_new_generation(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag.config, "RAG_CACHE_SIZE", 8)
+    monkeypatch.setattr(rag.config, "LOCAL_INDEX_RELOAD_SECS", 0)
+    monkeypatch.setattr(rag.config, "RAG_GENERATION_FILE", str(tmp_path / "generation"))
+    calls = []
+
+    def fake_search(vecs, per_ns, limit):
+        calls.append(per_ns)
+        return [[{"id": "1", "text": f"v{len(calls)}", "source": "a.md", "namespace": "bank", "score": 1.0}]]
+
+    monkeypatch.setattr(rag, "_qdrant_search", fake_search)
+    rag.invalidate()
+    first = rag.search("fees", ["bank"], "u1")
+    first[0]["text"] = "mutated by caller"
+    assert rag.search("fees", ["bank"], "u2")[0]["text"] == "v1" and len(calls) == 1
+    (tmp_path / "generation").write_text("2")
+    assert rag.search("fees", ["bank"], "u1")[0]["text"] == "v2"
+
+
+def test_failing_fallback_returns_no_hits(fake, monkeypatch, caplog):
+    fake(FakeQdrant(search_errors=[ConnectionError("down")]))
+
+    def broken(qvec, ns, k):
+        raise OSError("index unreadable")
+
+    monkeypatch.setattr(rag, "_local_search", broken)
+    assert rag.search("q", ["global"], "u", mode="vector") == []
+    monkeypatch.setattr(rag.config, "RAG_BACKEND", "local")
+    caplog.clear()
+    assert rag.search("q", ["global"], "u", mode="vector") == []
+    assert "local index search failed" in caplog.text and "qdrant" not in caplog.text
+
+
+def test_batch_endpoint_validates_k_and_per_query_namespaces(monkeypatch):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    monkeypatch.setattr(rag, "asearch_many", lambda *a, **kw: pytest.fail("invalid batch reached search"))
+    client = TestClient(app)
+    for k in (0, -1):
+        assert client.post("/rag/search/batch", json={"queries": ["a"], "k": k}).status_code == 422
+    r = client.post("/rag/search/batch", json={"queries": ["a", "b"], "per_query_namespaces": []})
+    assert r.status_code == 400 and "one namespace list per query" in r.json()["detail"]
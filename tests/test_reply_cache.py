@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from main import app
+from server import config, reply_cache
+from server.reply_cache import ReplyCache
+from server.tools import crm, rag
+
+
+def test_lookup_is_scoped_thresholded_and_expires(monkeypatch):
+    cache = ReplyCache(size=2, threshold=0.9, ttl=60)
+    cache.put(("teller-v1", "premium"), [1.0, 0.0], ["cached"])
+    assert cache.get(("teller-v1", "premium"), [0.99, 0.05]).parts == ["cached"]
+    assert cache.get(("teller-v1", "new"), [1.0, 0.0]) is None
+    assert cache.get(("teller-v1", "premium"), [0.5, 0.5]) is None
+    cache.put(("teller-v1", "premium"), [0.0, 1.0], ["b"])
+    cache.put(("teller-v1", "premium"), [0.6, 0.8], ["c"])
+    assert cache.get(("teller-v1", "premium"), [1.0, 0.0]) is None  # evicted, oldest first
+    cache.ttl = 0.0
+    time.sleep(0.01)
+    assert cache.get(("teller-v1", "premium"), [0.0, 1.0]) is None
+
+
+def test_hit_skips_rag_and_keeps_personal_fields_fresh(monkeypatch):
+    monkeypatch.setattr(config, "REPLY_CACHE_SIZE", 16)
+    monkeypatch.setattr(reply_cache, "_CACHE", ReplyCache(threshold=0.85))
+    searches, finished = [], []
+
+    async def search(**kw):
+        searches.append(kw["query"])
+        await asyncio.sleep(0.2)
+        finished.append(kw["query"])
+        return [{"id": "1", "text": "KYC needs ID", "score": 0.9}]
+    monkeypatch.setattr(rag, "asearch", search)
+    names = {"C1": "Ana", "C2": "Ben"}
+    monkeypatch.setattr(crm, "lookup", lambda ident: {"found": True, "customer": {"name": names[ident], "segment": "premium"}})
+    client = TestClient(app)
+    post = lambda uid, text: client.post("/orchestrate", json={"persona": "teller-v1", "user_id": uid,
+                                                               "messages": [{"role": "user", "content": text}]}).json()
+    first = post("C1", "What are the KYC requirements for a new account balance?")
+    second = post("C2", "what are the kyc requirements for a new account balance")
+    assert len(searches) == 2 and len(finished) == 1  # the second search started, then the hit cancelled it
+    events = {e["name"]: e["output"] for e in second["tool_events"]}
+    assert events["reply.cache"]["hit"] is True and events["reply.cache"]["segment"] == "premium" and "rag.search" not in events
+    assert "I found 1 relevant documents." in second["reply"]["text"] and "Hello Ben!" in second["reply"]["text"]
+    assert second["reply"]["text"] == first["reply"]["text"].replace("Ana", "Ben")
+
+
+def test_cache_lookup_does_not_delay_rag_behind_crm(monkeypatch):
+    monkeypatch.setattr(config, "REPLY_CACHE_SIZE", 16)
+    monkeypatch.setattr(reply_cache, "_CACHE", ReplyCache())
+
+    async def search(**kw):
+        await asyncio.sleep(0.3)
+        return []
+    monkeypatch.setattr(rag, "asearch", search)
+    monkeypatch.setattr(crm, "lookup", lambda ident: time.sleep(0.3) or {"found": True, "customer": {"name": "Ana", "segment": "premium"}})
+    client = TestClient(app)
+    start = time.monotonic()
+    data = client.post("/orchestrate", json={"persona": "teller-v1", "user_id": "C1",
+                                             "messages": [{"role": "user", "content": "What are the overdraft fees on my account?"}]}).json()
+    assert time.monotonic() - start < 0.5
+    assert {e["name"] for e in data["tool_events"]} >= {"crm.lookup", "rag.search", "reply.cache"}
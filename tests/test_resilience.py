@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server import config, resilience
+from server.resilience import Breaker, BreakerOpen
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    resilience.reset()
+    yield
+    resilience.reset()
+
+
+def _fail():
+    raise ConnectionError("down")
+
+
+def test_breaker_opens_rejects_fast_and_recovers_through_half_open(monkeypatch):
+    monkeypatch.setattr(config, "BREAKER_FAILURES", 3)
+    monkeypatch.setattr(config, "BREAKER_COOLDOWN_SECS", 0.05)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            resilience.call("qdrant", _fail)
+    b = resilience.breaker("qdrant")
+    assert b.state == "open"
+    start = time.monotonic()
+    with pytest.raises(BreakerOpen):
+        resilience.call("qdrant", lambda: "never runs")
+    assert time.monotonic() - start < 0.01
+    time.sleep(0.06)
+    assert b.state == "half_open"
+    with pytest.raises(ConnectionError):
+        resilience.call("qdrant", _fail)
+    assert b.state == "open"
+    time.sleep(0.06)
+    assert resilience.call("qdrant", lambda: "ok") == "ok" and b.state == "closed"
+
+
+def test_adaptive_timeout_follows_latency_percentile(monkeypatch):
+    monkeypatch.setattr(config, "ADAPTIVE_TIMEOUT_MIN_SAMPLES", 5)
+    monkeypatch.setattr(config, "ADAPTIVE_TIMEOUT_WINDOW", 20)
+    b = Breaker("embedding", ceiling=30.0)
+    assert b.timeout() == 30.0
+    for _ in range(20):
+        b.success(0.1)
+    assert b.timeout() == pytest.approx(0.2)
+    for _ in range(20):
+        b.success(0.001)
+    assert b.timeout() == config.ADAPTIVE_TIMEOUT_FLOOR_MS / 1000.0
+
+
+def test_async_calls_are_cut_at_the_adaptive_timeout(monkeypatch):
+    monkeypatch.setattr(config, "ADAPTIVE_TIMEOUT_MIN_SAMPLES", 1)
+    b = resilience.breaker("redis")
+    b.success(0.02)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    start = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(resilience.acall("redis", slow))
+    assert time.monotonic() - start < 0.2 and b.stats()["timeouts"] == 1
+
+
+def test_diagnostics_reports_open_breakers_without_waiting(monkeypatch):
+    monkeypatch.setattr(config, "BREAKER_FAILURES", 1)
+    for name in ("qdrant", "redis", "mongo"):
+        resilience.breaker(name).failure()
+    from main import app
+    start = time.monotonic()
+    data = TestClient(app).get("/diagnostics").json()
+    assert time.monotonic() - start < 1.0
+    assert data["breakers"]["mongo"]["state"] == "open" and data["mongo"]["ok"] is False and "circuit open" in data["mongo"]["error"]
+    assert set(data["breakers"]) == {"qdrant", "redis", "mongo", "embedding"}
+
+
+def test_batch_calls_wait_for_the_configured_timeout_and_do_not_train_it(monkeypatch):
+    from server.tools import rag
+
+    monkeypatch.setattr(config, "ADAPTIVE_TIMEOUT_MIN_SAMPLES", 1)
+    monkeypatch.setattr(config, "RAG_BACKEND", "qdrant")
+    b = resilience.breaker("qdrant")
+    b.success(0.005)
+    single = b.timeout()
+
+    async def slow_batch(vecs, per_ns, limit):
+        await asyncio.sleep(0.2)
+        return [[{"id": str(i), "text": "", "source": "", "namespace": "", "score": 1.0}] for i in range(len(vecs))]
+
+    monkeypatch.setattr(rag, "_aqdrant_search", slow_batch)
+    out = asyncio.run(rag.asearch_many(["a", "b", "c"], ["global"], k=1))
+    assert [h[0]["id"] for h in out] == ["0", "1", "2"]
+    stats = b.stats()
+    assert stats["timeouts"] == 0 and stats["state"] == "closed" and b.timeout() == single
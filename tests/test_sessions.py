@@ -0,0 +1,79 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from main import app
+from server import sessions
+from server.sessions import SessionStore, compact, new_session
+from server.tools import crm, rag
+
+
+def test_compact_keeps_recent_messages_and_a_bounded_summary():
+    s = new_session()
+    s["messages"] = [{"role": "user", "content": f"question {i}"} for i in range(30)]
+    compact(s, max_messages=4, summary_chars=60)
+    assert [m["content"] for m in s["messages"]] == ["question 26", "question 27", "question 28", "question 29"]
+    assert len(s["summary"]) <= 60 and s["summary"].endswith("user: question 25")
+
+
+class _DeadRedis:
+    async def get(self, key):
+        raise ConnectionError("down")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("down")
+
+
+def test_store_falls_back_to_memory_when_redis_fails():
+    store = SessionStore(_DeadRedis(), ttl=60)
+
+    async def roundtrip():
+        s = await store.get("C001", "teller-v1")
+        s["tools"]["crm.lookup"] = {"found": True}
+        await store.put("C001", "teller-v1", s)
+        return await store.get("C001", "teller-v1")
+
+    assert asyncio.run(roundtrip())["tools"] == {"crm.lookup": {"found": True}}
+    assert store.redis_errors == 1
+
+
+def test_session_turns_reuse_crm_and_send_only_the_new_message(monkeypatch):
+    monkeypatch.setattr(sessions, "_STORE", SessionStore(None, ttl=60))
+    calls = []
+    monkeypatch.setattr(crm, "lookup", lambda ident: calls.append(ident) or {"found": True, "customer": {"name": "Ana", "segment": "premium"}})
+
+    async def no_docs(**kw):
+        return []
+    monkeypatch.setattr(rag, "asearch", no_docs)
+    client = TestClient(app)
+    for n in range(8):
+        body = {"persona": "teller-v1", "user_id": "C009", "session": True,
+                "messages": [{"role": "user", "content": f"What's my card balance, take {n}?"}]}
+        data = client.post("/orchestrate", json=body).json()
+        assert "Hello Ana!" in data["reply"]["text"]
+    crm_event = next(e for e in data["tool_events"] if e["name"] == "crm.lookup")
+    assert calls == ["C009"] and crm_event["output"]["cached"] == "session"
+    stored = asyncio.run(sessions.get_store().get("C009", "teller-v1"))
+    assert stored["turns"] == 8 and len(stored["messages"]) == sessions.config.SESSION_MAX_MESSAGES and stored["summary"]
+
+
+def test_resent_history_is_not_stored_twice():
+    s = new_session()
+    turn1 = [{"role": "user", "content": "hi"}]
+    sessions.remember(s, turn1, "hello", {})
+    turn2 = turn1 + [{"role": "assistant", "content": "hello"}, {"role": "user", "content": "balance?"}]
+    sessions.remember(s, turn2, "it is 10", {})
+    sessions.remember(s, [{"role": "user", "content": "thanks"}], "bye", {})
+    assert [m["content"] for m in s["messages"]] == ["hi", "hello", "balance?", "it is 10", "thanks", "bye"]
+
+
+def test_anonymous_callers_get_no_session(monkeypatch):
+    store = SessionStore(None, ttl=60)
+    monkeypatch.setattr(sessions, "_STORE", store)
+
+    async def no_docs(**kw):
+        return []
+    monkeypatch.setattr(rag, "asearch", no_docs)
+    body = {"persona": "teller-v1", "user_id": "", "session": True, "messages": [{"role": "user", "content": "What's the fee policy?"}]}
+    assert TestClient(app).post("/orchestrate", json=body).status_code == 200
+    assert store.stats()["local_size"] == 0 and store.misses == 0
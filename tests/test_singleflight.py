@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from server.singleflight import Group, key_for
+from server.tools import compile_plan, crm, rag
+
+
+def test_key_ignores_key_order_but_compares_values_exactly():
+    assert key_for("rag.search", {"query": "KYC rules", "ns": ["a"]}) == key_for("rag.search", {"ns": ["a"], "query": "KYC rules"})
+    assert key_for("crm.lookup", {"identifier": "C001 "}) != key_for("crm.lookup", {"identifier": "C001"})
+
+
+def test_concurrent_async_callers_share_one_call_and_errors():
+    group, calls = Group(), []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"hits": [1]}
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("down")
+
+    async def main():
+        out = await asyncio.gather(*(group.ado("k", fetch) for _ in range(20)))
+        assert out[0] == out[19] and out[0] is not out[19]
+        with pytest.raises(RuntimeError):
+            await asyncio.gather(*(group.ado("e", boom) for _ in range(3)))
+        await group.ado("k", fetch)
+
+    asyncio.run(main())
+    assert len(calls) == 2 and group.shared == 21
+
+
+def test_threads_share_one_blocking_call():
+    group, calls, out = Group(), [], []
+    slow = lambda: calls.append(1) or time.sleep(0.05) or "v"
+    threads = [threading.Thread(target=lambda: out.append(group.do("k", slow))) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert out == ["v"] * 8 and len(calls) == 1
+
+
+def test_identical_tool_steps_run_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(crm, "lookup", lambda ident: calls.append(ident) or time.sleep(0.05) or {"found": False})
+    plan = compile_plan(["crm.lookup"])
+
+    async def main():
+        steps = [plan.steps({"user_id": uid})[0] for uid in ("C1", "C1", "C2")]
+        return await asyncio.gather(*(s.run({}) for s in steps))
+
+    assert len(asyncio.run(main())) == 3 and sorted(calls) == ["C1", "C2"]
+
+
+def test_rag_queries_differing_only_in_whitespace_share_one_search(monkeypatch):
+    queries = []
+
+    async def search(**kw):
+        queries.append(kw["query"])
+        await asyncio.sleep(0.05)
+        return []
+    monkeypatch.setattr(rag, "asearch", search)
+    plan = compile_plan(["rag.search"])
+
+    async def main():
+        steps = [plan.steps({"text": t, "user_id": "u"})[0] for t in ("KYC rules", " KYC  rules", "fees")]
+        return await asyncio.gather(*(s.run({}) for s in steps))
+
+    asyncio.run(main())
+    assert sorted(queries) == ["KYC rules", "fees"]
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from server import config, ingest, snapshot
+from server.local_index import LocalIndex
+
+
+def test_int8_and_float16_blocks_roundtrip():
+    vecs = np.random.default_rng(0).normal(size=(5, 16)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    for dtype, tol in (("float16", 1e-3), ("int8", 1e-2)):
+        block = snapshot.encode_block(vecs, dtype)
+        assert np.abs(snapshot.decode_block(block["vectors"], block.get("scales")) - vecs).max() < tol
+
+
+def test_payload_columns_roundtrip(tmp_path):
+    payloads = [{"text": "a", "chunk": 0, "sources": ["x.md"], "ok": True}, {"text": "b", "section": "Fees"}]
+    snapshot.write_payloads(str(tmp_path / "p.npz"), ["1", "2"], payloads)
+    assert snapshot.read_payloads(str(tmp_path / "p.npz")) == (["1", "2"], payloads)
+
+
+class FakeQdrant:
+    def __init__(self):
+        self.points = {}
+
+    def collection_exists(self, name):
+        return True
+
+    def get_collection(self, name):
+        return type("Info", (), {"payload_schema": {"namespace": "keyword", "source": "keyword"}})()
+
+    def upsert(self, collection_name, points, wait):
+        self.points.update({p.id: p for p in points})
+
+
+def test_export_then_restore_needs_no_embedding(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(config, "INGEST_MANIFEST", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(config, "RAG_GENERATION_FILE", str(tmp_path / "generation"))
+    monkeypatch.setattr(config, "DEDUPE_DIR", str(tmp_path / "dedupe"))
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "kyc.md").write_text("KYC: verify ID and address.")
+    (src / "fees.md").write_text("NSF fees apply to bounced payments.")
+    ingest.ingest("bank/policies", str(src))
+    before = LocalIndex.load(config.LOCAL_INDEX_DIR)
+    assert snapshot.export(str(tmp_path / "snap"))["points"] == 2
+
+    monkeypatch.setattr(config, "LOCAL_INDEX_DIR", str(tmp_path / "fresh"))
+    monkeypatch.setattr(config, "INGEST_MANIFEST", str(tmp_path / "fresh.json"))
+    monkeypatch.setattr(ingest, "embed_texts", lambda *a, **kw: pytest.fail("restore must not embed"))
+    qdrant = FakeQdrant()
+    assert snapshot.restore(str(tmp_path / "snap"), client=qdrant)["points"] == 2
+    after = LocalIndex.load(config.LOCAL_INDEX_DIR)
+    assert sorted(after.ids) == sorted(before.ids) == sorted(qdrant.points)
+    assert after.search(before.vector(before.ids[0]), ["bank/policies"], 1)[0]["id"] == before.ids[0]
+    assert ingest.ingest("bank/policies", str(src))["unchanged"] == 2
+
+
+def test_restore_refuses_other_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(config, "INGEST_MANIFEST", str(tmp_path / "manifest.json"))
+    snapshot.export(str(tmp_path / "snap"))
+    monkeypatch.setattr(config, "EMBED_DIM", config.EMBED_DIM * 2)
+    with pytest.raises(ValueError):
+        snapshot.restore(str(tmp_path / "snap"))
+
+
+def test_restore_keeps_dedupe_refcounts_and_bumps_generation(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(config, "INGEST_MANIFEST", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(config, "RAG_GENERATION_FILE", str(tmp_path / "generation"))
+    monkeypatch.setattr(config, "DEDUPE_DIR", str(tmp_path / "dedupe"))
+    monkeypatch.setattr(config, "DEDUPE_THRESHOLD", 0.7)
+    src = tmp_path / "src"
+    src.mkdir()
+    boiler = "This message is confidential and intended only for the named recipient of the bank"
+    for i in range(2):
+        (src / f"notice{i}.md").write_text(f"{boiler} {i}.")
+    assert ingest.ingest("bank/ops", str(src), dedupe=True)["duplicates"] == 1
+    snapshot.export(str(tmp_path / "snap"))
+
+    monkeypatch.setattr(config, "LOCAL_INDEX_DIR", str(tmp_path / "fresh"))
+    monkeypatch.setattr(config, "INGEST_MANIFEST", str(tmp_path / "fresh.json"))
+    monkeypatch.setattr(config, "DEDUPE_DIR", str(tmp_path / "fresh-dedupe"))
+    before = (tmp_path / "generation").read_text()
+    snapshot.restore(str(tmp_path / "snap"))
+    assert (tmp_path / "generation").read_text() != before
+    (src / "notice0.md").unlink()
+    stats = ingest.ingest("bank/ops", str(src))
+    assert stats["removed"] == 1 and stats["deleted"] == 0 and len(LocalIndex.load(config.LOCAL_INDEX_DIR)) == 1
@@ -0,0 +1,39 @@
+import pytest
+
+from server import tools
+from server.tools import ToolSpec, compile_plan
+
+
+def test_plan_orders_dependencies_and_ignores_unregistered_tools():
+    plan = compile_plan(["kyc.verify", "avatar.speak", "rag.search", "crm.lookup", "budget.analyze"])
+    names = plan.names
+    assert "avatar.speak" not in names and set(names) == {"kyc.verify", "rag.search", "crm.lookup", "budget.analyze"}
+    assert names.index("crm.lookup") < names.index("kyc.verify")
+    assert names[0] == "budget.analyze"  # cheapest ready tool first
+
+
+def test_reply_uses_limits_default_tools_but_keeps_their_dependencies():
+    plan = compile_plan(["rag.search", "crm.lookup", "kyc.verify", "budget.analyze"], uses=["kyc_status"])
+    assert plan.default_names == ["crm.lookup", "kyc.verify"] and len(plan.names) == 4
+    assert [s.name for s in plan.prune(["rag.search"])] == ["rag.search"]
+
+
+def test_default_plan_skips_tools_the_reply_never_reads():
+    from server.persona_repo import load_pack
+
+    persona, plan = load_pack("teller-v1")
+    assert "kyc.verify" in persona["tools"] and "kyc.verify" not in plan.default_names
+    assert [s.name for s in plan.prune(["kyc.verify"])] == ["crm.lookup", "kyc.verify"]
+
+
+def test_prune_and_steps_skip_tools_without_required_context():
+    plan = compile_plan(["rag.search", "crm.lookup", "kyc.verify"])
+    steps = plan.steps({"text": "hi", "user_id": ""})
+    assert [s.name for s in steps] == ["rag.search", "kyc.verify"] and steps[1].deps == ()
+
+
+def test_cycles_are_rejected(monkeypatch):
+    monkeypatch.setitem(tools.REGISTRY, "a", ToolSpec("a", lambda c, d: 1, deps=("b",)))
+    monkeypatch.setitem(tools.REGISTRY, "b", ToolSpec("b", lambda c, d: 1, deps=("a",)))
+    with pytest.raises(ValueError, match="cycle"):
+        compile_plan(["a", "b"])
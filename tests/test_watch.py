@@ -0,0 +1,41 @@
+import threading
+
+from server import config, ingest, watch
+from server.local_index import LocalIndex
+
+
+def test_poll_changes_debounces_a_burst(tmp_path):
+    (tmp_path / "a.md").write_text("one")
+    stop = threading.Event()
+    batches = watch.poll_changes(str(tmp_path), stop, poll=0.01, debounce=0.05)
+
+    def edit():
+        (tmp_path / "a.md").write_text("one two")
+        (tmp_path / "b.md").write_text("new")
+        (tmp_path / "skip.bin").write_text("ignored")
+
+    threading.Timer(0.1, edit).start()
+    threading.Timer(5, stop.set).start()
+    assert next(batches) == {str(tmp_path / "a.md"), str(tmp_path / "b.md")}
+    stop.set()
+
+
+def test_ingest_paths_only_touches_listed_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(config, "INGEST_MANIFEST", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(config, "RAG_GENERATION_FILE", str(tmp_path / "generation"))
+    monkeypatch.setattr(config, "DEDUPE_DIR", str(tmp_path / "dedupe"))
+    src = tmp_path / "src"
+    src.mkdir()
+    for name in ("a", "b", "c"):
+        (src / f"{name}.md").write_text(f"policy {name}")
+    ingest.ingest("bank/policies", str(src))
+    generation = (tmp_path / "generation").read_text()
+    (src / "a.md").write_text("policy a, revised")
+    (src / "b.md").unlink()
+    (src / "c.md").write_text("policy c, revised but not reported")
+    stats = ingest.ingest("bank/policies", str(src), paths=[str(src / "a.md"), str(src / "b.md")])
+    assert (stats["changed"], stats["removed"], stats["unchanged"]) == (1, 1, 0)
+    texts = sorted(p["text"] for p in LocalIndex.load(config.LOCAL_INDEX_DIR).payloads)
+    assert texts == ["policy a, revised", "policy c"]
+    assert (tmp_path / "generation").read_text() != generation